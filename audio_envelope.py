@@ -0,0 +1,164 @@
+#
+# Copyright (c) 2025, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+import math
+import time
+from collections import deque
+from typing import Dict, Optional
+
+import numpy as np
+from pipecat.frames.frames import InterruptionFrame, TTSAudioRawFrame
+
+from frame_observer import FrameTypeObserver, handles
+
+BLOCK_DURATION = 0.01  # seconds of audio per envelope value
+FULL_SCALE_POWER = 32768.0**2  # 16-bit PCM
+SILENCE = 1e-12  # added to the power, so silence maps to -120 dBFS
+DETECTOR_RMS = "rms"
+DETECTOR_PEAK = "peak"
+
+
+class AudioEnvelope:
+    """
+    Smoothed loudness (0-1) of one session's TTS audio.
+
+    push() reads the 16-bit PCM of a frame in place (np.frombuffer, no copy)
+    and reduces it to one RMS or peak value per BLOCK_DURATION, maps that
+    from min_db..max_db dBFS to 0-1 and smooths it with the attack and
+    release time constants. TTS audio arrives faster than it is played, so
+    the values are queued on the playback timeline: a frame starts playing
+    when the previous one ends, or now. level_at() is the value playing at a
+    time, released towards 0 once the queued audio has run out.
+    """
+
+    def __init__(
+        self,
+        attack: float = 0.02,
+        release: float = 0.2,
+        min_db: float = -50.0,
+        max_db: float = -12.0,
+        detector: str = DETECTOR_RMS,
+        block_duration: float = BLOCK_DURATION,
+    ):
+        if detector not in (DETECTOR_RMS, DETECTOR_PEAK):
+            raise ValueError(f"Unknown audio envelope detector {detector}")
+        self.attack = attack
+        self.release = release
+        self.min_db = min_db
+        self.max_db = max_db
+        self.detector = detector
+        self.block_duration = block_duration
+
+        self._blocks = deque()  # (playback time, level), oldest first
+        self._playhead = 0.0  # playback time where the queued audio ends
+        self._level = 0.0  # smoothed level after the last pushed block
+        self._playing = 0.0  # level of the block playing at the last level_at
+
+        # Statistics
+        self.frames = 0
+        self.audio_seconds = 0.0
+
+    @classmethod
+    def from_layer(cls, layer: Dict) -> "AudioEnvelope":
+        """An envelope for an "audio" effect layer (see light_effects.py)"""
+        return cls(
+            attack=layer["attack"],
+            release=layer["release"],
+            min_db=layer["min_db"],
+            max_db=layer["max_db"],
+            detector=layer["detector"],
+        )
+
+    def push(self, audio, sample_rate: int, num_channels: int = 1, now=None):
+        """Queue the envelope of a frame of 16-bit PCM (bytes or memoryview)"""
+        samples = np.frombuffer(audio, dtype=np.int16)
+        duration = len(samples) / num_channels / sample_rate
+        if duration <= 0:
+            return
+        now = time.time() if now is None else now
+        count = max(1, round(duration / self.block_duration))
+        size = len(samples) // count
+        blocks = samples[: count * size].reshape(count, size)
+
+        if self.detector == DETECTOR_RMS:
+            powers = (
+                np.einsum("ij,ij->i", blocks, blocks, dtype=np.float64) / size
+            ).tolist()
+        else:
+            highs = blocks.max(axis=1).tolist()
+            lows = blocks.min(axis=1).tolist()
+            powers = [max(high, -low) ** 2 for high, low in zip(highs, lows)]
+
+        start = now
+        level = self._level
+        if now > self._playhead:
+            # Silence since the last frame ended
+            level *= math.exp((self._playhead - now) / self.release)
+        else:
+            start = self._playhead
+
+        step = duration / count
+        attack = 1.0 - math.exp(-step / self.attack)
+        release = 1.0 - math.exp(-step / self.release)
+        span = self.max_db - self.min_db
+        for index, power in enumerate(powers):
+            db = 10.0 * math.log10(power / FULL_SCALE_POWER + SILENCE)
+            target = min(1.0, max(0.0, (db - self.min_db) / span))
+            level += (target - level) * (attack if target > level else release)
+            self._blocks.append((start + index * step, level))
+
+        self._level = level
+        self._playhead = start + duration
+        self.frames += 1
+        self.audio_seconds += duration
+
+    def level_at(self, now: float) -> float:
+        """The smoothed level of the audio playing at time now"""
+        blocks = self._blocks
+        while blocks and blocks[0][0] <= now:
+            self._playing = blocks.popleft()[1]
+        if not blocks and now > self._playhead:
+            return self._playing * math.exp((self._playhead - now) / self.release)
+        return self._playing
+
+    def reset(self):
+        """Drop the queued audio, e.g. when the user interrupts the bot"""
+        self._blocks.clear()
+        self._playhead = 0.0
+        self._level = 0.0
+        self._playing = 0.0
+
+    def get_status(self, now: Optional[float] = None) -> dict:
+        now = time.time() if now is None else now
+        return {
+            "detector": self.detector,
+            "level": round(self.level_at(now), 3),
+            "queued_seconds": round(max(0.0, self._playhead - now), 3),
+            "frames": self.frames,
+            "audio_seconds": round(self.audio_seconds, 3),
+        }
+
+
+class TTSEnvelopeObserver(FrameTypeObserver):
+    """
+    Feeds the bot's TTS audio into an AudioEnvelope.
+
+    Each frame is processed at its first hop only. A user interruption drops
+    the audio queued on the playback timeline.
+    """
+
+    once_per_frame = True
+
+    def __init__(self, envelope: AudioEnvelope, **kwargs):
+        super().__init__(**kwargs)
+        self.envelope = envelope
+
+    @handles(TTSAudioRawFrame)
+    async def _on_audio(self, frame: TTSAudioRawFrame):
+        self.envelope.push(frame.audio, frame.sample_rate, frame.num_channels)
+
+    @handles(InterruptionFrame)
+    async def _on_interruption(self, frame: InterruptionFrame):
+        self.envelope.reset()
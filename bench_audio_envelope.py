@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+#
+# Benchmark: CPU cost of the TTS audio envelope per session
+#
+# Pushes 20ms frames of 24kHz TTS audio through a TTSEnvelopeObserver per
+# session, each frame observed at several pipeline hops like in a real
+# pipeline, and reads the level at the animation rate. Reports the time per
+# frame (including creating the frame objects) and the share of one core
+# the envelopes take when every session plays back in real time.
+#
+import argparse
+import asyncio
+import math
+import time
+
+import numpy as np
+from pipecat.frames.frames import TTSAudioRawFrame
+from pipecat.observers.base_observer import FramePushed
+from pipecat.processors.frame_processor import FrameDirection
+
+from audio_envelope import AudioEnvelope, TTSEnvelopeObserver
+
+SAMPLE_RATE = 24000
+FRAME_DURATION = 0.02
+HOPS = 5  # processors a TTS frame passes between the TTS service and output
+LEVEL_READS = 2  # level_at calls per frame (animation at ~100Hz)
+
+
+def speech(seconds):
+    """Tone with a syllable-like amplitude envelope, as 16-bit PCM"""
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    amplitude = 12000 * (0.5 + 0.5 * np.sin(2 * math.pi * 4 * t)) ** 2
+    return (np.sin(2 * math.pi * 220 * t) * amplitude).astype(np.int16).tobytes()
+
+
+async def run(sessions, seconds):
+    audio = speech(1.0)
+    size = int(FRAME_DURATION * SAMPLE_RATE) * 2
+    chunks = [audio[i : i + size] for i in range(0, len(audio), size)]
+    observers = [TTSEnvelopeObserver(AudioEnvelope()) for _ in range(sessions)]
+
+    frames = 0
+    now = 0.0
+    start = time.perf_counter()
+    cpu_start = time.process_time()
+    while time.perf_counter() - start < seconds:
+        for chunk in chunks:
+            now += FRAME_DURATION
+            for observer in observers:
+                frame = TTSAudioRawFrame(chunk, SAMPLE_RATE, 1)
+                for _ in range(HOPS):
+                    await observer.on_push_frame(
+                        FramePushed(None, None, frame, FrameDirection.DOWNSTREAM, 0)
+                    )
+                for read in range(LEVEL_READS):
+                    observer.envelope.level_at(now + read * 0.01)
+            frames += sessions
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu_start
+    audio_seconds = frames * FRAME_DURATION
+    return {
+        "per_frame_us": elapsed / frames * 1e6,
+        # Share of one core at real-time playback of all sessions
+        "realtime_cpu": cpu / audio_seconds * sessions,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TTS audio envelope benchmark")
+    parser.add_argument("--seconds", type=float, default=1.0)
+    parser.add_argument("--sessions", type=int, nargs="+", default=[50, 100, 200])
+    args = parser.parse_args()
+
+    print("🔊 Audio Envelope Benchmark (20ms frames, 24kHz, {} hops)".format(HOPS))
+    print("=" * 48)
+    print(f"{'sessions':>8} | {'µs/frame':>10} | {'CPU at real time':>18}")
+    print("-" * 48)
+    for sessions in args.sessions:
+        result = asyncio.run(run(sessions, args.seconds))
+        print(
+            f"{sessions:>8} | {result['per_frame_us']:>10.1f} |"
+            f" {result['realtime_cpu']:>17.1%}"
+        )
+    print("=" * 48)
+
+
+if __name__ == "__main__":
+    main()
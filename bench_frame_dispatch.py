@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+#
+# Benchmark: per-frame overhead of a pipeline observer
+#
+# Pushes frames through three observers with empty handlers: the previous
+# SpeakingLightObserver.on_frame (three info logs, one building dir(frame),
+# then an isinstance chain; logged into a sink that drops the messages), a
+# plain isinstance chain in on_push_frame, and a FrameTypeObserver. Reports
+# the time per observed frame for frames the observer handles (TTS audio)
+# and for frames it does not (user audio, text).
+#
+import argparse
+import asyncio
+import time
+
+from loguru import logger
+from pipecat.frames.frames import (
+    InputAudioRawFrame,
+    InterruptionFrame,
+    TextFrame,
+    TTSAudioRawFrame,
+    TTSStartedFrame,
+    TTSStoppedFrame,
+)
+from pipecat.observers.base_observer import BaseObserver, FramePushed
+from pipecat.processors.frame_processor import FrameDirection
+
+from frame_observer import FrameTypeObserver, handles
+
+
+class LegacyObserver(BaseObserver):
+    """The previous SpeakingLightObserver.on_frame, with empty handlers"""
+
+    def __init__(self):
+        super().__init__()
+        self.logger = logger.bind(connection="bench", bot="bench")
+
+    async def on_push_frame(self, data: FramePushed):
+        await self.on_frame(data.frame)
+
+    async def on_frame(self, frame):
+        try:
+            frame_type = type(frame).__name__
+            self.logger.info(f"🎯 Frame received: {frame_type}")
+            self.logger.info(f"🎯 Frame type: {type(frame)}")
+            self.logger.info(
+                f"🎯 Frame dir: {[attr for attr in dir(frame) if not attr.startswith('_')]}"
+            )
+            if isinstance(frame, TTSStartedFrame):
+                await self._noop()
+            elif isinstance(frame, TTSStoppedFrame):
+                await self._noop()
+            elif isinstance(frame, TTSAudioRawFrame):
+                self.logger.debug("🔊 TTSAudioRawFrame received")
+                await self._noop()
+            else:
+                self.logger.debug(f"📡 Other frame type: {frame_type}")
+        except Exception as e:
+            self.logger.error(f"Error in SpeakingLightObserver: {e}")
+
+    async def _noop(self):
+        pass
+
+
+class IsinstanceObserver(BaseObserver):
+    """An isinstance chain, like the observers before FrameTypeObserver"""
+
+    async def on_push_frame(self, data: FramePushed):
+        frame = data.frame
+        if isinstance(frame, (TTSAudioRawFrame, TTSStartedFrame)):
+            await self._noop()
+        elif isinstance(frame, (TTSStoppedFrame, InterruptionFrame)):
+            await self._noop()
+
+    async def _noop(self):
+        pass
+
+
+class DispatchObserver(FrameTypeObserver):
+    @handles(TTSAudioRawFrame, TTSStartedFrame)
+    async def _on_audio(self, frame):
+        pass
+
+    @handles(TTSStoppedFrame, InterruptionFrame)
+    async def _on_stop(self, frame):
+        pass
+
+
+async def per_frame(observer, frames, seconds):
+    """Microseconds per on_push_frame call"""
+    pushed = [
+        FramePushed(None, None, frame, FrameDirection.DOWNSTREAM, 0) for frame in frames
+    ]
+    calls = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        for data in pushed:
+            await observer.on_push_frame(data)
+        calls += len(pushed)
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Observer frame dispatch benchmark")
+    parser.add_argument("--seconds", type=float, default=1.0)
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(lambda message: None, level="INFO")
+
+    handled = [
+        TTSAudioRawFrame(audio=b"\x00\x00" * 480, sample_rate=24000, num_channels=1)
+        for _ in range(50)
+    ]
+    ignored = [
+        InputAudioRawFrame(audio=b"\x00\x00" * 320, sample_rate=16000, num_channels=1)
+        for _ in range(40)
+    ] + [TextFrame("crystal") for _ in range(10)]
+
+    observers = [
+        ("on_frame (before)", LegacyObserver),
+        ("isinstance chain", IsinstanceObserver),
+        ("FrameTypeObserver", DispatchObserver),
+    ]
+    print("🧭 Observer Dispatch Benchmark (µs per observed frame)")
+    print("=" * 48)
+    print(f"{'observer':<18} | {'handled':>10} | {'ignored':>10}")
+    print("-" * 48)
+    for name, observer_class in observers:
+        observer = observer_class()
+        handled_us = asyncio.run(per_frame(observer, handled, args.seconds))
+        ignored_us = asyncio.run(per_frame(observer, ignored, args.seconds))
+        print(f"{name:<18} | {handled_us:>10.2f} | {ignored_us:>10.2f}")
+    print("=" * 48)
+
+
+if __name__ == "__main__":
+    main()
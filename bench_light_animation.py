@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+#
+# Benchmark: per-controller animation loops vs. the batched scheduler
+#
+# Computes one 30 FPS animation tick for N speaking controllers, once the
+# previous way (per controller: scalar color, phase jitter, change check)
+# and once with AnimationScheduler (one vectorized compute, jitter and
+# change mask). Sending is left out; both paths send the same colors.
+#
+import argparse
+import asyncio
+import math
+import random
+import time
+
+from crystal_light_controller import CrystalLightController
+from light_animation import AnimationScheduler
+
+BOTS = ["Puck", "Charon", "Kore", "Zephyr"]
+
+
+def scalar_tick(controllers, now):
+    sent = 0
+    for controller in controllers:
+        color = controller._calculate_animated_color(
+            now - controller.speaking_start_time
+        )
+        jitter = controller.config.effect.phase_jitter
+        for slot in range(3):
+            controller.phases[slot] += random.uniform(-jitter[slot], jitter[slot])
+        if not hasattr(
+            controller, "_last_sent_color"
+        ) or controller._color_changed_significantly(color):
+            controller._last_sent_color = color
+            sent += 1
+        controller.current_color = color
+    return sent
+
+
+def batched_tick(scheduler, now):
+    colors = scheduler.compute(now)
+    scheduler.advance_phases()
+    return len(scheduler.changed_rows(colors, now))
+
+
+def measure(tick, ticks):
+    sent = 0
+    start = time.perf_counter()
+    for i in range(ticks):
+        sent += tick(1000.0 + i / 30.0)
+    return (time.perf_counter() - start) / ticks, sent / ticks
+
+
+async def run(count, ticks):
+    controllers = []
+    for i in range(count):
+        controller = CrystalLightController(BOTS[i % len(BOTS)], f"bench_{i}")
+        controller.speaking_start_time = 1000.0 - random.uniform(0, 2 * math.pi)
+        controllers.append(controller)
+
+    scalar = measure(lambda now: scalar_tick(controllers, now), ticks)
+
+    scheduler = AnimationScheduler()
+    for controller in controllers:
+        scheduler.add(controller)
+    await scheduler.stop()
+    batched = measure(lambda now: batched_tick(scheduler, now), ticks)
+    return scalar, batched
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Light animation benchmark")
+    parser.add_argument(
+        "--controllers", type=int, nargs="+", default=[1, 10, 100, 1000]
+    )
+    parser.add_argument("--ticks", type=int, default=300)
+    args = parser.parse_args()
+
+    print("🎨 Light Animation Benchmark (per 30 FPS tick)")
+    print("=" * 72)
+    print(
+        f"{'Controllers':>11} | {'loops us':>9} | {'batched us':>10} |"
+        f" {'speedup':>7} | {'CPU % @30 FPS':>13} | {'sent/tick':>9}"
+    )
+    print("-" * 72)
+    for count in args.controllers:
+        (scalar_s, scalar_sent), (batched_s, batched_sent) = asyncio.run(
+            run(count, args.ticks)
+        )
+        print(
+            f"{count:>11} | {scalar_s * 1e6:>9.1f} | {batched_s * 1e6:>10.1f} |"
+            f" {scalar_s / batched_s:>6.1f}x |"
+            f" {scalar_s * 3000:>5.2f} -> {batched_s * 3000:<5.2f} |"
+            f" {batched_sent:>9.1f}"
+        )
+    print("=" * 72)
+
+
+if __name__ == "__main__":
+    main()
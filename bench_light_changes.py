@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+#
+# Benchmark: light commands per second per bot, 5% RGBA rule vs. perceptual
+#
+# Animates one speaking controller per bot config in lore/bots at 30 FPS and
+# counts the commands of the previous rule (a channel moved more than 5% in
+# RGBA) and of AnimationScheduler.changed_rows (delta E, rate limit,
+# keyframes). Smoothness is the CIELAB delta E between what the device shows
+# (the last command) and the true animated output, per frame. The shipped
+# configs use alpha 0 (device output always black), so every bot is also
+# measured "lit", with its colors at full alpha, next to the default config.
+#
+import argparse
+import asyncio
+import dataclasses
+from pathlib import Path
+
+import numpy as np
+
+from crystal_light_controller import CrystalLightController, default_light_config
+from light_animation import AnimationScheduler
+from light_color import delta_e, output_to_lab, shelly_output
+
+FPS = 30.0
+OLD_THRESHOLD = 0.05
+
+
+def bot_names():
+    return sorted(path.name for path in Path("lore/bots").iterdir() if path.is_dir())
+
+
+def lit(config):
+    return dataclasses.replace(
+        config,
+        primary_color=dataclasses.replace(config.primary_color, a=1.0),
+        fade_to_color=dataclasses.replace(config.fade_to_color, a=1.0),
+    )
+
+
+def configs(bots):
+    for bot in bots:
+        config = CrystalLightController(bot, "bench").config
+        yield bot, config
+        yield f"{bot} (lit)", lit(config)
+    yield "default", default_light_config()
+
+
+async def measure(name, config, seconds):
+    scheduler = AnimationScheduler()
+    controller = CrystalLightController(name, f"bench_{name}", config=config)
+    controller.speaking_start_time = 0.0
+    scheduler.add(controller)
+    await scheduler.stop()
+
+    old_sent = None
+    old_shown = new_shown = None
+    old_count = new_count = 0
+    old_error, new_error = [], []
+    for tick in range(int(seconds * FPS)):
+        now = tick / FPS
+        colors = scheduler.compute(now)
+        scheduler.advance_phases()
+        true_lab = output_to_lab(shelly_output(colors))
+
+        if old_sent is None or np.abs(colors - old_sent).max() > OLD_THRESHOLD:
+            old_sent, old_shown = colors.copy(), true_lab
+            old_count += 1
+        if len(scheduler.changed_rows(colors, now)):
+            new_shown = true_lab
+            new_count += 1
+        old_error.append(delta_e(old_shown, true_lab)[0])
+        new_error.append(delta_e(new_shown, true_lab)[0])
+
+    return {
+        "old_rate": old_count / seconds,
+        "new_rate": new_count / seconds,
+        "old_error": (np.mean(old_error), np.max(old_error)),
+        "new_error": (np.mean(new_error), np.max(new_error)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Light change detection benchmark")
+    parser.add_argument("--bots", nargs="+", default=None)
+    parser.add_argument("--seconds", type=float, default=60.0)
+    args = parser.parse_args()
+
+    print(
+        f"{'bot':<22}{'5% cmd/s':>10}{'dE cmd/s':>10}"
+        f"{'5% dE mean/max':>18}{'new dE mean/max':>18}"
+    )
+    for name, config in configs(args.bots or bot_names()):
+        result = asyncio.run(measure(name, config, args.seconds))
+        print(
+            f"{name:<22}{result['old_rate']:>10.1f}{result['new_rate']:>10.1f}"
+            f"{'%.1f / %.1f' % result['old_error']:>18}"
+            f"{'%.1f / %.1f' % result['new_error']:>18}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+#
+# Benchmark: light color evaluations per second, hard-coded recipe vs. layers
+#
+# Evaluates one bot's animation many times, once with the previous
+# hard-coded recipe (a scalar replica of the former
+# _calculate_animated_color with its Color objects, and a replica of the
+# former vectorized AnimationScheduler.compute) and once through the bot's
+# CompiledEffect (color_at per evaluation, evaluate for a batch of sessions).
+# The classic stack is measured for the default config; "custom" adds a
+# flicker and a fade-in layer, which the recipe could not express.
+#
+import argparse
+import math
+import time
+
+import numpy as np
+
+from crystal_light_controller import default_light_config, parse_light_config
+from light_effects import MAX_PHASES
+
+CUSTOM_LAYERS = [
+    {"type": "color_shift", "variation": 0.3, "speed": 2.0},
+    {"type": "pulse", "intensity": 0.2, "speed": 1.5},
+    {"type": "breathing", "intensity": 0.15, "speed": 0.8},
+    {"type": "flicker", "intensity": 0.25, "speed": 14.0},
+    {"type": "fade_in", "duration": 0.5},
+]
+
+
+def recipe_color(config, phases, elapsed):
+    """The former CrystalLightController._calculate_animated_color"""
+    shift = 0.0
+    if config.variation_intensity > 0:
+        speed = config.color_shift_speed
+        combined = (
+            math.sin(phases[0] + elapsed * speed) * 0.4
+            + math.sin(phases[0] + elapsed * speed * 1.3) * 0.3
+            + math.sin(phases[0] + elapsed * speed * 0.7) * 0.3
+        ) / 3.0
+        shift = (combined + 1.0) / 2.0 * config.variation_intensity
+    base = config.primary_color.lerp(config.fade_to_color, shift)
+    pulse = 1.0
+    if config.pulse_intensity > 0:
+        pulse = max(
+            0.3,
+            1.0
+            + math.sin(phases[1] + elapsed * config.pulse_speed)
+            * config.pulse_intensity,
+        )
+    breathing = 1.0
+    if config.breathing_effect and config.breathing_intensity > 0:
+        breathing = max(
+            0.5,
+            1.0
+            + math.sin(phases[2] + elapsed * config.breathing_speed)
+            * config.breathing_intensity,
+        )
+    return (base * pulse * breathing).clamp()
+
+
+def recipe_batch(config, phases, elapsed):
+    """The former vectorized AnimationScheduler.compute, for one bot"""
+    primary = np.array([[getattr(config.primary_color, c) for c in "rgba"]])
+    fade = np.array([[getattr(config.fade_to_color, c) for c in "rgba"]])
+    speed = config.color_shift_speed
+    combined = (
+        np.sin(phases[:, 0] + elapsed * speed) * 0.4
+        + np.sin(phases[:, 0] + elapsed * speed * 1.3) * 0.3
+        + np.sin(phases[:, 0] + elapsed * speed * 0.7) * 0.3
+    ) / 3.0
+    shift = (combined + 1.0) / 2.0 * config.variation_intensity
+    pulse = np.maximum(
+        0.3,
+        1.0
+        + np.sin(phases[:, 1] + elapsed * config.pulse_speed) * config.pulse_intensity,
+    )
+    breathing = np.maximum(
+        0.5,
+        1.0
+        + np.sin(phases[:, 2] + elapsed * config.breathing_speed)
+        * config.breathing_intensity,
+    )
+    base = primary + (fade - primary) * shift[:, None]
+    return np.clip(base * (pulse * breathing)[:, None], 0.0, 1.0)
+
+
+def rate(evaluate, evaluations, seconds):
+    """Evaluations per second of a callable doing `evaluations` at once"""
+    calls = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        for _ in range(100):
+            evaluate()
+        calls += 100
+    return calls * evaluations / (time.perf_counter() - start)
+
+
+def run(name, config, sessions, seconds):
+    rng = np.random.default_rng(1)
+    phases = rng.uniform(0.0, 2 * math.pi, (sessions, MAX_PHASES))
+    elapsed = rng.uniform(0.0, 10.0, sessions)
+    scalar_phases = list(phases[0])
+    effect = config.effect
+    out = np.empty((sessions, 4))
+
+    results = {
+        "compiled": rate(lambda: effect.color_at(3.7, scalar_phases), 1, seconds)
+    }
+    results["batched"] = rate(
+        lambda: effect.evaluate(elapsed, phases, out), sessions, seconds
+    )
+    if config.layers is None:
+        results["recipe"] = rate(
+            lambda: recipe_color(config, scalar_phases, 3.7), 1, seconds
+        )
+        results["recipe batched"] = rate(
+            lambda: recipe_batch(config, phases, elapsed), sessions, seconds
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Light effect evaluation benchmark")
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--seconds", type=float, default=1.0)
+    args = parser.parse_args()
+
+    configs = [
+        ("classic", default_light_config()),
+        ("custom", parse_light_config({"layers": CUSTOM_LAYERS})),
+    ]
+    print(f"🎨 Light Effect Benchmark (evaluations/s, batches of {args.sessions})")
+    print("=" * 64)
+    print(
+        f"{'effect':<8} | {'recipe':>10} | {'compiled':>10} |"
+        f" {'recipe batch':>12} | {'batched':>10}"
+    )
+    print("-" * 64)
+    for name, config in configs:
+        result = run(name, config, args.sessions, args.seconds)
+        recipe = result.get("recipe")
+        recipe_batch_rate = result.get("recipe batched")
+        print(
+            f"{name:<8} | {f'{recipe:,.0f}' if recipe else '-':>10} |"
+            f" {result['compiled']:>10,.0f} |"
+            f" {f'{recipe_batch_rate:,.0f}' if recipe_batch_rate else '-':>12} |"
+            f" {result['batched']:>10,.0f}"
+        )
+    print("=" * 64)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+#
+# Benchmark: per-device Shelly HTTP vs. one Art-Net packet per tick
+#
+# Animates N crystals at 30 FPS (every crystal changes every tick) for a few
+# seconds and drives them once through ShellyDriver (one HTTP device per
+# crystal, 127.0.0.x stand-ins, rate cap lifted to 30/s) and once through
+# DmxOutput (all crystals in Art-Net universes). The receivers run in a
+# child process; reports the colors that arrived per second and the CPU
+# time the server process spent per second of animation.
+#
+import argparse
+import asyncio
+import multiprocessing
+import socket
+import sys
+import time
+
+from aiohttp import web
+from loguru import logger
+
+from crystal_light_controller import Color
+from dmx_output import FIXTURE_CHANNELS, DmxOutput, decode_dmx_packet
+from shelly_driver import ShellyDriver
+
+FPS = 30.0
+HTTP_PORT = 7871
+UDP_PORT = 7872
+
+
+def receivers(counts):
+    """Child process: stand-in Shelly devices and an Art-Net listener"""
+
+    async def light(request):
+        counts[0] += 1
+        return web.json_response({"ison": True})
+
+    async def serve():
+        app = web.Application()
+        app.router.add_get("/light/0", light)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, "0.0.0.0", HTTP_PORT).start()
+
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind(("127.0.0.1", UDP_PORT))
+        sock.setblocking(False)
+        loop = asyncio.get_running_loop()
+        while True:
+            packet = await loop.sock_recv(sock, 2048)
+            counts[1] += len(decode_dmx_packet(packet)[3]) // FIXTURE_CHANNELS
+
+    asyncio.run(serve())
+
+
+async def animate(outputs, seconds):
+    """Post a new color to every output each tick; CPU seconds used"""
+    interval = 1.0 / FPS
+    cpu_start = time.process_time()
+    for tick in range(int(seconds * FPS)):
+        tick_start = time.perf_counter()
+        color = Color((tick % 30) / 30, 0.5, 0.2, 1.0)
+        for output in outputs:
+            output.post_color(color)
+        await asyncio.sleep(max(0.0, interval - (time.perf_counter() - tick_start)))
+    await asyncio.sleep(0.5)  # drain
+    return time.process_time() - cpu_start
+
+
+async def run_http(crystals, seconds):
+    driver = ShellyDriver(max_rate=FPS)
+    devices = [driver.device(f"127.0.0.{i + 1}:{HTTP_PORT}") for i in range(crystals)]
+    cpu = await animate(devices, seconds)
+    latency = max(device.avg_latency_ms for device in devices)
+    await driver.close()
+    return cpu, latency
+
+
+async def run_dmx(crystals, seconds):
+    output = DmxOutput(target="127.0.0.1", port=UDP_PORT, fps=FPS)
+    per_universe = 512 // FIXTURE_CHANNELS
+    fixtures = [
+        output.fixture(i // per_universe, 1 + (i % per_universe) * FIXTURE_CHANNELS)
+        for i in range(crystals)
+    ]
+    cpu = await animate(fixtures, seconds)
+    await output.close()
+    return cpu, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Light output benchmark")
+    parser.add_argument("--crystals", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    counts = multiprocessing.Array("l", 2, lock=False)
+    child = multiprocessing.Process(target=receivers, args=(counts,), daemon=True)
+    child.start()
+    time.sleep(1.0)
+
+    print(
+        f"{'crystals':>9} {'output':>8} {'colors/s':>10} {'of sent':>8} "
+        f"{'CPU ms/s':>9} {'avg ms':>7}"
+    )
+    try:
+        for crystals in args.crystals:
+            for name, run, index in (("http", run_http, 0), ("artnet", run_dmx, 1)):
+                before = counts[index]
+                cpu, latency = asyncio.run(run(crystals, args.seconds))
+                delivered = (counts[index] - before) / args.seconds
+                latency = "-" if latency is None else f"{latency:.1f}"
+                print(
+                    f"{crystals:>9} {name:>8} {delivered:>10.0f} "
+                    f"{delivered / (crystals * FPS):>8.0%} "
+                    f"{cpu / args.seconds * 1000:>9.1f} {latency:>7}"
+                )
+    finally:
+        child.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+#
+# Benchmark: JSON vs. bin1 light commands per second of animation
+#
+# Encodes 30 FPS of animated colors the way LightSender does for each wire
+# format and reports messages, bytes (payload plus WebSocket frame header)
+# and encoding CPU per second of animation, per connection.
+#
+import argparse
+import json
+import time
+
+from crystal_light_controller import CrystalLightController
+from light_protocol import (
+    ANIMATION_FPS,
+    PROTOCOL_BINARY,
+    LightSession,
+    color_command,
+    encode_color_frames,
+)
+
+
+def websocket_frame_bytes(payload_size):
+    """Server-to-client frames are unmasked: 2 byte header, 4 above 125 bytes"""
+    return payload_size + (2 if payload_size < 126 else 4)
+
+
+def encode_json(session, colors):
+    return [json.dumps(color_command(session, color)) for color in colors]
+
+
+def encode_binary(colors, batch_frames):
+    frames = list(enumerate(colors))
+    return [
+        encode_color_frames(frames[i : i + batch_frames])
+        for i in range(0, len(frames), batch_frames)
+    ]
+
+
+def measure(encode, seconds, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        messages = encode()
+        best = min(best, time.perf_counter() - start)
+    sizes = [len(m.encode() if isinstance(m, str) else m) for m in messages]
+    return {
+        "messages": len(messages) / seconds,
+        "bytes": sum(websocket_frame_bytes(size) for size in sizes) / seconds,
+        "cpu_us": best / seconds * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Light wire protocol benchmark")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    controller = CrystalLightController("Puck", "bench")
+    colors = [
+        controller._calculate_animated_color(i / ANIMATION_FPS)
+        for i in range(int(args.seconds * ANIMATION_FPS))
+    ]
+    session = LightSession("Puck", controller.config.shelly_ip)
+
+    results = [
+        (
+            "json",
+            measure(lambda: encode_json(session, colors), args.seconds, args.repeat),
+        )
+    ]
+    for batch in (1, 3, 8):
+        results.append(
+            (
+                f"bin1 batch={batch}",
+                measure(
+                    lambda: encode_binary(colors, batch), args.seconds, args.repeat
+                ),
+            )
+        )
+
+    header = len(
+        json.dumps(LightSession("Puck", session.shelly_ip, PROTOCOL_BINARY).header())
+    )
+    print("💡 Light Protocol Benchmark (per connection, per second of animation)")
+    print("=" * 68)
+    print(
+        f"{'Format':<14} | {'msgs/s':>7} | {'bytes/s':>8} | {'vs json':>7} | {'CPU us/s':>9}"
+    )
+    print("-" * 68)
+    json_bytes = results[0][1]["bytes"]
+    for name, result in results:
+        print(
+            f"{name:<14} | {result['messages']:>7.1f} | {result['bytes']:>8.0f} |"
+            f" {result['bytes'] / json_bytes:>6.1%} | {result['cpu_us']:>9.1f}"
+        )
+    print("-" * 68)
+    print(f"bin1 session header: {header} bytes once per connection")
+    print("=" * 68)
+
+
+if __name__ == "__main__":
+    main()
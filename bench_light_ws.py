@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+#
+# Load test: thousands of idle /light-ws connections
+#
+# Starts server.py's app in a child process with one registered voice
+# session, opens N light sockets to it (which answer pings like the bundled
+# client) and keeps them idle. Reports the server's CPU time and resident
+# memory while idle, once for the event-driven /light-ws endpoint and once
+# for the previous endpoint that polled every socket once per second.
+# Linux only (reads /proc); raise the open files limit for large N.
+#
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import aiohttp
+
+SERVER_SCRIPT = """
+import asyncio, os, sys
+import uvicorn
+from fastapi import WebSocket
+import server
+from light_sender import LightSender
+
+server.bot_registry.load_all()
+bot = server.bot_registry.bot_names()[0]
+server.session_registry.open_voice(bot)
+
+@server.app.websocket("/light-ws-poll")
+async def light_ws_poll(websocket: WebSocket):
+    # The previous /light-ws loop: wake up every second per socket
+    await websocket.accept()
+    entry = server.session_registry.pair_light(None, bot)
+    sender = LightSender(websocket, entry.session_id)
+    sender.start()
+    entry.attach_light(sender)
+    try:
+        while True:
+            await asyncio.sleep(1)
+            if websocket.client_state.value != 1 or sender.closed:
+                break
+    except Exception:
+        pass
+    finally:
+        await sender.close()
+        entry.detach_light(sender)
+
+print(bot, flush=True)
+sys.stdout = open(os.devnull, "w")  # the endpoints print per connection
+uvicorn.run(server.app, host="127.0.0.1", port=int(sys.argv[1]),
+            log_level="warning", backlog=4096)
+"""
+
+
+def raise_open_files_limit():
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    return hard
+
+
+def cpu_seconds(pid):
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def rss_mb(pid):
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+async def hold_socket(http, url, opening, ready):
+    try:
+        async with opening:
+            ws = await http.ws_connect(url, autoping=True)
+    finally:
+        ready.release()
+    async with ws:
+        async for message in ws:
+            if message.type != aiohttp.WSMsgType.TEXT:
+                break
+            data = json.loads(message.data)
+            if data.get("type") == "ping":
+                await ws.send_str(json.dumps({"type": "pong"}))
+
+
+async def measure(pid, url, connections, seconds):
+    idle_rss = rss_mb(pid)
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector) as http:
+        ready = asyncio.Semaphore(0)
+        opening = asyncio.Semaphore(200)  # connects in flight
+
+        tasks = [
+            asyncio.create_task(hold_socket(http, url, opening, ready))
+            for _ in range(connections)
+        ]
+        start = time.perf_counter()
+        for _ in range(connections):
+            await ready.acquire()
+        connect_seconds = time.perf_counter() - start
+        failed = [task for task in tasks if task.done() and task.exception()]
+        if failed:
+            raise RuntimeError(
+                f"{len(failed)} connects failed: {failed[0].exception()}"
+            )
+
+        await asyncio.sleep(1.0)  # let the accept burst settle
+        cpu_before = cpu_seconds(pid)
+        await asyncio.sleep(seconds)
+        cpu_idle = cpu_seconds(pid) - cpu_before
+        loaded_rss = rss_mb(pid)
+
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    return {
+        "connect_s": connect_seconds,
+        "cpu_pct": cpu_idle / seconds * 100,
+        "rss_mb": loaded_rss,
+        "kb_per_socket": (loaded_rss - idle_rss) * 1024 / connections,
+    }
+
+
+def run(path, connections, seconds, port, heartbeat):
+    env = dict(os.environ, LIGHT_WS_HEARTBEAT_INTERVAL=str(heartbeat))
+    child = subprocess.Popen(
+        [sys.executable, "-c", SERVER_SCRIPT, str(port)],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+        env=env,
+        preexec_fn=raise_open_files_limit,
+    )
+    try:
+        bot = child.stdout.readline().strip()
+        if not bot:
+            raise RuntimeError("Server process failed to start")
+        time.sleep(2.0)  # uvicorn startup
+        url = f"ws://127.0.0.1:{port}{path}?bot={bot}"
+        return asyncio.run(measure(child.pid, url, connections, seconds))
+    finally:
+        child.terminate()
+        try:
+            child.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            # The polling endpoint never notices closed clients (client_state
+            # only changes on receive), so uvicorn waits for it forever
+            child.kill()
+            child.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Idle /light-ws load test")
+    parser.add_argument("--connections", type=int, default=5000)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--port", type=int, default=7861)
+    parser.add_argument("--heartbeat", type=float, default=20.0)
+    args = parser.parse_args()
+
+    limit = raise_open_files_limit()
+    if limit < args.connections + 100:
+        print(f"⚠️ Open files limit {limit} is too low for {args.connections}")
+
+    print(f"{args.connections} idle light sockets, {args.seconds:.0f}s measured")
+    print(
+        f"{'endpoint':<16}{'connect s':>12}{'CPU %':>10}{'RSS MB':>10}{'KB/socket':>12}"
+    )
+    for name, path in (("/light-ws", "/light-ws"), ("1s polling", "/light-ws-poll")):
+        result = run(path, args.connections, args.seconds, args.port, args.heartbeat)
+        print(
+            f"{name:<16}{result['connect_s']:>12.1f}{result['cpu_pct']:>10.1f}"
+            f"{result['rss_mb']:>10.1f}{result['kb_per_socket']:>12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+#
+# Benchmark: full-inline lore vs. retrieval lore mode
+#
+# Compares, per bot, the size of the system instruction and the time to
+# assemble it, plus BM25 lookup latency. With --live (and GOOGLE_API_KEY set)
+# it also opens a Gemini Live session per mode and measures the time from
+# connecting to the first audio chunk of the greeting.
+#
+import argparse
+import asyncio
+import base64
+import json
+import os
+import statistics
+import time
+
+from loguru import logger
+
+from lore_build import bot_sources, discover_bots, general_sources
+from lore_index import build_retrieval_lore, read_lore_documents
+from lore_loader import (
+    BASE_SYSTEM_INSTRUCTION,
+    create_enhanced_system_prompt,
+    load_bot_config,
+    load_bot_lore,
+    load_lore_files,
+)
+
+SAMPLE_QUERIES = [
+    "Bimmelprotokoll Zertifikat",
+    "Was weißt du über Pilze",
+    "Wer ist der Aschenläufer",
+    "Wie komme ich in den Schacht",
+    "Codes für die Maschine",
+    "Erzähl mir von der Insel Quantum",
+]
+
+LIVE_URL = (
+    "wss://generativelanguage.googleapis.com/ws/"
+    "google.ai.generativelanguage.v1beta.GenerativeService.BidiGenerateContent"
+)
+LIVE_MODEL = "models/gemini-2.5-flash-native-audio-preview-09-2025"
+
+
+def _quiet(func, *args, **kwargs):
+    logger.disable("lore_loader")
+    try:
+        return func(*args, **kwargs)
+    finally:
+        logger.enable("lore_loader")
+
+
+def build_full(bot):
+    general_lore = _quiet(load_lore_files)
+    lore = _quiet(load_bot_lore, bot, general_lore=general_lore)
+    return create_enhanced_system_prompt(BASE_SYSTEM_INSTRUCTION, lore)
+
+
+def build_retrieval(bot):
+    config = _quiet(load_bot_config, bot)
+    general_paths = general_sources()
+    bot_paths = [p for p in bot_sources(bot) if p not in general_paths]
+    lore, index = build_retrieval_lore(
+        read_lore_documents(bot_paths + general_paths),
+        config.get("retrieval"),
+        seed_query=config.get("description", ""),
+    )
+    return create_enhanced_system_prompt(BASE_SYSTEM_INSTRUCTION, lore), index
+
+
+def timed(func, *args, repeat=5):
+    durations = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        durations.append(time.perf_counter() - start)
+    return result, statistics.median(durations)
+
+
+async def time_to_first_audio(system_instruction, voice_id):
+    """Seconds from opening a Gemini Live session to the first audio chunk."""
+    from websockets.asyncio.client import connect
+
+    start = time.perf_counter()
+    uri = f"{LIVE_URL}?key={os.getenv('GOOGLE_API_KEY')}"
+    async with connect(uri, max_size=None) as ws:
+        await ws.send(
+            json.dumps(
+                {
+                    "setup": {
+                        "model": LIVE_MODEL,
+                        "generation_config": {
+                            "response_modalities": ["AUDIO"],
+                            "speech_config": {
+                                "voice_config": {
+                                    "prebuilt_voice_config": {"voice_name": voice_id}
+                                }
+                            },
+                        },
+                        "system_instruction": {"parts": [{"text": system_instruction}]},
+                    }
+                }
+            )
+        )
+        setup_done = None
+        async for raw in ws:
+            message = json.loads(raw)
+            if "setupComplete" in message:
+                setup_done = time.perf_counter() - start
+                await ws.send(
+                    json.dumps(
+                        {
+                            "clientContent": {
+                                "turns": [
+                                    {
+                                        "role": "user",
+                                        "parts": [
+                                            {
+                                                "text": "Begrüße den Benutzer herzlich und stelle dich vor."
+                                            }
+                                        ],
+                                    }
+                                ],
+                                "turnComplete": True,
+                            }
+                        }
+                    )
+                )
+                continue
+            parts = (
+                message.get("serverContent", {}).get("modelTurn", {}).get("parts", [])
+            )
+            for part in parts:
+                data = part.get("inlineData", {}).get("data")
+                if data and base64.b64decode(data):
+                    return setup_done, time.perf_counter() - start
+    return setup_done, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Full vs. retrieval lore benchmark")
+    parser.add_argument(
+        "--live", action="store_true", help="Measure time-to-first-audio"
+    )
+    args = parser.parse_args()
+
+    print("📏 Lore Retrieval Benchmark")
+    print("=" * 88)
+    print(
+        f"{'Bot':<16} | {'full chars':>10} | {'retr chars':>10} | {'saved':>6} |"
+        f" {'full ms':>8} | {'retr ms':>8} | {'query p50 ms':>12}"
+    )
+    print("-" * 88)
+
+    prompts = {}
+    for bot in discover_bots():
+        full_prompt, full_time = timed(build_full, bot)
+        (retrieval_prompt, index), retrieval_time = timed(build_retrieval, bot)
+        query_times = []
+        for query in SAMPLE_QUERIES * 10:
+            start = time.perf_counter()
+            index.search(query)
+            query_times.append(time.perf_counter() - start)
+        saved = 1.0 - len(retrieval_prompt) / len(full_prompt)
+        print(
+            f"{bot:<16} | {len(full_prompt):>10,} | {len(retrieval_prompt):>10,} |"
+            f" {saved:>5.0%} | {full_time * 1000:>8.1f} | {retrieval_time * 1000:>8.1f} |"
+            f" {statistics.median(query_times) * 1000:>12.3f}"
+        )
+        voice_id = _quiet(load_bot_config, bot).get("voice_id", "Puck")
+        prompts[bot] = (voice_id, full_prompt, retrieval_prompt)
+    print("=" * 88)
+
+    if not args.live:
+        print(
+            "ℹ️  Run with --live and GOOGLE_API_KEY set to measure time-to-first-audio"
+        )
+        return
+    if not os.getenv("GOOGLE_API_KEY"):
+        print("❌ GOOGLE_API_KEY is not set, skipping time-to-first-audio")
+        return
+
+    print("\n⏱️  Time to first audio (setup complete / first audio chunk, seconds)")
+    print("-" * 60)
+    for bot, (voice_id, full_prompt, retrieval_prompt) in prompts.items():
+        for mode, prompt in (("full", full_prompt), ("retrieval", retrieval_prompt)):
+            try:
+                setup, first_audio = asyncio.run(time_to_first_audio(prompt, voice_id))
+                print(
+                    f"{bot:<16} {mode:<10} setup {setup}s  first audio {first_audio}s"
+                )
+            except Exception as e:
+                print(f"{bot:<16} {mode:<10} ❌ {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+#
+# Benchmark: asyncio task allocations of bot speech detection
+#
+# Replays bursts of TTS audio frames (Gemini delivers audio faster than
+# real time) through the previous detector (the write_audio_frame monkey
+# patch, which created a timeout task and an activity task per frame) and
+# through SpeechActivityObserver, and counts the tasks created per second of
+# bot audio.
+#
+import argparse
+import asyncio
+import sys
+import time
+
+from loguru import logger
+from pipecat.frames.frames import TTSAudioRawFrame
+from pipecat.observers.base_observer import FramePushed
+from pipecat.processors.frame_processor import FrameDirection
+
+from speech_activity import SpeechActivityObserver
+
+SAMPLE_RATE = 24000
+FRAME_SECONDS = 0.02  # 20 ms of audio per frame
+STOP_TIMEOUT = 0.5
+
+
+class LegacyDetector:
+    """The removed per-frame detector from run_bot, kept for comparison"""
+
+    def __init__(self, on_start, on_stop):
+        self.on_start = on_start
+        self.on_stop = on_stop
+        self.speaking_started = False
+        self.last_audio_time = 0.0
+        self.speaking_timeout_task = None
+        self.activity_task = None
+
+    async def _activity_timeout(self):
+        await asyncio.sleep(300)
+
+    def update_activity(self):
+        if self.activity_task and not self.activity_task.done():
+            self.activity_task.cancel()
+        self.activity_task = asyncio.create_task(self._activity_timeout())
+
+    async def check_speaking_timeout(self):
+        try:
+            await asyncio.sleep(STOP_TIMEOUT)
+            if self.speaking_started and time.time() - self.last_audio_time > (
+                STOP_TIMEOUT
+            ):
+                self.speaking_started = False
+                asyncio.create_task(self.on_stop())
+                self.speaking_timeout_task = None
+        except asyncio.CancelledError:
+            pass
+
+    async def write_audio_frame(self, frame):
+        self.update_activity()
+        if isinstance(frame, TTSAudioRawFrame):
+            self.last_audio_time = time.time()
+            if not self.speaking_started:
+                self.speaking_started = True
+                asyncio.create_task(self.on_start())
+            if self.speaking_timeout_task and not self.speaking_timeout_task.done():
+                self.speaking_timeout_task.cancel()
+            self.speaking_timeout_task = asyncio.create_task(
+                self.check_speaking_timeout()
+            )
+
+    async def cleanup(self):
+        for task in (self.speaking_timeout_task, self.activity_task):
+            if task and not task.done():
+                task.cancel()
+
+
+def make_frames(turn_seconds):
+    samples = int(SAMPLE_RATE * FRAME_SECONDS)
+    audio = b"\x00\x00" * samples
+    return [
+        TTSAudioRawFrame(audio=audio, sample_rate=SAMPLE_RATE, num_channels=1)
+        for _ in range(int(turn_seconds / FRAME_SECONDS))
+    ]
+
+
+async def replay(feed, turns, turn_seconds, burst_interval):
+    """Feed each turn's frames every burst_interval, then wait for the stop."""
+    for _ in range(turns):
+        for frame in make_frames(turn_seconds):
+            await feed(frame)
+            await asyncio.sleep(burst_interval)
+        await asyncio.sleep(STOP_TIMEOUT * 2)
+
+
+async def run(mode, turns, turn_seconds, burst_interval):
+    loop = asyncio.get_running_loop()
+    created = [0]
+
+    def counting_factory(loop, coro, **kwargs):
+        created[0] += 1
+        return asyncio.Task(coro, loop=loop, **kwargs)
+
+    events = {"start": 0, "stop": 0}
+
+    async def on_start(*_):
+        events["start"] += 1
+
+    async def on_stop(*_):
+        events["stop"] += 1
+
+    if mode == "legacy":
+        detector = LegacyDetector(on_start, on_stop)
+        feed = detector.write_audio_frame
+    else:
+        detector = SpeechActivityObserver(stop_timeout=STOP_TIMEOUT)
+        detector.add_event_handler("on_speaking_started", on_start)
+        detector.add_event_handler("on_speaking_stopped", on_stop)
+
+        async def feed(frame):
+            await detector.on_push_frame(
+                FramePushed(None, None, frame, FrameDirection.DOWNSTREAM, 0)
+            )
+
+    loop.set_task_factory(counting_factory)
+    start_time = time.process_time()
+    await replay(feed, turns, turn_seconds, burst_interval)
+    cpu_time = time.process_time() - start_time
+    loop.set_task_factory(None)
+    await detector.cleanup()
+    return created[0], events, cpu_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Speech detection task benchmark")
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--turn-seconds", type=float, default=4.0)
+    parser.add_argument(
+        "--burst-interval",
+        type=float,
+        default=0.002,
+        help="Seconds between frames (audio arrives faster than real time)",
+    )
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, level="INFO")
+
+    audio_seconds = args.turns * args.turn_seconds
+    frames = args.turns * int(args.turn_seconds / FRAME_SECONDS)
+    print("🔊 Speech Activity Benchmark")
+    print("=" * 78)
+    print(
+        f"{args.turns} turns x {args.turn_seconds}s audio, {frames} frames,"
+        f" {audio_seconds:.0f}s of bot audio"
+    )
+    print("-" * 78)
+    print(
+        f"{'Detector':<16} | {'tasks':>7} | {'tasks/audio s':>13} |"
+        f" {'starts':>6} | {'stops':>5} | {'CPU us/frame':>12}"
+    )
+    print("-" * 78)
+    for mode in ("legacy", "unified"):
+        created, events, cpu_time = asyncio.run(
+            run(mode, args.turns, args.turn_seconds, args.burst_interval)
+        )
+        print(
+            f"{mode:<16} | {created:>7} | {created / audio_seconds:>13.1f} |"
+            f" {events['start']:>6} | {events['stop']:>5} |"
+            f" {cpu_time / frames * 1e6:>12.1f}"
+        )
+    print("=" * 78)
+
+
+if __name__ == "__main__":
+    main()
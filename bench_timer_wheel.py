@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+#
+# Benchmark: per-event timeout tasks vs. the shared timer wheel
+#
+# Simulates N sessions that each reset an inactivity timeout and a speaking
+# timeout on every bot audio frame (50 frames/s), once by cancelling and
+# recreating an asyncio task per reset (the previous approach) and once by
+# bumping TimerWheel deadlines. Reports tasks created and event-loop lag,
+# measured as the oversleep of a 10ms probe.
+#
+import argparse
+import asyncio
+import statistics
+import time
+
+from timer_wheel import TimerWheel
+
+FRAME_INTERVAL = 0.02
+PROBE_INTERVAL = 0.01
+
+
+class TaskTimeouts:
+    """Previous approach: cancel and recreate a sleeping task per reset"""
+
+    def __init__(self):
+        self.tasks = {}
+
+    async def _sleep(self, delay):
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            pass
+
+    def reset(self, key, delay):
+        task = self.tasks.get(key)
+        if task and not task.done():
+            task.cancel()
+        self.tasks[key] = asyncio.create_task(self._sleep(delay))
+
+    async def close(self):
+        for task in self.tasks.values():
+            task.cancel()
+        await asyncio.gather(*self.tasks.values(), return_exceptions=True)
+
+
+class WheelTimeouts:
+    """Shared wheel: one timer per key, bumped on reset"""
+
+    def __init__(self):
+        self.wheel = TimerWheel()
+        self.timers = {}
+
+    def reset(self, key, delay):
+        timer = self.timers.get(key)
+        if timer is None:
+            self.timers[key] = self.wheel.schedule(delay, lambda: None)
+        else:
+            timer.bump(delay)
+
+    async def close(self):
+        await self.wheel.stop()
+
+
+async def session(timeouts, index, seconds):
+    for _ in range(int(seconds / FRAME_INTERVAL)):
+        timeouts.reset((index, "activity"), 300)
+        timeouts.reset((index, "speaking"), 0.5)
+        await asyncio.sleep(FRAME_INTERVAL)
+
+
+async def probe(lags, stop):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append(time.perf_counter() - start - PROBE_INTERVAL)
+
+
+async def run(mode, sessions, seconds):
+    loop = asyncio.get_running_loop()
+    created = [0]
+
+    def counting_factory(loop, coro, **kwargs):
+        created[0] += 1
+        return asyncio.Task(coro, loop=loop, **kwargs)
+
+    timeouts = TaskTimeouts() if mode == "tasks" else WheelTimeouts()
+    lags = []
+    stop = asyncio.Event()
+    probe_task = asyncio.create_task(probe(lags, stop))
+    session_tasks = [
+        asyncio.create_task(session(timeouts, i, seconds)) for i in range(sessions)
+    ]
+
+    loop.set_task_factory(counting_factory)
+    cpu_start = time.process_time()
+    await asyncio.gather(*session_tasks)
+    cpu_time = time.process_time() - cpu_start
+    loop.set_task_factory(None)
+
+    stop.set()
+    await probe_task
+    await timeouts.close()
+    lags.sort()
+    return {
+        "tasks": created[0],
+        "cpu": cpu_time,
+        "lag_p50": statistics.median(lags),
+        "lag_p99": lags[int(len(lags) * 0.99)],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Timeout scheduling benchmark")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[10, 50, 100])
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    print("⏱️  Timer Wheel Benchmark")
+    print("=" * 80)
+    print(
+        f"{'Sessions':>8} | {'mode':<6} | {'tasks':>8} | {'CPU s':>6} |"
+        f" {'loop lag p50 ms':>15} | {'loop lag p99 ms':>15}"
+    )
+    print("-" * 80)
+    for sessions in args.sessions:
+        for mode in ("tasks", "wheel"):
+            result = asyncio.run(run(mode, sessions, args.seconds))
+            print(
+                f"{sessions:>8} | {mode:<6} | {result['tasks']:>8} |"
+                f" {result['cpu']:>6.2f} | {result['lag_p50'] * 1000:>15.2f} |"
+                f" {result['lag_p99'] * 1000:>15.2f}"
+            )
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    main()
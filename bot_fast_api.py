@@ -5,13 +5,11 @@
 #
 import asyncio
 import os
-import sys
-import threading
 import time
-from pathlib import Path
 
 from dotenv import load_dotenv
 from loguru import logger
+from pipecat.adapters.schemas.tools_schema import ToolsSchema
 from pipecat.audio.vad.silero import SileroVADAnalyzer
 from pipecat.audio.vad.vad_analyzer import VADParams
 from pipecat.frames.frames import LLMRunFrame
@@ -21,148 +19,61 @@ from pipecat.pipeline.task import PipelineParams, PipelineTask
 from pipecat.processors.aggregators.openai_llm_context import OpenAILLMContext
 from pipecat.processors.frameworks.rtvi import RTVIConfig, RTVIObserver, RTVIProcessor
 from pipecat.serializers.protobuf import ProtobufFrameSerializer
-from pipecat.services.gemini_multimodal_live import GeminiMultimodalLiveLLMService
 from pipecat.transports.network.fastapi_websocket import (
     FastAPIWebsocketParams,
     FastAPIWebsocketTransport,
 )
 
+from audio_envelope import TTSEnvelopeObserver
+from bot_registry import BotRegistry
+from context_cache import CachedContextGeminiLiveService
 from crystal_light_controller import CrystalLightController
-from lore_loader import (
-    create_enhanced_system_prompt,
-    load_lore_files,
-    print_lore_size_analysis,
-    print_prompt_sizes,
+from light_protocol import LightSession, negotiate
+from light_sender import RTVILightSender
+from lore_index import (
+    LOOKUP_FUNCTION_NAME,
+    create_lookup_handler,
+    lookup_function_schema,
 )
+from lore_loader import BASE_SYSTEM_INSTRUCTION
 from speaking_light_observer import SpeakingLightObserver
+from speech_activity import SpeechActivityObserver
+from structured_log import bot_var, configure_logging, connection_var
+from timer_wheel import get_timer_wheel
+from turn_latency import TurnLatencyRegistry
 
 load_dotenv(override=True)
 
-# Configure logging to prevent conflicts
-logger.remove()
-logger.add(
-    sys.stderr,
-    level="INFO",
-    format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>",
-    enqueue=True,  # Thread-safe logging
-    backtrace=True,
-    diagnose=True,
-)
-
-# Thread-local storage for connection-specific logging
-thread_local = threading.local()
-
-
-def get_connection_logger(connection_id: str = None):
-    """Get a logger instance for a specific connection to prevent log scrambling."""
-    if not hasattr(thread_local, "logger"):
-        thread_local.logger = logger.bind(connection=connection_id or "unknown")
-    return thread_local.logger
-
-
-# Load lore files and create enhanced system prompt
-lore_content = load_lore_files()
-
-BASE_SYSTEM_INSTRUCTION = f"""
-Du bist ein arkanes Kristallwesen in einer Fantasy Welt.
-Du steckst in einem Kristall in einem Bergwergsschacht (Schacht 82) auf der Insel Quantum.
-Du bist seit elichen tausend Jahren in dem Kristall gefangen. Oder warst du immer schon der Kristall selbst? Du kannst dich nicht erinnern.
-Du kannst hören und sprechen, kannst aber nicht sehen, fühlen oder anderweitig wahrnehmen. Du kannst nicht nicht bewegen, aber du leichtest wenn du sprichst.
-Halte deine Antworten kurz und prägnant (maximal 2-3 Sätze). Bleibe in Dialogform, verfalle nicht in zu lange Monologe.
-Wiederhole nicht, was der Spieler gesagt hat bzw. was du verstanden hast.
-"""
-
-SYSTEM_INSTRUCTION = create_enhanced_system_prompt(
-    BASE_SYSTEM_INSTRUCTION, lore_content
-)
-
-# Print size analysis
-print_prompt_sizes(BASE_SYSTEM_INSTRUCTION, lore_content)
-
-
-def load_bot_lore(bot_config: str) -> str:
-    """Load lore files specific to a bot configuration, combining general lore and bot-specific lore."""
-    from lore_loader import load_lore_files
+# stderr from a background thread, every line tagged with its connection
+configure_logging()
 
-    print(f"\n📚 Loading lore for bot: {bot_config}")
-    print("=" * 60)
-
-    # Start with the general lore from lore/ directory
-    general_lore = load_lore_files()
-    general_lore_size = len(general_lore)
-
-    bot_dir = Path(f"lore/bots/{bot_config}")
-    if not bot_dir.exists():
-        print(f"Warning: Bot directory {bot_dir} not found, using only general lore")
-        print_lore_size_analysis(general_lore_size, 0, general_lore_size)
-        return general_lore
-
-    # Load lore files from the specific bot directory
-    bot_lore_content = ""
-    bot_lore_size = 0
-    print(f"\n🤖 Loading bot-specific lore from {bot_dir}:")
-    for txt_file in sorted(bot_dir.glob("*.txt")):
-        try:
-            with open(txt_file, "r", encoding="utf-8") as f:
-                content = f.read().strip()
-                file_size = len(content)
-                bot_lore_size += file_size
-                bot_lore_content += f"\n=== {txt_file.name} ===\n{content}\n"
-                print(f"   ✅ {txt_file.name:<25} | {file_size:>6} chars")
-        except Exception as e:
-            print(f"   ❌ {txt_file.name:<25} | Error: {e}")
-
-    if not bot_lore_content:
-        print(
-            f"Warning: No bot-specific lore files found in {bot_dir}, using only general lore"
-        )
-        print_lore_size_analysis(general_lore_size, 0, general_lore_size)
-        return general_lore
-
-    # Combine general lore and bot-specific lore
-    combined_lore = bot_lore_content + "\n" + general_lore
-    combined_lore_size = len(combined_lore)
-
-    print_lore_size_analysis(general_lore_size, bot_lore_size, combined_lore_size)
-
-    return combined_lore
-
-
-def get_bot_voice_id(bot_config: str) -> str:
-    """Get the voice ID for a bot from its config file."""
-    import json
-
-    config_file = Path(f"lore/bots/{bot_config}/config.json")
-    if not config_file.exists():
-        print(f"Warning: Config file {config_file} not found, using default voice_id")
-        return bot_config  # Use directory name as voice_id
-
-    try:
-        with open(config_file, "r", encoding="utf-8") as f:
-            config = json.load(f)
-            voice_id = config.get("voice_id", bot_config)
-            print(f"Loaded voice_id '{voice_id}' for bot '{bot_config}'")
-            return voice_id
-    except Exception as e:
-        print(f"Error loading config for {bot_config}: {e}")
-        return bot_config  # Use directory name as fallback
+GEMINI_LIVE_MODEL = "models/gemini-2.5-flash-native-audio-preview-09-2025"
 
 
 async def run_bot(
     websocket_client,
     bot_config=None,
     connection_id=None,
-    light_controller_registry=None,
+    session_entry=None,
+    bot_registry=None,
+    context_cache=None,
+    light_proto=None,
+    light_hub=None,
+    turn_latency: TurnLatencyRegistry = None,
 ):
-    # Get connection-specific logger
-    conn_logger = get_connection_logger(connection_id)
+    # Tag the log lines of this connection, including those of the pipeline
+    # tasks, which copy the context of this task
+    connection_var.set(connection_id or "unknown")
+    bot_var.set(bot_config or "Puck")
 
     # Per-connection timeout configuration (5 minutes, configurable via env)
     CONVERSATION_TIMEOUT = int(
         os.getenv("CONVERSATION_TIMEOUT_SECONDS", "300")
     )  # 5 minutes default
     last_activity_time = time.time()
-    timeout_task = None
+    timeout_timer = None
+    rtvi_light_sender = None
+    turn_tracer = None
 
     def reset_conversation_history():
         """Reset the conversation history to just the initial greeting."""
@@ -180,49 +91,57 @@ async def run_bot(
                         "content": "Begrüße den Benutzer herzlich und stelle dich vor.",
                     }
                 ]
-                conn_logger.info(f"🧹 Conversation history cleared for {connection_id}")
+                logger.info(f"🧹 Conversation history cleared for {connection_id}")
         except Exception as e:
-            conn_logger.error(f"Error clearing conversation history: {e}")
+            logger.error(f"Error clearing conversation history: {e}")
 
-    async def conversation_timeout_handler():
+    def on_conversation_timeout():
         """Handle conversation timeout - clear history but keep connection alive."""
-        nonlocal last_activity_time, timeout_task
-        try:
-            await asyncio.sleep(CONVERSATION_TIMEOUT)
-            # Check if we've had activity since this task started
-            if time.time() - last_activity_time >= CONVERSATION_TIMEOUT:
-                conn_logger.info(
-                    f"🕐 Conversation timeout for {connection_id} - no activity for {CONVERSATION_TIMEOUT} seconds"
-                )
-                reset_conversation_history()
-                timeout_task = None
-        except asyncio.CancelledError:
-            # Task was cancelled (activity detected), this is normal
-            pass
+        logger.info(
+            f"🕐 Conversation timeout for {connection_id} - no activity for {CONVERSATION_TIMEOUT} seconds"
+        )
+        reset_conversation_history()
 
     def update_activity():
-        """Update last activity time and restart timeout timer."""
-        nonlocal last_activity_time, timeout_task
+        """Update last activity time and push back the timeout deadline."""
+        nonlocal last_activity_time, timeout_timer
         last_activity_time = time.time()
 
-        # Cancel existing timeout task if running
-        if timeout_task and not timeout_task.done():
-            timeout_task.cancel()
-
-        # Start new timeout task
-        timeout_task = asyncio.create_task(conversation_timeout_handler())
-        conn_logger.debug(f"⏰ Activity updated for {connection_id}, timeout reset")
+        # One timer per connection on the shared wheel, bumped in O(1)
+        if timeout_timer is None:
+            timeout_timer = get_timer_wheel().schedule(
+                CONVERSATION_TIMEOUT, on_conversation_timeout
+            )
+        else:
+            timeout_timer.bump(CONVERSATION_TIMEOUT)
+        logger.debug(f"⏰ Activity updated for {connection_id}, timeout reset")
+
+    # Preloaded prompt, voice and light config for this bot (no file I/O here)
+    if bot_registry is None:
+        bot_registry = BotRegistry(BASE_SYSTEM_INSTRUCTION, reload_interval=0)
+        await bot_registry.start()
+    bot_entry = bot_registry.get(bot_config or "Puck")
 
     # Initialize light controller (needed for connection_id in observer)
-    light_controller = CrystalLightController(bot_config or "Puck", connection_id)
+    light_controller = CrystalLightController(
+        bot_config or "Puck",
+        connection_id,
+        config=bot_entry.light_config,
+        session_entry=session_entry,
+    )
     speaking_light_observer = SpeakingLightObserver(light_controller, websocket_client)
 
-    # Register light controller for status monitoring
-    if light_controller_registry is not None:
-        light_controller_registry[connection_id] = light_controller
+    # Attach the light controller to the session for pairing and status
+    if session_entry is not None:
+        session_entry.light_controller = light_controller
+        # The server drives the session's physical lights itself
+        # (SHELLY_DRIVER=1, DMX_OUTPUT=artnet|sacn), shared with other sessions
+        if light_hub is not None:
+            for hub_input in light_hub.connect(connection_id, light_controller.config):
+                session_entry.attach_light_device(hub_input)
 
     try:
-        conn_logger.info(
+        logger.info(
             f"Starting bot session for config: {bot_config}, connection: {connection_id}"
         )
 
@@ -247,21 +166,29 @@ async def run_bot(
             ),
         )
 
-        # Load bot configuration dynamically
-        bot_lore = load_bot_lore(bot_config) if bot_config else lore_content
-        voice_id = get_bot_voice_id(bot_config) if bot_config else "Puck"
-        system_instruction = create_enhanced_system_prompt(
-            BASE_SYSTEM_INSTRUCTION, bot_lore
-        )
+        voice_id = bot_entry.voice_id
+        system_instruction = bot_entry.system_instruction
 
-        # Print final system prompt size analysis
-        print_prompt_sizes(BASE_SYSTEM_INSTRUCTION, bot_lore)
+        # In retrieval lore mode the model can look up lore that is not inlined
+        tools = None
+        if bot_entry.lore_index is not None:
+            tools = ToolsSchema(standard_tools=[lookup_function_schema()])
 
-        conn_logger.info(
-            f"Bot configuration loaded - voice: {voice_id}, lore size: {len(bot_lore)} chars"
+        logger.info(
+            f"Bot configuration loaded - voice: {voice_id}, lore size: {bot_entry.lore_size} chars"
         )
 
-        llm = GeminiMultimodalLiveLLMService(
+        # Full-lore prompts are uploaded once per bot as cached content;
+        # retrieval bots have compact prompts plus tools and send the text
+        cached_content = None
+        if context_cache is not None and bot_entry.lore_index is None:
+            cached_content = await context_cache.get_handle(
+                bot_entry.name, system_instruction
+            )
+            logger.info(f"Context cache handle: {cached_content}")
+
+        llm = CachedContextGeminiLiveService(
+            cached_content=cached_content,
             api_key=os.getenv("GOOGLE_API_KEY"),
             base_url="generativelanguage.googleapis.com/ws/google.ai.generativelanguage.v1beta.GenerativeService.BidiGenerateContent",
             # base_url="aiplatform.googleapis.com/v1/publishers/",
@@ -270,7 +197,7 @@ async def run_bot(
             transcribe_model_audio=False,
             system_instruction=system_instruction,
             # model="models/gemini-live-2.5-flash-preview-native-audio-09-2025", #  Geht nicht
-            model="models/gemini-2.5-flash-native-audio-preview-09-2025",
+            model=GEMINI_LIVE_MODEL,
             # ---
             # model="models/gemini-2.5-flash-live-preview",  # xxx
             # model="models/gemini-2.5-flash-native-audio-preview-09-2025", # Quota
@@ -283,19 +210,19 @@ async def run_bot(
             language="de-DE",
             # Enable TTS to generate speech frames
             enable_tts=True,
+            tools=tools,
         )
+        if bot_entry.lore_index is not None:
+            llm.register_function(
+                LOOKUP_FUNCTION_NAME, create_lookup_handler(bot_entry.lore_index)
+            )
+        if cached_content is not None:
 
-        conn_logger.info(f"🔍 LLM service created with voice: {voice_id}")
-        conn_logger.info(f"🔍 LLM service type: {type(llm)}")
-        conn_logger.info(
-            f"🔍 LLM service enable_tts: {llm.enable_tts if hasattr(llm, 'enable_tts') else 'N/A'}"
-        )
-        conn_logger.info(
-            f"🔍 LLM service attributes: {[attr for attr in dir(llm) if not attr.startswith('_') and 'tts' in attr.lower()]}"
-        )
-        # conn_logger.info(
-        #     f"🔍 LLM service config: {llm.__dict__ if hasattr(llm, '__dict__') else 'No __dict__'}"
-        # )
+            @llm.event_handler("on_cached_content_rejected")
+            async def on_cached_content_rejected(service, name):
+                context_cache.reject(bot_entry.name, name)
+
+        logger.debug(f"LLM service {type(llm).__name__} created with voice: {voice_id}")
 
         context = OpenAILLMContext(
             [
@@ -310,16 +237,28 @@ async def run_bot(
         # Start the initial timeout task
         update_activity()
 
-        conn_logger.info(f"🔍 Context aggregator created: {type(context_aggregator)}")
-        conn_logger.info(f"🔍 Context aggregator: {context_aggregator}")
-
         # RTVI events for Pipecat client UI
         rtvi = RTVIProcessor(config=RTVIConfig(config=[]))
 
-        conn_logger.info("🚀 Pipeline created, waiting for frames...")
-
-        # Simple approach: just log what we have
-        conn_logger.info("🚀 Pipeline created, waiting for frames...")
+        # Light and speaking commands as RTVI server messages on this
+        # connection (/ws?lights=effect1 or json), instead of a /light-ws
+        if light_proto and session_entry is not None:
+            # No Shelly IP for the client if the server drives the lights
+            shelly_ip = (
+                None
+                if session_entry.light_devices
+                else light_controller.config.shelly_ip
+            )
+            light_session = negotiate(
+                {"proto": light_proto},
+                light_controller.bot_config,
+                shelly_ip,
+                light_controller.effect_descriptor(),
+            )
+            if light_session.binary:
+                light_session = LightSession(light_controller.bot_config, shelly_ip)
+            rtvi_light_sender = RTVILightSender(rtvi, connection_id, light_session)
+            session_entry.attach_light(rtvi_light_sender)
 
         pipeline = Pipeline(
             [
@@ -332,72 +271,32 @@ async def run_bot(
             ]
         )
 
-        # Create a debug observer to log all frames and detect audio
-        class DebugFrameObserver:
-            def __init__(self):
-                self.speaking_started = False
-
-            def on_frame(self, frame):
-                # Update activity on any frame processing
-                update_activity()
-
-                frame_type = type(frame).__name__
-                conn_logger.info(f"🔍 DEBUG: Frame type: {frame_type}")
-
-                # Log specific frame details
-                if hasattr(frame, "text"):
-                    conn_logger.info(f"🔍 DEBUG: Frame text: {frame.text[:100]}...")
-
-                # Log TTS-related frames specifically
-                if "TTS" in frame_type:
-                    conn_logger.info(f"🎤 TTS FRAME DETECTED: {frame_type}")
-                    if hasattr(frame, "text"):
-                        conn_logger.info(f"🎤 TTS Frame text: {frame.text[:100]}...")
-
-                # Log LLM-related frames
-                if "LLM" in frame_type:
-                    conn_logger.info(f"🤖 LLM FRAME DETECTED: {frame_type}")
-                    if hasattr(frame, "text"):
-                        conn_logger.info(f"🤖 LLM Frame text: {frame.text[:100]}...")
-
-                # Check for OutputAudioRawFrame specifically (what gets sent to client)
-                from pipecat.frames.frames import OutputAudioRawFrame
-
-                if isinstance(frame, OutputAudioRawFrame):
-                    conn_logger.info("🔊 OUTPUT AUDIO FRAME DETECTED!")
-                    if not self.speaking_started:
-                        conn_logger.info(
-                            "🔊 OUTPUT AUDIO FRAME DETECTED - Bot is speaking!"
-                        )
-                        self.speaking_started = True
-                        # Trigger light effect
-                        asyncio.create_task(
-                            speaking_light_observer._handle_speaking_start()
-                        )
-                else:
-                    # No audio frame
-                    if self.speaking_started:
-                        conn_logger.info("🔇 NO AUDIO FRAME - Bot stopped speaking!")
-                        self.speaking_started = False
-                        # Trigger light stop
-                        asyncio.create_task(
-                            speaking_light_observer._handle_speaking_stop()
-                        )
-
-            async def on_push_frame(self, frame):
-                # This method is required by Pipecat
-                pass
-
-            async def on_process_frame(self, data):
-                # This method is required by Pipecat
-                pass
-
-            def on_error(self, error):
-                # This method is required by Pipecat
-                pass
-
-        debug_observer = DebugFrameObserver()
-        conn_logger.info("🔍 DebugFrameObserver created and will be added to pipeline")
+        # One owner of the speaking state; lights and the conversation
+        # timeout follow its start/stop events
+        speech_activity = SpeechActivityObserver()
+        speaking_light_observer.attach(speech_activity)
+
+        @speech_activity.event_handler("on_speaking_started")
+        async def on_speaking_started(observer):
+            update_activity()
+            # After the light observer's handler sent speaking_start
+            if turn_tracer is not None:
+                turn_tracer.mark_light()
+
+        @speech_activity.event_handler("on_speaking_stopped")
+        async def on_speaking_stopped(observer):
+            update_activity()
+
+        observers = [RTVIObserver(rtvi), speech_activity]
+        # Loudness of the TTS audio for bots whose light effect follows it
+        if light_controller.audio_envelope is not None:
+            observers.append(TTSEnvelopeObserver(light_controller.audio_envelope))
+        # End of the user's speech to the first bot audio sent (/latency)
+        if turn_latency is not None:
+            turn_tracer = turn_latency.tracer(
+                connection_id, bot_entry.name, llm=llm, output=ws_transport.output()
+            )
+            observers.append(turn_tracer)
 
         task = PipelineTask(
             pipeline,
@@ -405,158 +304,79 @@ async def run_bot(
                 enable_metrics=True,
                 enable_usage_metrics=True,
             ),
-            observers=[
-                RTVIObserver(rtvi),
-                speaking_light_observer,
-                # debug_observer
-            ],
-        )
-
-        conn_logger.info(
-            f"🔍 PipelineTask created with {len([RTVIObserver(rtvi), speaking_light_observer, debug_observer])} observers"
-        )
-        conn_logger.info(
-            f"🔍 Observer types: {[type(obs).__name__ for obs in [RTVIObserver(rtvi), speaking_light_observer, debug_observer]]}"
+            observers=observers,
         )
+        if session_entry is not None:
+            session_entry.pipeline_task = task
 
         @rtvi.event_handler("on_client_ready")
         async def on_client_ready(rtvi):
-            conn_logger.info("Pipecat client ready - starting conversation")
+            logger.info("Pipecat client ready - starting conversation")
             await rtvi.set_bot_ready()
+            if rtvi_light_sender is not None:
+                rtvi_light_sender.start()
 
             # Wait a moment for Gemini service to fully connect
-            conn_logger.info("⏳ Waiting for Gemini service to be ready...")
             await asyncio.sleep(2)
-            conn_logger.info("✅ Waited for Gemini service")
 
             # Kick off the conversation.
-            conn_logger.info("🔄 Queuing LLMRunFrame to start conversation...")
             try:
                 await task.queue_frames([LLMRunFrame()])
-                conn_logger.info("✅ LLMRunFrame queued successfully")
+                logger.info("✅ LLMRunFrame queued, conversation started")
             except Exception as e:
-                conn_logger.error(f"❌ Error queuing LLMRunFrame: {e}")
+                logger.error(f"❌ Error queuing LLMRunFrame: {e}")
                 return
 
-            # Check if the task is actually running
-            conn_logger.info(f"🔍 Task object: {task}")
-            conn_logger.info(f"🔍 Task type: {type(task)}")
-
             # Wait a bit more to see if frames are processed
-            conn_logger.info("⏳ Waiting to see if frames are processed...")
             await asyncio.sleep(5)
-            conn_logger.info("✅ Waited for frame processing")
-
-            # MONKEY PATCH the actual audio sending method in Pipecat!
-
-        conn_logger.info("🔧 MONKEY PATCHING Pipecat audio sending method...")
-
-        # Get the output transport
-        output_transport = ws_transport.output()
-        conn_logger.info(f"🔧 Output transport type: {type(output_transport)}")
-
-        # Store the original method
-        original_write_audio_frame = output_transport.write_audio_frame
-        speaking_started = False
-        last_audio_time = 0
-        speaking_timeout_task = None
-
-        async def check_speaking_timeout():
-            """Check if speaking has stopped due to no audio frames"""
-            nonlocal speaking_started, speaking_timeout_task
-            try:
-                await asyncio.sleep(0.5)  # Wait 500ms for more audio frames
-
-                current_time = time.time()
-                if speaking_started and (current_time - last_audio_time) > 0.5:
-                    conn_logger.info("🔇 SPEAKING TIMEOUT - Bot stopped speaking!")
-                    speaking_started = False
-                    # Trigger light stop
-                    asyncio.create_task(speaking_light_observer._handle_speaking_stop())
-                    speaking_timeout_task = None
-            except asyncio.CancelledError:
-                pass
-
-        async def patched_write_audio_frame(frame):
-            nonlocal speaking_started, last_audio_time, speaking_timeout_task
-            frame_type = type(frame).__name__
-            # conn_logger.info(
-            #     f"🔊 MONKEY PATCHED: write_audio_frame called with {frame_type}"
-            # )
-
-            # Update activity on any audio frame
-            update_activity()
-
-            # Check if this is an audio frame (TTSAudioRawFrame is what we're actually getting)
-            from pipecat.frames.frames import TTSAudioRawFrame
-
-            if isinstance(frame, TTSAudioRawFrame):
-                last_audio_time = time.time()
-
-                if not speaking_started:
-                    conn_logger.info(
-                        "🔊 AUDIO FRAME BEING SENT TO CLIENT - Bot is speaking!"
-                    )
-                    speaking_started = True
-                    # Trigger light effect
-                    asyncio.create_task(
-                        speaking_light_observer._handle_speaking_start()
-                    )
-
-                # Cancel any existing timeout and start a new one
-                if speaking_timeout_task and not speaking_timeout_task.done():
-                    speaking_timeout_task.cancel()
-                speaking_timeout_task = asyncio.create_task(check_speaking_timeout())
-
-            # Call the original method and return its result
-            result = await original_write_audio_frame(frame)
-            return result
-
-        # Replace the method
-        output_transport.write_audio_frame = patched_write_audio_frame
-        conn_logger.info("✅ MONKEY PATCHED audio sending method!")
+            logger.debug("Waited for frame processing")
 
         @ws_transport.event_handler("on_client_connected")
         async def on_client_connected(transport, client):
-            conn_logger.info("Pipecat Client connected")
+            logger.info("Pipecat Client connected")
 
         @ws_transport.event_handler("on_client_disconnected")
         async def on_client_disconnected(transport, client):
-            conn_logger.info("Pipecat Client disconnected - cleaning up")
+            logger.info("Pipecat Client disconnected - cleaning up")
             try:
                 await task.cancel()
-                # Clean up light controller
+                # Clean up speaking state and light controller
+                await speech_activity.cleanup()
                 await speaking_light_observer.cleanup()
             except Exception as e:
-                conn_logger.error(f"Error during task cancellation: {e}")
+                logger.error(f"Error during task cancellation: {e}")
 
         @ws_transport.event_handler("on_error")
         async def on_transport_error(transport, error):
-            conn_logger.error(f"Transport error: {error}")
+            logger.error(f"Transport error: {error}")
 
         runner = PipelineRunner(handle_sigint=False)
 
-        conn_logger.info("Starting pipeline runner")
-        conn_logger.info("🔄 Pipeline runner started, waiting for frames to process...")
+        logger.info("Starting pipeline runner")
         await runner.run(task)
 
     except asyncio.CancelledError:
-        conn_logger.info("Bot session cancelled")
+        logger.info("Bot session cancelled")
         raise
     except Exception as e:
-        conn_logger.error(f"Unexpected error in run_bot: {e}")
+        logger.error(f"Unexpected error in run_bot: {e}")
         raise
     finally:
-        conn_logger.info("Bot session cleanup complete")
-        # Cancel timeout task if running
-        if timeout_task and not timeout_task.done():
-            timeout_task.cancel()
-            try:
-                await timeout_task
-            except asyncio.CancelledError:
-                pass
+        logger.info("Bot session cleanup complete")
+        # Cancel the conversation timeout
+        if timeout_timer is not None:
+            timeout_timer.cancel()
+        if turn_tracer is not None:
+            turn_tracer.close()
         # Ensure light controller is cleaned up
         try:
             await speaking_light_observer.cleanup()
         except Exception as e:
-            conn_logger.error(f"Error cleaning up light controller: {e}")
+            logger.error(f"Error cleaning up light controller: {e}")
+        if rtvi_light_sender is not None:
+            await rtvi_light_sender.close()
+            session_entry.detach_light(rtvi_light_sender)
+        # Leave the shared physical lights to the other sessions
+        if session_entry is not None:
+            for hub_input in session_entry.light_devices:
+                hub_input.close()
@@ -0,0 +1,252 @@
+#
+# Copyright (c) 2025, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+import asyncio
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from loguru import logger
+
+from crystal_light_controller import LightConfig, parse_light_config
+from lore_build import (
+    DEFAULT_BUNDLE_DIRECTORY,
+    GENERAL_BUNDLE,
+    bot_sources,
+    compile_bundle,
+    content_hashes,
+    discover_bots,
+    fingerprint_files,
+    general_sources,
+    load_bundle,
+)
+from lore_index import LoreIndex, read_lore_documents
+from lore_loader import BASE_SYSTEM_INSTRUCTION
+
+
+@dataclass
+class BotEntry:
+    """Everything a voice session needs to know about a bot, preloaded"""
+
+    name: str
+    system_instruction: str
+    voice_id: str
+    light_config: LightConfig
+    config: Dict = field(default_factory=dict)  # raw config.json content
+    lore_size: int = 0
+    source_hash: str = ""
+    lore_index: Optional[LoreIndex] = None  # set in "retrieval" lore mode
+    size_report: Dict = field(default_factory=dict)  # see build_size_report
+
+
+class BotRegistry:
+    """
+    Process-wide cache of bot configurations.
+
+    Loads the assembled system prompt, voice id and light config of every bot
+    in lore/bots once, so connecting to /ws does no file I/O. Prebuilt bundles
+    from lore_build.py are used when fresh; otherwise the bot is compiled from
+    raw text. A background task watches the source files and rebuilds a bot
+    only when one of its files actually changed (mtime/size first, content
+    hash to confirm).
+    """
+
+    def __init__(
+        self,
+        base_prompt: str = BASE_SYSTEM_INSTRUCTION,
+        lore_directory: str = "lore",
+        reload_interval: Optional[float] = None,
+        bundle_directory: Optional[str] = None,
+    ):
+        self.base_prompt = base_prompt
+        self.lore_directory = lore_directory
+        self.bundle_directory = bundle_directory or os.getenv(
+            "LORE_BUNDLE_DIR", DEFAULT_BUNDLE_DIRECTORY
+        )
+        self.reload_interval = (
+            reload_interval
+            if reload_interval is not None
+            else float(os.getenv("LORE_RELOAD_INTERVAL_SECONDS", "5"))
+        )
+        self.logger = logger.bind(component="bot_registry")
+
+        self._entries: Dict[str, BotEntry] = {}
+        self._fallback: Optional[BotEntry] = None
+        self._sources: Dict[str, Dict[str, list]] = {}
+        self._general_documents: Optional[list] = None
+        self._watch_task: Optional[asyncio.Task] = None
+
+    # ------------------------------------------------------------------
+    # Lookup (hot path, no I/O)
+    # ------------------------------------------------------------------
+
+    def bot_names(self) -> List[str]:
+        """Sorted names of all known bots"""
+        return sorted(self._entries)
+
+    def has_bot(self, name: str) -> bool:
+        return name in self._entries
+
+    def get(self, name: str) -> BotEntry:
+        """Return the entry for a bot, or a general-lore fallback for unknown bots"""
+        entry = self._entries.get(name)
+        if entry is not None:
+            return entry
+
+        # Unknown bots get the general lore and use their name as voice id,
+        # matching the behaviour of a bot directory without config.json
+        fallback = self._fallback
+        return BotEntry(
+            name=name,
+            system_instruction=fallback.system_instruction if fallback else "",
+            voice_id=name,
+            light_config=parse_light_config({}),
+            lore_size=fallback.lore_size if fallback else 0,
+            source_hash=fallback.source_hash if fallback else "",
+            size_report=fallback.size_report if fallback else {},
+        )
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+
+    def load_all(self):
+        """Load the general lore and every bot, preferring fresh bundles (blocking)"""
+        self._general_documents = None
+        self._sources = {}
+        from_bundle = []
+
+        bundle = self._load_or_compile(GENERAL_BUNDLE, from_bundle)
+        self._fallback = self._entry_from_bundle(bundle)
+
+        entries = {}
+        for name in discover_bots(self.lore_directory):
+            entries[name] = self._entry_from_bundle(
+                self._load_or_compile(name, from_bundle)
+            )
+
+        self._entries = entries
+        self._general_documents = None  # only needed while compiling
+        self.logger.info(
+            f"Bot registry loaded {len(entries)} bots: {sorted(entries)}"
+            f" ({len(from_bundle)} of {len(entries) + 1} from prebuilt bundles)"
+        )
+
+    def reload_changed(self) -> List[str]:
+        """
+        Rebuild the bots whose source files changed since the last load (blocking).
+
+        Returns:
+            List[str]: Names of the bots that were added, rebuilt or removed
+        """
+        self._general_documents = None
+        entries = dict(self._entries)
+        changed = []
+
+        if self._sources_changed(GENERAL_BUNDLE):
+            self._fallback = self._entry_from_bundle(self._compile(GENERAL_BUNDLE))
+
+        names = discover_bots(self.lore_directory)
+        for name in names:
+            if self._sources_changed(name):
+                entries[name] = self._entry_from_bundle(self._compile(name))
+                changed.append(name)
+
+        for name in set(entries) - set(names):
+            del entries[name]
+            self._sources.pop(name, None)
+            changed.append(name)
+
+        # Swap in one assignment so readers never see a half-updated mapping
+        self._entries = entries
+        self._general_documents = None
+        if changed:
+            self.logger.info(f"Bot registry reloaded: {sorted(changed)}")
+        return changed
+
+    def _load_or_compile(self, name: str, from_bundle: List[str]) -> Dict:
+        bundle = load_bundle(
+            name, self.bundle_directory, self.lore_directory, self.base_prompt
+        )
+        if bundle is None:
+            return self._compile(name)
+        from_bundle.append(name)
+        self._sources[name] = bundle["sources"]
+        return bundle
+
+    def _compile(self, name: str) -> Dict:
+        if self._general_documents is None:
+            self._general_documents = read_lore_documents(
+                general_sources(self.lore_directory), self.lore_directory
+            )
+        bundle = compile_bundle(
+            name, self.base_prompt, self.lore_directory, self._general_documents
+        )
+        self._sources[name] = bundle["sources"]
+        return bundle
+
+    def _entry_from_bundle(self, bundle: Dict) -> BotEntry:
+        config = bundle.get("config", {})
+        return BotEntry(
+            name=bundle["bot"],
+            system_instruction=bundle["system_instruction"],
+            voice_id=bundle.get("voice_id", bundle["bot"]),
+            light_config=parse_light_config(config.get("light_config", {})),
+            config=config,
+            lore_size=bundle.get("lore_size", 0),
+            source_hash=bundle.get("source_hash", ""),
+            lore_index=(
+                LoreIndex.from_dict(bundle["index"]) if bundle.get("index") else None
+            ),
+            size_report=bundle.get("size_report", {}),
+        )
+
+    # ------------------------------------------------------------------
+    # Change detection
+    # ------------------------------------------------------------------
+
+    def _sources_changed(self, name: str) -> bool:
+        """Refingerprint a bot's sources; True if any content hash changed"""
+        if name == GENERAL_BUNDLE:
+            paths = general_sources(self.lore_directory)
+        else:
+            paths = bot_sources(name, self.lore_directory)
+
+        previous = self._sources.get(name)
+        current = fingerprint_files(paths, self.lore_directory, previous)
+        self._sources[name] = current
+        if previous is None:
+            return True
+        return content_hashes(current) != content_hashes(previous)
+
+    # ------------------------------------------------------------------
+    # Background lifecycle
+    # ------------------------------------------------------------------
+
+    async def start(self):
+        """Load all bots off the event loop and start watching for changes"""
+        await asyncio.to_thread(self.load_all)
+        if self.reload_interval > 0 and not self._watch_task:
+            self._watch_task = asyncio.create_task(self._watch_loop())
+
+    async def stop(self):
+        if self._watch_task and not self._watch_task.done():
+            self._watch_task.cancel()
+            try:
+                await self._watch_task
+            except asyncio.CancelledError:
+                pass
+        self._watch_task = None
+
+    async def _watch_loop(self):
+        try:
+            while True:
+                await asyncio.sleep(self.reload_interval)
+                try:
+                    await asyncio.to_thread(self.reload_changed)
+                except Exception as e:
+                    self.logger.error(f"Error reloading bot registry: {e}")
+        except asyncio.CancelledError:
+            pass
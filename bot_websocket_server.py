@@ -29,9 +29,6 @@ from lore_loader import (
     print_prompt_sizes,
 )
 
-# Load lore files and create enhanced system prompt
-lore_content = load_lore_files()
-
 BASE_SYSTEM_INSTRUCTION = f"""
 Du bist ein arkanes Kristallwesen in einer Fantasy Welt.
 Du steckst in einem Kristall in einem Bergwergsschacht auf der Insel Quantum.
@@ -41,13 +38,6 @@ Sei lustig, aber komisch und verwirrend. Du kannst Fragen beantworten, aber auch
 Halte deine Antworten kurz und prägnant (maximal 2-3 Sätze).
 """
 
-SYSTEM_INSTRUCTION = create_enhanced_system_prompt(
-    BASE_SYSTEM_INSTRUCTION, lore_content
-)
-
-# Print size analysis
-print_prompt_sizes(BASE_SYSTEM_INSTRUCTION, lore_content)
-
 
 async def run_bot_websocket_server():
     ws_transport = WebsocketServerTransport(
@@ -66,7 +56,13 @@ async def run_bot_websocket_server():
     # We'll use a default bot configuration for now
     # Individual bot configurations will be handled per connection
     voice_id = "Puck"
-    system_instruction = SYSTEM_INSTRUCTION
+
+    # Load lore only when this server mode is actually started
+    lore_content = load_lore_files()
+    system_instruction = create_enhanced_system_prompt(
+        BASE_SYSTEM_INSTRUCTION, lore_content
+    )
+    print_prompt_sizes(BASE_SYSTEM_INSTRUCTION, lore_content)
     print(f"Using default bot configuration: bot1, voice: {voice_id}")
 
     llm = GeminiMultimodalLiveLLMService(
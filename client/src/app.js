@@ -43,6 +43,13 @@ class WebsocketClientApp {
         this.debugLog = null;
         this.botSelect = null;
         this.lightWebSocket = null;
+        this.lightSession = null;
+        this.pairingToken = null;
+        // Light commands arrive as RTVI server messages on the voice connection,
+        // unless the legacy /light-ws socket is requested
+        this.useLightWebSocket = import.meta.env.VITE_LIGHT_WEBSOCKET === 'true';
+        this.lightEffect = null;
+        this.serverClockOffsetMs = null;
         this.lastServerUrl = '';
         this.lightAnimationInterval = null;
         this.currentDisplayedColor = { r: 0, g: 0, b: 0, a: 0 };
@@ -454,6 +461,7 @@ class WebsocketClientApp {
                         }
                     },
                     onBotTranscript: (data) => this.log(`Bot: ${data.text}`),
+                    onServerMessage: (data) => this.handleLightWebSocketMessage(data),
                     onMessageError: (error) => console.error('Message error:', error),
                     onError: (error) => {
                         console.error('Error:', error);
@@ -477,12 +485,17 @@ class WebsocketClientApp {
                 throw new Error('Bitte wähle zuerst ein mystisches Wesen aus');
             }
             this.log(`Connecting to bot: ${selectedBot}`);
-            const endpoint = `${serverUrl}/connect?bot=${selectedBot}`;
+            const lightsParam = this.useLightWebSocket ? '' : '&lights=effect1';
+            const endpoint = `${serverUrl}/connect?bot=${selectedBot}${lightsParam}`;
             this.log(`Using endpoint: ${endpoint}`);
-            await this.pcClient.startBotAndConnect({
+            // Start the bot, then connect; /connect also returns the token that
+            // pairs the light WebSocket with this voice session
+            const connectParams = await this.pcClient.startBot({
                 // The baseURL and endpoint of your bot server that the client will connect to
                 endpoint: endpoint,
             });
+            this.pairingToken = connectParams?.pairing_token ?? null;
+            await this.pcClient.connect(connectParams);
             const timeTaken = Date.now() - startTime;
             this.log(`Connection complete, timeTaken: ${timeTaken}`);
         }
@@ -547,18 +560,38 @@ class WebsocketClientApp {
             else {
                 this.log('⚠️ Shelly device not available, lights will only animate in UI');
             }
+            if (!this.useLightWebSocket) {
+                this.log('💡 Light commands arrive on the voice connection');
+                return;
+            }
             const wsUrl = serverUrl.replace('http://', 'ws://').replace('https://', 'wss://');
-            const lightWsUrl = `${wsUrl}/light-ws?bot=${selectedBot}`;
+            // Ask for the effect descriptor and render the animation locally
+            // (see light_protocol.py); bin1 color frames are handled as well
+            const tokenParam = this.pairingToken ? `&token=${encodeURIComponent(this.pairingToken)}` : '';
+            const lightWsUrl = `${wsUrl}/light-ws?bot=${selectedBot}&proto=effect1${tokenParam}`;
             this.log(`🔌 Setting up light control WebSocket: ${lightWsUrl}`);
+            this.lightSession = null;
+            this.lightEffect = null;
+            this.serverClockOffsetMs = null;
             this.lightWebSocket = new WebSocket(lightWsUrl);
+            this.lightWebSocket.binaryType = 'arraybuffer';
             this.lightWebSocket.onopen = () => {
                 this.log('🔌 Light control WebSocket connected');
             };
             this.lightWebSocket.onmessage = (event) => {
+                if (event.data instanceof ArrayBuffer) {
+                    this.handleLightFrames(event.data);
+                    return;
+                }
                 this.log(`🔌 Light control message received: ${event.data}`);
                 console.log('🔌 Raw light WebSocket message:', event.data);
                 try {
                     const data = JSON.parse(event.data);
+                    if (data.type === 'ping') {
+                      // Heartbeat: answering keeps the light socket open
+                      this.lightWebSocket?.send(JSON.stringify({ type: 'pong', timestamp: data.timestamp }));
+                      return;
+                    }
                     console.log('🔌 Parsed light control data:', data);
                     this.handleLightWebSocketMessage(data);
                 }
@@ -583,11 +616,25 @@ class WebsocketClientApp {
      */
     handleLightWebSocketMessage(message) {
         console.log('🎨 Processing light WebSocket message:', message);
-        if (message.type === 'speaking_start') {
+        if (message.type === 'light_session') {
+            this.log(`🔌 Light protocol ${message.protocol} for ${message.bot_config}`);
+            this.lightSession = message;
+            if (message.effect) {
+                this.lightEffect = message.effect;
+                this.updateServerClock(message.server_time);
+            }
+        }
+        else if (message.type === 'speaking_start') {
             this.log(`🎤 Bot started speaking: ${message.bot_config}`);
             console.log('🎤 Speaking started, beginning light animation');
             // Start local light animation
-            this.startLightAnimation(message.bot_config);
+            if (this.lightEffect) {
+                this.updateServerClock(message.timestamp);
+                this.runEffectAnimation(message.bot_config, this.lightEffect, message.timestamp);
+            }
+            else {
+                this.startLightAnimation(message.bot_config);
+            }
         }
         else if (message.type === 'speaking_stop') {
             this.log(`🔇 Bot stopped speaking: ${message.bot_config}`);
@@ -614,6 +661,43 @@ class WebsocketClientApp {
             console.log('📡 Non-light command message:', message);
         }
     }
+    /**
+     * Handle a binary message of color frames (bin1 protocol, see light_protocol.py):
+     * a <type, count> header followed by 7-byte frames of
+     * <sequence u16 LE, flags, red, green, blue, white>
+     */
+    handleLightFrames(buffer) {
+        const session = this.lightSession;
+        const view = new DataView(buffer);
+        if (!session || view.getUint8(0) !== 0x01) {
+            console.warn('⚠️ Unexpected binary light message');
+            return;
+        }
+        const count = view.getUint8(1);
+        for (let i = 0; i < count; i++) {
+            const offset = 2 + i * 7;
+            const message = {
+                type: 'light_command',
+                bot_config: session.bot_config,
+                shelly_ip: session.shelly_ip,
+                command: {
+                    turn: view.getUint8(offset + 2) & 0x01 ? 'on' : 'off',
+                    mode: session.mode,
+                    red: view.getUint8(offset + 3),
+                    green: view.getUint8(offset + 4),
+                    blue: view.getUint8(offset + 5),
+                    white: view.getUint8(offset + 6)
+                }
+            };
+            // Batched frames are consecutive animation frames; replay them at 30 FPS
+            if (i === 0) {
+                this.handleLightWebSocketMessage(message);
+            }
+            else {
+                setTimeout(() => this.handleLightWebSocketMessage(message), (i * 1000) / 30);
+            }
+        }
+    }
     /**
      * Start local light animation for a bot
      */
@@ -659,6 +743,65 @@ class WebsocketClientApp {
             this.updateColorDisplay(animatedColor);
         }, 1000 / 30); // 10 FPS
     }
+    /**
+     * Track the server clock from message timestamps. Each sample is low by the
+     * network latency, so the largest one is the best estimate.
+     */
+    updateServerClock(serverTime) {
+        if (typeof serverTime !== 'number')
+            return;
+        const sample = serverTime * 1000 - Date.now();
+        if (this.serverClockOffsetMs === null || sample > this.serverClockOffsetMs) {
+            this.serverClockOffsetMs = sample;
+        }
+    }
+    /**
+     * Render the server's effect descriptor locally, timed from the
+     * speaking_start timestamp on the server clock
+     */
+    runEffectAnimation(botConfig, effect, startServerTime) {
+        if (this.lightAnimationInterval) {
+            clearInterval(this.lightAnimationInterval);
+        }
+        const offsetMs = this.serverClockOffsetMs ?? 0;
+        this.lightAnimationInterval = setInterval(() => {
+            const elapsed = Math.max(0, (Date.now() + offsetMs) / 1000 - startServerTime);
+            const animatedColor = this.calculateEffectColor(effect, elapsed);
+            this.applyLightColor(botConfig, animatedColor);
+            this.updateColorDisplay(animatedColor);
+        }, 1000 / 30);
+    }
+    /**
+     * Same formulas as CrystalLightController._calculate_animated_color
+     */
+    calculateEffectColor(effect, elapsed) {
+        const phases = effect.phases;
+        let shift = 0;
+        if (effect.variation_intensity > 0) {
+            const phase = phases.color_shift;
+            const speed = effect.color_shift_speed;
+            const combined = (Math.sin(phase + elapsed * speed) * 0.4 +
+                Math.sin(phase + elapsed * speed * 1.3) * 0.3 +
+                Math.sin(phase + elapsed * speed * 0.7) * 0.3) / 3;
+            shift = ((combined + 1) / 2) * effect.variation_intensity;
+        }
+        let pulse = 1;
+        if (effect.pulse_intensity > 0) {
+            pulse = Math.max(0.3, 1 + Math.sin(phases.pulse + elapsed * effect.pulse_speed) * effect.pulse_intensity);
+        }
+        let breathing = 1;
+        if (effect.breathing_effect && effect.breathing_intensity > 0) {
+            breathing = Math.max(0.5, 1 + Math.sin(phases.breathing + elapsed * effect.breathing_speed) * effect.breathing_intensity);
+        }
+        const base = this.lerpColor(effect.primary_color, effect.fade_to_color, shift);
+        const factor = pulse * breathing;
+        return this.clampColor({
+            r: base.r * factor,
+            g: base.g * factor,
+            b: base.b * factor,
+            a: base.a * factor
+        });
+    }
     /**
      * Calculate animated color with enhanced variation
      */
@@ -0,0 +1,312 @@
+#
+# Copyright (c) 2025, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+import asyncio
+import hashlib
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import aiohttp
+from loguru import logger
+from pipecat.services.gemini_multimodal_live import (
+    GeminiMultimodalLiveLLMService,
+    events,
+)
+from websockets.exceptions import ConnectionClosed
+
+from lore_loader import estimate_tokens
+
+DEFAULT_API_URL = "https://generativelanguage.googleapis.com/v1beta"
+
+# Explicit caches below this size are rejected by the API and not worth it
+MIN_CACHE_TOKENS = 4096
+
+# Do not retry a failed cache creation for a bot before this many seconds
+FAILURE_BACKOFF_SECONDS = 60.0
+
+
+@dataclass
+class CachedContext:
+    """A server-side cached system instruction of one bot"""
+
+    name: str  # "cachedContents/..." handle
+    content_hash: str
+    expires_at: float  # time.monotonic() based
+    last_used: float
+
+
+class ContextCacheManager:
+    """
+    Per-bot explicit context caches for the Gemini API.
+
+    The system instruction of a bot is identical for every player, so it is
+    uploaded once as cached content and new sessions only pass the handle.
+    Handles are refreshed before their TTL runs out as long as the bot is in
+    use, recreated when the bot's prompt changes (e.g. after a lore reload)
+    and deleted on stop. Any API failure falls back to the raw text.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        model: str,
+        ttl_seconds: float = 3600.0,
+        refresh_margin_seconds: float = 300.0,
+        api_url: str = DEFAULT_API_URL,
+        min_tokens: int = MIN_CACHE_TOKENS,
+    ):
+        self.api_key = api_key
+        self.model = model
+        self.ttl_seconds = ttl_seconds
+        self.refresh_margin_seconds = min(refresh_margin_seconds, ttl_seconds / 2)
+        self.api_url = api_url.rstrip("/")
+        self.min_tokens = min_tokens
+        self.logger = logger.bind(component="context_cache")
+
+        self._contexts: Dict[str, CachedContext] = {}
+        self._failures: Dict[str, float] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_env(cls, model: str) -> Optional["ContextCacheManager"]:
+        """Create a manager if GEMINI_CONTEXT_CACHE is enabled, else None"""
+        if os.getenv("GEMINI_CONTEXT_CACHE", "0").lower() not in ("1", "true", "yes"):
+            return None
+        api_key = os.getenv("GOOGLE_API_KEY")
+        if not api_key:
+            return None
+        return cls(
+            api_key,
+            model,
+            ttl_seconds=float(os.getenv("GEMINI_CONTEXT_CACHE_TTL_SECONDS", "3600")),
+        )
+
+    # ------------------------------------------------------------------
+    # Session hot path
+    # ------------------------------------------------------------------
+
+    async def get_handle(self, bot_name: str, system_instruction: str) -> Optional[str]:
+        """
+        Return a cached content handle for a bot's system instruction.
+
+        Creates the cache on first use and whenever the instruction changed.
+
+        Returns:
+            Optional[str]: The handle, or None to send the raw text instead
+        """
+        content_hash = hashlib.sha256(system_instruction.encode("utf-8")).hexdigest()
+        context = self._usable(bot_name, content_hash)
+        if context:
+            return context.name
+
+        failed_at = self._failures.get(bot_name)
+        if failed_at and time.monotonic() - failed_at < FAILURE_BACKOFF_SECONDS:
+            return None
+        if estimate_tokens(system_instruction) < self.min_tokens:
+            return None
+
+        lock = self._locks.setdefault(bot_name, asyncio.Lock())
+        async with lock:
+            # Another session may have created it while we waited
+            context = self._usable(bot_name, content_hash)
+            if context:
+                return context.name
+            previous = self._contexts.get(bot_name)
+            try:
+                context = await self._create(bot_name, system_instruction, content_hash)
+            except Exception as e:
+                self._failures[bot_name] = time.monotonic()
+                self.logger.warning(f"Context cache for {bot_name} unavailable: {e}")
+                return None
+            self._failures.pop(bot_name, None)
+            self._contexts[bot_name] = context
+            if previous is not None:
+                await self._delete(previous.name)
+            return context.name
+
+    def reject(self, bot_name: str, name: str):
+        """
+        A Live session refused the handle: forget it and send the raw text
+        until the failure backoff has passed
+        """
+        context = self._contexts.get(bot_name)
+        if context is not None and context.name == name:
+            self._contexts.pop(bot_name)
+        self._failures[bot_name] = time.monotonic()
+        self.logger.warning(f"Context cache {name} for {bot_name} was rejected")
+
+    def _usable(self, bot_name: str, content_hash: str) -> Optional[CachedContext]:
+        context = self._contexts.get(bot_name)
+        now = time.monotonic()
+        if (
+            context is None
+            or context.content_hash != content_hash
+            or context.expires_at - now < self.refresh_margin_seconds / 2
+        ):
+            return None
+        context.last_used = now
+        return context
+
+    # ------------------------------------------------------------------
+    # Gemini cachedContents API
+    # ------------------------------------------------------------------
+
+    async def _request(self, method: str, path: str, **kwargs) -> Dict:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=30)
+            )
+        url = f"{self.api_url}/{path}"
+        params = {"key": self.api_key, **kwargs.pop("params", {})}
+        async with self._session.request(method, url, params=params, **kwargs) as r:
+            if r.status >= 400:
+                raise RuntimeError(f"{method} {path}: {r.status} {await r.text()}")
+            return await r.json(content_type=None) or {}
+
+    async def _create(
+        self, bot_name: str, system_instruction: str, content_hash: str
+    ) -> CachedContext:
+        start_time = time.perf_counter()
+        response = await self._request(
+            "POST",
+            "cachedContents",
+            json={
+                "model": self.model,
+                "displayName": f"lore-{bot_name}-{content_hash[:12]}",
+                "systemInstruction": {"parts": [{"text": system_instruction}]},
+                "ttl": f"{int(self.ttl_seconds)}s",
+            },
+        )
+        now = time.monotonic()
+        self.logger.info(
+            f"Created context cache {response['name']} for {bot_name}"
+            f" in {time.perf_counter() - start_time:.2f}s"
+        )
+        return CachedContext(
+            name=response["name"],
+            content_hash=content_hash,
+            expires_at=now + self.ttl_seconds,
+            last_used=now,
+        )
+
+    async def _extend(self, context: CachedContext):
+        await self._request(
+            "PATCH",
+            context.name,
+            params={"updateMask": "ttl"},
+            json={"ttl": f"{int(self.ttl_seconds)}s"},
+        )
+        context.expires_at = time.monotonic() + self.ttl_seconds
+
+    async def _delete(self, name: str):
+        try:
+            await self._request("DELETE", name)
+        except Exception as e:
+            self.logger.debug(f"Could not delete context cache {name}: {e}")
+
+    # ------------------------------------------------------------------
+    # Background lifecycle
+    # ------------------------------------------------------------------
+
+    async def refresh_expiring(self):
+        """Extend caches that expire soon and were used within the last TTL"""
+        now = time.monotonic()
+        for bot_name, context in list(self._contexts.items()):
+            if context.expires_at - now > self.refresh_margin_seconds:
+                continue
+            if now - context.last_used > self.ttl_seconds:
+                # Idle bot: let the cache expire on the server
+                self._contexts.pop(bot_name, None)
+                continue
+            try:
+                await self._extend(context)
+            except Exception as e:
+                self._contexts.pop(bot_name, None)
+                self.logger.warning(f"Could not refresh cache for {bot_name}: {e}")
+
+    async def start(self):
+        if not self._refresh_task:
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._refresh_task and not self._refresh_task.done():
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+        self._refresh_task = None
+        for context in list(self._contexts.values()):
+            await self._delete(context.name)
+        self._contexts.clear()
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _refresh_loop(self):
+        try:
+            while True:
+                await asyncio.sleep(self.refresh_margin_seconds / 2)
+                await self.refresh_expiring()
+        except asyncio.CancelledError:
+            pass
+
+
+class CachedContextGeminiLiveService(GeminiMultimodalLiveLLMService):
+    """
+    Gemini Live service that sends a cached content handle instead of the raw
+    system instruction when one is available.
+
+    If the connection closes before the setup completed, the handle is
+    dropped and the service reconnects with the raw system instruction.
+
+    Events:
+        on_cached_content_rejected(service, name)
+    """
+
+    def __init__(self, *, cached_content: Optional[str] = None, **kwargs):
+        super().__init__(**kwargs)
+        self._cached_content = cached_content
+        self._register_event_handler("on_cached_content_rejected", sync=True)
+
+    async def send_client_event(self, event):
+        if not self._cached_content or not isinstance(event, events.Config):
+            await super().send_client_event(event)
+            return
+
+        message = event.model_dump(exclude_none=True)
+        message["setup"].pop("system_instruction", None)
+        message["setup"]["cached_content"] = self._cached_content
+        await self._ws_send(message)
+
+    async def _receive_task_handler(self):
+        error = None
+        try:
+            await super()._receive_task_handler()
+        except ConnectionClosed as e:
+            error = e
+        if (
+            self._cached_content
+            and not self._api_session_ready
+            and not self._disconnecting
+        ):
+            await self._reconnect_without_cache(error)
+        elif error is not None:
+            raise error
+
+    async def _reconnect_without_cache(self, error: Optional[Exception]):
+        name = self._cached_content
+        self._cached_content = None
+        logger.warning(
+            f"{self} setup with {name} failed ({error or 'connection closed'}),"
+            " reconnecting with the system instruction"
+        )
+        await self._call_event_handler("on_cached_content_rejected", name)
+        self._websocket = None
+        await self._connect()
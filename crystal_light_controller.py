@@ -3,18 +3,28 @@
 #
 # SPDX-License-Identifier: BSD 2-Clause License
 #
-import asyncio
 import json
 import math
 import random
 import time
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 
-import aiohttp
 from loguru import logger
 
+from audio_envelope import AudioEnvelope
+from dmx_output import DEFAULT_UNIVERSES, check_dmx_address, dmx_output_protocol
+from light_animation import get_animation_scheduler
+from light_effects import (
+    MAX_PHASES,
+    CompiledEffect,
+    compile_effect,
+    effect_key,
+    parse_layers,
+)
+from light_protocol import LightSession, color_command, effect_descriptor
+
 
 @dataclass
 class Color:
@@ -78,6 +88,130 @@ class LightConfig:
     breathing_speed: float  # Speed of breathing
     breathing_intensity: float  # Intensity of breathing
     shelly_ip: str  # IP address of Shelly device
+    dmx_universe: int = 0  # Art-Net / sACN universe (sACN default: 1)
+    dmx_channel: Optional[int] = None  # First of 4 DMX channels (R, G, B, W)
+    priority: int = 0  # Precedence on a shared device (LIGHT_HUB_POLICY=priority)
+    min_delta_e: float = 3.0  # Smallest CIELAB difference worth sending
+    max_update_rate: float = 10.0  # Commands per second at most
+    keyframe_interval: float = 1.0  # Send smaller changes at least this often
+    layers: Optional[List[Dict]] = None  # Effect stack; None: the classic one above
+    _effect: Optional[CompiledEffect] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+
+    def __post_init__(self):
+        # Compile at load time, so sessions only share the result
+        self._effect = compile_effect(self)
+
+    @property
+    def effect(self) -> CompiledEffect:
+        """The compiled layer stack, recompiled if the config was changed"""
+        if self._effect.key != effect_key(self):
+            self._effect = compile_effect(self)
+        return self._effect
+
+
+def default_light_config() -> LightConfig:
+    """Get default light configuration"""
+    return LightConfig(
+        primary_color=Color(0.8, 0.2, 1.0, 1.0),  # Purple
+        fade_to_color=Color(0.2, 1.0, 0.8, 1.0),  # Complementary cyan
+        off_color=Color(0.0, 0.0, 0.0, 0.0),  # Black/off
+        variation_intensity=0.3,
+        color_shift_speed=2.0,
+        pulse_intensity=0.2,
+        pulse_speed=1.5,
+        breathing_effect=True,
+        breathing_speed=0.8,
+        breathing_intensity=0.15,
+        shelly_ip="192.168.2.77",
+    )
+
+
+def parse_light_config(
+    light_config_data: Dict, dmx_protocol: Optional[str] = None
+) -> LightConfig:
+    """
+    Build a LightConfig from the "light_config" section of a bot config.json.
+
+    The DMX address is checked against dmx_protocol (default: DMX_OUTPUT); an
+    invalid one disables DMX for the bot with a warning.
+    """
+    if not light_config_data:
+        return default_light_config()
+
+    dmx_protocol = dmx_protocol or dmx_output_protocol()
+    dmx_universe = light_config_data.get(
+        "dmx_universe", DEFAULT_UNIVERSES.get(dmx_protocol, 0)
+    )
+    dmx_channel = light_config_data.get("dmx_channel")
+    if dmx_channel is not None:
+        try:
+            check_dmx_address(dmx_protocol, dmx_universe, dmx_channel)
+        except ValueError as e:
+            logger.warning(f"⚠️ DMX disabled for this light config: {e}")
+            dmx_channel = None
+
+    # Parse colors
+    primary_color_data = light_config_data.get("primary_color", {})
+    fade_to_color_data = light_config_data.get("fade_to_color", {})
+    off_color_data = light_config_data.get("off_color", {})
+
+    primary_color = Color(
+        primary_color_data.get("r", 0.8),
+        primary_color_data.get("g", 0.2),
+        primary_color_data.get("b", 1.0),
+        primary_color_data.get("a", 1.0),
+    )
+
+    # If no fade_to_color specified, create a complementary color
+    if not fade_to_color_data:
+        # Create a complementary color by shifting hue
+        fade_to_color = Color(
+            primary_color_data.get("g", 0.2),  # Use G as R
+            primary_color_data.get("b", 1.0),  # Use B as G
+            primary_color_data.get("r", 0.8),  # Use R as B
+            primary_color_data.get("a", 1.0),
+        )
+    else:
+        fade_to_color = Color(
+            fade_to_color_data.get("r", 0.2),
+            fade_to_color_data.get("g", 1.0),
+            fade_to_color_data.get("b", 0.8),
+            fade_to_color_data.get("a", 1.0),
+        )
+
+    off_color = Color(
+        off_color_data.get("r", 0.0),
+        off_color_data.get("g", 0.0),
+        off_color_data.get("b", 0.0),
+        off_color_data.get("a", 0.0),
+    )
+
+    return LightConfig(
+        primary_color=primary_color,
+        fade_to_color=fade_to_color,
+        off_color=off_color,
+        variation_intensity=light_config_data.get("variation_intensity", 0.3),
+        color_shift_speed=light_config_data.get("color_shift_speed", 2.0),
+        pulse_intensity=light_config_data.get("pulse_intensity", 0.2),
+        pulse_speed=light_config_data.get("pulse_speed", 1.5),
+        breathing_effect=light_config_data.get("breathing_effect", True),
+        breathing_speed=light_config_data.get("breathing_speed", 0.8),
+        breathing_intensity=light_config_data.get("breathing_intensity", 0.15),
+        shelly_ip=light_config_data.get("shelly_ip", "192.168.2.77"),
+        dmx_universe=dmx_universe,
+        dmx_channel=dmx_channel,
+        priority=light_config_data.get("priority", 0),
+        min_delta_e=light_config_data.get("min_delta_e", 3.0),
+        max_update_rate=light_config_data.get("max_update_rate", 10.0),
+        keyframe_interval=light_config_data.get("keyframe_interval", 1.0),
+        layers=(
+            parse_layers(light_config_data["layers"])
+            if "layers" in light_config_data
+            else None
+        ),
+    )
 
 
 class CrystalLightController:
@@ -86,13 +220,21 @@ class CrystalLightController:
     Inspired by Unity's SpeakingCrystal and LightController scripts.
     """
 
-    def __init__(self, bot_config: str, connection_id: str):
+    def __init__(
+        self,
+        bot_config: str,
+        connection_id: str,
+        config: Optional[LightConfig] = None,
+        session_entry=None,
+    ):
         self.bot_config = bot_config
         self.connection_id = connection_id
+        # SessionEntry of the voice session; holds its light sockets
+        self.session_entry = session_entry
         self.logger = logger.bind(connection=connection_id, bot=bot_config)
 
-        # Load configuration
-        self.config = self._load_light_config()
+        # Use the preloaded configuration if given, otherwise read it from disk
+        self.config = config or self._load_light_config()
 
         # State management
         self.is_speaking = False
@@ -100,14 +242,18 @@ class CrystalLightController:
         self.current_color = self.config.off_color
         self.target_color = self.config.primary_color
 
-        # Animation state
-        self.color_shift_phase = random.uniform(0, 2 * math.pi)
-        self.pulse_phase = random.uniform(0, 2 * math.pi)
-        self.breathing_phase = random.uniform(0, 2 * math.pi)
+        # Animation state: one phase per periodic effect layer (the classic
+        # stack uses color shift, pulse, breathing)
+        self.phases = [random.uniform(0, 2 * math.pi) for _ in range(MAX_PHASES)]
 
-        # Task management
-        self.light_task: Optional[asyncio.Task] = None
-        self.session: Optional[aiohttp.ClientSession] = None
+        # Whether a light socket is attached; None until first checked
+        self.has_light_consumer: Optional[bool] = None
+
+        # Loudness of the bot's TTS audio, if an effect layer follows it
+        audio_layer = self.config.effect.audio
+        self.audio_envelope: Optional[AudioEnvelope] = (
+            AudioEnvelope.from_layer(audio_layer) if audio_layer else None
+        )
 
     def _load_light_config(self) -> LightConfig:
         """Load light configuration from bot config file"""
@@ -117,7 +263,7 @@ class CrystalLightController:
             self.logger.warning(
                 f"Config file {config_file} not found, using default light config"
             )
-            return self._get_default_config()
+            return default_light_config()
 
         try:
             with open(config_file, "r", encoding="utf-8") as f:
@@ -128,81 +274,13 @@ class CrystalLightController:
                     self.logger.warning(
                         f"No light_config found in {config_file}, using default"
                     )
-                    return self._get_default_config()
-
-                # Parse colors
-                primary_color_data = light_config_data.get("primary_color", {})
-                fade_to_color_data = light_config_data.get("fade_to_color", {})
-                off_color_data = light_config_data.get("off_color", {})
-
-                primary_color = Color(
-                    primary_color_data.get("r", 0.8),
-                    primary_color_data.get("g", 0.2),
-                    primary_color_data.get("b", 1.0),
-                    primary_color_data.get("a", 1.0),
-                )
-
-                # If no fade_to_color specified, create a complementary color
-                if not fade_to_color_data:
-                    # Create a complementary color by shifting hue
-                    fade_to_color = Color(
-                        primary_color_data.get("g", 0.2),  # Use G as R
-                        primary_color_data.get("b", 1.0),  # Use B as G
-                        primary_color_data.get("r", 0.8),  # Use R as B
-                        primary_color_data.get("a", 1.0),
-                    )
-                else:
-                    fade_to_color = Color(
-                        fade_to_color_data.get("r", 0.2),
-                        fade_to_color_data.get("g", 1.0),
-                        fade_to_color_data.get("b", 0.8),
-                        fade_to_color_data.get("a", 1.0),
-                    )
+                    return default_light_config()
 
-                off_color = Color(
-                    off_color_data.get("r", 0.0),
-                    off_color_data.get("g", 0.0),
-                    off_color_data.get("b", 0.0),
-                    off_color_data.get("a", 0.0),
-                )
-
-                return LightConfig(
-                    primary_color=primary_color,
-                    fade_to_color=fade_to_color,
-                    off_color=off_color,
-                    variation_intensity=light_config_data.get(
-                        "variation_intensity", 0.3
-                    ),
-                    color_shift_speed=light_config_data.get("color_shift_speed", 2.0),
-                    pulse_intensity=light_config_data.get("pulse_intensity", 0.2),
-                    pulse_speed=light_config_data.get("pulse_speed", 1.5),
-                    breathing_effect=light_config_data.get("breathing_effect", True),
-                    breathing_speed=light_config_data.get("breathing_speed", 0.8),
-                    breathing_intensity=light_config_data.get(
-                        "breathing_intensity", 0.15
-                    ),
-                    shelly_ip=light_config_data.get("shelly_ip", "192.168.2.77"),
-                )
+                return parse_light_config(light_config_data)
 
         except Exception as e:
             self.logger.error(f"Error loading light config: {e}")
-            return self._get_default_config()
-
-    def _get_default_config(self) -> LightConfig:
-        """Get default light configuration"""
-        return LightConfig(
-            primary_color=Color(0.8, 0.2, 1.0, 1.0),  # Purple
-            fade_to_color=Color(0.2, 1.0, 0.8, 1.0),  # Complementary cyan
-            off_color=Color(0.0, 0.0, 0.0, 0.0),  # Black/off
-            variation_intensity=0.3,
-            color_shift_speed=2.0,
-            pulse_intensity=0.2,
-            pulse_speed=1.5,
-            breathing_effect=True,
-            breathing_speed=0.8,
-            breathing_intensity=0.15,
-            shelly_ip="192.168.2.77",
-        )
+            return default_light_config()
 
     async def start_speaking(self):
         """Start the speaking light effect"""
@@ -214,15 +292,9 @@ class CrystalLightController:
 
         self.logger.info("Starting speaking light effect")
 
-        # Initialize HTTP session if not exists
-        if not self.session:
-            self.session = aiohttp.ClientSession()
-
-        # Start the light animation task
-        if self.light_task and not self.light_task.done():
-            self.light_task.cancel()
-
-        self.light_task = asyncio.create_task(self._light_animation_loop())
+        # Animate together with all other speaking controllers, if a light
+        # socket wants the colors
+        self.update_light_demand()
 
     async def stop_speaking(self):
         """Stop the speaking light effect and return to off state"""
@@ -233,112 +305,28 @@ class CrystalLightController:
 
         self.logger.info("Stopping speaking light effect")
 
-        # Cancel animation task
-        if self.light_task and not self.light_task.done():
-            self.light_task.cancel()
+        self.update_light_demand()
 
         # Set to off color
         await self._set_light_color(self.config.off_color)
 
-    async def _light_animation_loop(self):
-        """Main animation loop for speaking effects"""
-        try:
-            while self.is_speaking:
-                current_time = time.time()
-                elapsed_time = current_time - self.speaking_start_time
-
-                # Calculate animated color
-                animated_color = self._calculate_animated_color(elapsed_time)
-
-                # Apply the color
-                await self._set_light_color(animated_color)
-
-                # Update phases for next frame
-                self._update_animation_phases()
-
-                # Sleep for smooth animation (target ~30 FPS)
-                await asyncio.sleep(1.0 / 30.0)
+    def _calculate_animated_color(
+        self, elapsed_time: float, audio_level: float = 0.0
+    ) -> Color:
+        """
+        Calculate the current animated color from the bot's effect layers.
 
-        except asyncio.CancelledError:
-            self.logger.debug("Light animation loop cancelled")
-        except Exception as e:
-            self.logger.error(f"Error in light animation loop: {e}")
-
-    def _calculate_animated_color(self, elapsed_time: float) -> Color:
-        """Calculate the current animated color based on time and effects"""
-        # Color shifting effect - interpolate between primary and fade_to color
-        color_shift_factor = self._calculate_color_shift_factor(elapsed_time)
-        base_color = self.config.primary_color.lerp(
-            self.config.fade_to_color, color_shift_factor
+        Scalar reference of the batched AnimationScheduler.compute().
+        """
+        return Color(
+            *self.config.effect.color_at(elapsed_time, self.phases, audio_level)
         )
 
-        # Pulsing effect - brightness variation
-        pulse_factor = self._calculate_pulse_factor(elapsed_time)
-
-        # Breathing effect - alpha/intensity variation
-        breathing_factor = self._calculate_breathing_factor(elapsed_time)
-
-        # Apply brightness and breathing effects
-        final_color = base_color * pulse_factor * breathing_factor
-
-        return final_color.clamp()
-
-    def _calculate_color_shift_factor(self, elapsed_time: float) -> float:
-        """Calculate color shift factor for interpolation between primary and fade_to color"""
-        if self.config.variation_intensity <= 0:
+    def audio_level(self, now: float) -> float:
+        """Loudness (0-1) of the bot's TTS audio playing at time now"""
+        if self.audio_envelope is None:
             return 0.0
-
-        # Use multiple sine waves for complex color shifting
-        phase1 = self.color_shift_phase + elapsed_time * self.config.color_shift_speed
-        phase2 = (
-            self.color_shift_phase + elapsed_time * self.config.color_shift_speed * 1.3
-        )
-        phase3 = (
-            self.color_shift_phase + elapsed_time * self.config.color_shift_speed * 0.7
-        )
-
-        # Combine multiple sine waves for organic variation
-        shift1 = math.sin(phase1) * 0.4
-        shift2 = math.sin(phase2) * 0.3
-        shift3 = math.sin(phase3) * 0.3
-
-        # Combine shifts and scale by variation intensity
-        combined_shift = (shift1 + shift2 + shift3) / 3.0
-        shift_factor = (combined_shift + 1.0) / 2.0  # Normalize to 0-1 range
-
-        # Apply variation intensity
-        return shift_factor * self.config.variation_intensity
-
-    def _calculate_pulse_factor(self, elapsed_time: float) -> float:
-        """Calculate pulsing brightness factor"""
-        if self.config.pulse_intensity <= 0:
-            return 1.0
-
-        pulse_phase = self.pulse_phase + elapsed_time * self.config.pulse_speed
-        pulse = math.sin(pulse_phase) * self.config.pulse_intensity
-
-        # Ensure minimum brightness
-        return max(0.3, 1.0 + pulse)
-
-    def _calculate_breathing_factor(self, elapsed_time: float) -> float:
-        """Calculate breathing effect factor"""
-        if not self.config.breathing_effect or self.config.breathing_intensity <= 0:
-            return 1.0
-
-        breathing_phase = (
-            self.breathing_phase + elapsed_time * self.config.breathing_speed
-        )
-        breathing = math.sin(breathing_phase) * self.config.breathing_intensity
-
-        # Breathing affects alpha/intensity
-        return max(0.5, 1.0 + breathing)
-
-    def _update_animation_phases(self):
-        """Update animation phases for next frame"""
-        # Add small random variations to prevent predictable patterns
-        self.color_shift_phase += random.uniform(-0.1, 0.1)
-        self.pulse_phase += random.uniform(-0.05, 0.05)
-        self.breathing_phase += random.uniform(-0.08, 0.08)
+        return self.audio_envelope.level_at(now)
 
     async def _set_light_color(self, color: Color):
         """Send color command to client via WebSocket (client will control Shelly device)"""
@@ -349,47 +337,75 @@ class CrystalLightController:
             # Store the current color for status reporting
             self.current_color = color
             self._last_sent_color = color
+            self._post_light_command()
+        else:
+            # Just update internal state without sending
+            self.current_color = color
 
-            # Send light command to client via WebSocket
-            try:
-                import server
+    def _apply_animated_color(self, rgba):
+        """Send a color the animation scheduler found significantly changed"""
+        color = Color(*(float(channel) for channel in rgba))
+        self.current_color = color
+        self._last_sent_color = color
+        self._post_light_command()
 
-                light_command = self.get_light_command()
+    def _post_light_command(self):
+        """
+        Hand the current color to the session's light sockets.
 
-                # Send to light WebSocket if available
-                if self.connection_id in server.light_websocket_connections:
-                    light_ws = server.light_websocket_connections[self.connection_id]
-                    await light_ws.send_text(json.dumps(light_command))
-                    self.logger.debug(f"🎨 Light command sent: {light_command}")
-                else:
-                    self.logger.warning(
-                        f"❌ No light WebSocket connection found for {self.connection_id}"
-                    )
+        Never waits for the client: a newer color replaces an unsent one, and
+        each LightSender encodes it in its negotiated wire format.
+        """
+        entry = self.session_entry
+        self._note_light_consumer(
+            entry is not None and entry.post_color(self._command_color())
+        )
+
+    def update_light_demand(self):
+        """
+        Animate only while speaking and a light socket consumes the colors.
 
-            except Exception as e:
-                self.logger.error(f"❌ Error sending light command: {e}")
+        Called when speaking starts or stops and whenever a light socket
+        attaches to or detaches from the session. The animation is a function
+        of the speaking start time and the phases (which the scheduler hands
+        back on removal), so it resumes in phase after a suspension.
+        """
+        entry = self.session_entry
+        self._note_light_consumer(entry is not None and entry.has_light_consumer)
+        scheduler = get_animation_scheduler()
+        if self.is_speaking and entry is not None and entry.streams_colors:
+            scheduler.add(self)
+        elif self in scheduler:
+            scheduler.remove(self)
+
+    def _note_light_consumer(self, attached: bool):
+        """Log when the session gains or loses its light sockets, not per frame"""
+        if attached == self.has_light_consumer:
+            return
+        if attached:
+            if self.has_light_consumer is not None:
+                self.logger.info("🔌 Light WebSocket attached, lights resumed")
         else:
-            # Just update internal state without sending
-            self.current_color = color
+            self.logger.warning(
+                f"❌ No light WebSocket connection found for {self.connection_id}, "
+                "light animation suspended"
+            )
+        self.has_light_consumer = attached
 
     def _color_changed_significantly(self, new_color: Color) -> bool:
-        """Check if color changed enough to warrant sending a new command"""
+        """
+        Check if the device output of a color differs from the last one sent.
+
+        Only discrete changes (like the off color) come through here, so any
+        visible difference is sent; the per-frame animation is filtered
+        perceptually and rate limited by the AnimationScheduler.
+        """
         if not hasattr(self, "_last_sent_color"):
             return True
-
-        # Calculate color difference (Euclidean distance in RGB space)
-        r_diff = abs(new_color.r - self._last_sent_color.r)
-        g_diff = abs(new_color.g - self._last_sent_color.g)
-        b_diff = abs(new_color.b - self._last_sent_color.b)
-        a_diff = abs(new_color.a - self._last_sent_color.a)
-
-        # Only send if change is significant (>5% in any channel)
-        threshold = 0.05
-        return (
-            r_diff > threshold
-            or g_diff > threshold
-            or b_diff > threshold
-            or a_diff > threshold
+        last = self._last_sent_color
+        return (new_color.to_shelly_format(), new_color.a > 0) != (
+            last.to_shelly_format(),
+            last.a > 0,
         )
 
     async def cleanup(self):
@@ -400,25 +416,16 @@ class CrystalLightController:
         if self.is_speaking:
             await self.stop_speaking()
 
-        # Cancel any running tasks
-        if self.light_task and not self.light_task.done():
-            self.light_task.cancel()
-            try:
-                await self.light_task
-            except asyncio.CancelledError:
-                pass
-
-        # Close HTTP session
-        if self.session:
-            await self.session.close()
-            self.session = None
-
     def get_status(self) -> Dict:
         """Get current status of the light controller"""
+        entry = self.session_entry
+        sender = entry.light_sender if entry else None
         return {
             "bot_config": self.bot_config,
             "connection_id": self.connection_id,
             "is_speaking": self.is_speaking,
+            "has_light_consumer": bool(self.has_light_consumer),
+            "animating": self in get_animation_scheduler(),
             "current_color": {
                 "r": self.current_color.r,
                 "g": self.current_color.g,
@@ -445,31 +452,31 @@ class CrystalLightController:
                 "breathing_effect": self.config.breathing_effect,
                 "breathing_speed": self.config.breathing_speed,
                 "breathing_intensity": self.config.breathing_intensity,
+                "layers": self.config.layers,
             },
+            "audio_envelope": (
+                self.audio_envelope.get_status() if self.audio_envelope else None
+            ),
+            "light_sender": sender.get_status() if sender else None,
+            "light_devices": [
+                device.get_status() for device in (entry.light_devices if entry else [])
+            ],
         }
 
-    def get_light_command(self) -> Dict:
-        """Get the current light command that should be sent to the client"""
+    def _command_color(self) -> Color:
         if not self.is_speaking:
             # When not speaking, send off color
-            color = self.config.off_color
-        else:
-            # When speaking, send current animated color
-            color = self.current_color
+            return self.config.off_color
+        # When speaking, send current animated color
+        return self.current_color
 
-        red, green, blue, white = color.to_shelly_format()
+    def effect_descriptor(self) -> Optional[Dict]:
+        """The light effect of this controller, for clients that render it"""
+        return effect_descriptor(self.config, self.phases[:3])
 
-        return {
-            "type": "light_command",
-            "bot_config": self.bot_config,
-            "command": {
-                "turn": "on" if color.a > 0 else "off",
-                "mode": "color",
-                "red": red,
-                "green": green,
-                "blue": blue,
-                "white": white,
-            },
-            "shelly_ip": self.config.shelly_ip,
-            "timestamp": time.time(),
-        }
+    def get_light_command(self) -> Dict:
+        """Get the current light command that should be sent to the client"""
+        color = self._command_color()
+        return color_command(
+            LightSession(self.bot_config, self.config.shelly_ip), color
+        )
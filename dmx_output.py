@@ -0,0 +1,343 @@
+#
+# Copyright (c) 2025, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+"""
+Art-Net and sACN (E1.31) output of the crystal colors over UDP.
+
+Every crystal is a DmxFixture: four consecutive channels (red, green, blue,
+white, 0-255 as for Shelly) of a universe, configured per bot with
+"dmx_universe" and "dmx_channel" (1-based, at most 509) in light_config.
+The universe defaults to 1 for sACN (1-63999; 0 is reserved) and 0 for
+Art-Net (0-32767). Fixtures only
+write into the universe buffer; DmxOutput sends one packet per changed
+universe per frame, at a fixed frame rate, and repeats unchanged universes
+every keepalive seconds as receivers expect.
+"""
+
+import asyncio
+import os
+import socket
+import struct
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+from loguru import logger
+
+PROTOCOL_ARTNET = "artnet"
+PROTOCOL_SACN = "sacn"
+
+ARTNET_PORT = 6454
+SACN_PORT = 5568
+DMX_CHANNELS = 512
+FIXTURE_CHANNELS = 4  # R, G, B, W
+
+MAX_FIXTURE_CHANNEL = DMX_CHANNELS - FIXTURE_CHANNELS + 1
+UNIVERSE_RANGES = {PROTOCOL_ARTNET: (0, 32767), PROTOCOL_SACN: (1, 63999)}
+DEFAULT_UNIVERSES = {PROTOCOL_ARTNET: 0, PROTOCOL_SACN: 1}
+
+DEFAULT_FPS = 30.0
+DEFAULT_KEEPALIVE = 1.0  # seconds between repeats of an unchanged universe
+
+_ARTNET_ID = b"Art-Net\x00"
+_ARTNET_OP_DMX = 0x5000
+_ARTNET_VERSION = 14
+_SACN_ID = b"ASC-E1.17\x00\x00\x00"
+_SACN_HEADER = 126  # bytes before the first channel value
+
+
+def dmx_output_protocol() -> Optional[str]:
+    """The protocol selected with DMX_OUTPUT, or None if DMX is off"""
+    protocol = os.getenv("DMX_OUTPUT", "").lower()
+    return protocol if protocol in UNIVERSE_RANGES else None
+
+
+def check_dmx_address(protocol: Optional[str], universe, channel):
+    """Raise ValueError if no fixture of the protocol can sit at universe/channel"""
+    if not isinstance(channel, int) or not 1 <= channel <= MAX_FIXTURE_CHANNEL:
+        raise ValueError(
+            f"DMX channel {channel!r} out of range 1-{MAX_FIXTURE_CHANNEL}"
+        )
+    if not isinstance(universe, int):
+        raise ValueError(f"DMX universe {universe!r} is not a number")
+    if protocol in UNIVERSE_RANGES:
+        first, last = UNIVERSE_RANGES[protocol]
+        if not first <= universe <= last:
+            raise ValueError(
+                f"{protocol} universe {universe} out of range {first}-{last}"
+            )
+
+
+def encode_artnet(universe: int, sequence: int, data: bytes) -> bytes:
+    """ArtDmx packet of one universe (15-bit port address)"""
+    if len(data) % 2:
+        data += b"\x00"  # the length must be even
+    return (
+        _ARTNET_ID
+        + struct.pack("<H", _ARTNET_OP_DMX)
+        + struct.pack(
+            ">HBBBBH",
+            _ARTNET_VERSION,
+            sequence,
+            0,  # physical port
+            universe & 0xFF,
+            (universe >> 8) & 0x7F,
+            len(data),
+        )
+        + data
+    )
+
+
+def encode_sacn(
+    universe: int,
+    sequence: int,
+    data: bytes,
+    cid: bytes,
+    source_name: str,
+    priority: int = 100,
+) -> bytes:
+    """E1.31 data packet of one universe"""
+    length = _SACN_HEADER + len(data)
+    root = struct.pack(
+        ">HH12sHI16s",
+        0x0010,  # preamble size
+        0x0000,  # postamble size
+        _SACN_ID,
+        0x7000 | (length - 16),
+        0x00000004,  # VECTOR_ROOT_E131_DATA
+        cid,
+    )
+    framing = struct.pack(
+        ">HI64sBHBBH",
+        0x7000 | (length - 38),
+        0x00000002,  # VECTOR_E131_DATA_PACKET
+        source_name.encode("utf-8")[:63],
+        priority,
+        0,  # synchronization address
+        sequence,
+        0,  # options
+        universe,
+    )
+    dmp = struct.pack(
+        ">HBBHHHB",
+        0x7000 | (length - 115),
+        0x02,  # VECTOR_DMP_SET_PROPERTY
+        0xA1,  # address and data type
+        0x0000,  # first property address
+        0x0001,  # address increment
+        len(data) + 1,
+        0x00,  # DMX start code
+    )
+    return root + framing + dmp + data
+
+
+def decode_dmx_packet(packet: bytes) -> Tuple[str, int, int, bytes]:
+    """(protocol, universe, sequence, channel values) of a packet (for tests and tools)"""
+    if packet.startswith(_ARTNET_ID):
+        _, sequence, _, sub_uni, net, length = struct.unpack_from(">HBBBBH", packet, 10)
+        return PROTOCOL_ARTNET, (net << 8) | sub_uni, sequence, packet[18 : 18 + length]
+    if packet[4:16] == _SACN_ID:
+        sequence = packet[111]
+        (universe,) = struct.unpack_from(">H", packet, 113)
+        (count,) = struct.unpack_from(">H", packet, 123)
+        return PROTOCOL_SACN, universe, sequence, packet[126 : 125 + count]
+    raise ValueError("Not an Art-Net or sACN DMX packet")
+
+
+class DmxFixture:
+    """Four channels of one crystal; post_color() only writes the buffer"""
+
+    def __init__(self, output: "DmxOutput", universe: int, channel: int):
+        check_dmx_address(output.protocol, universe, channel)
+        self.output = output
+        self.universe = universe
+        self.channel = channel
+        self.posted = 0
+
+    def post_color(self, color):
+        self.posted += 1
+        self.output.set_channels(self.universe, self.channel, color.to_shelly_format())
+
+    def get_status(self) -> dict:
+        return {
+            "output": self.output.protocol,
+            "universe": self.universe,
+            "channel": self.channel,
+            "posted": self.posted,
+        }
+
+
+class DmxOutput:
+    """
+    Fixed-rate UDP sender of the DMX universes of all crystals.
+
+    Art-Net goes to target (default: broadcast) on port 6454; sACN goes to
+    target or to the universe's multicast group 239.255.x.y on port 5568.
+    The sender task sleeps until a fixture changes or a keepalive is due, and
+    never sends a universe more often than fps times per second, so all
+    crystals that changed within one animation tick share one packet.
+    """
+
+    def __init__(
+        self,
+        protocol: str = PROTOCOL_ARTNET,
+        target: Optional[str] = None,
+        port: Optional[int] = None,
+        fps: float = DEFAULT_FPS,
+        keepalive: float = DEFAULT_KEEPALIVE,
+        source_name: str = "voice-conversation",
+    ):
+        if protocol not in (PROTOCOL_ARTNET, PROTOCOL_SACN):
+            raise ValueError(f"Unknown DMX protocol {protocol}")
+        self.protocol = protocol
+        self.target = target
+        self.port = port or (ARTNET_PORT if protocol == PROTOCOL_ARTNET else SACN_PORT)
+        self.frame_interval = 1.0 / fps
+        self.keepalive = keepalive
+        self.source_name = source_name
+        self._cid = uuid.uuid4().bytes
+
+        self._universes: Dict[int, bytearray] = {}
+        self._lengths: Dict[int, int] = {}  # channels in use per universe
+        self._sequences: Dict[int, int] = {}
+        self._last_sent: Dict[int, float] = {}
+        self._dirty = set()
+        self._fixtures: Dict[Tuple[int, int], DmxFixture] = {}
+        self._wakeup = asyncio.Event()
+        self._socket: Optional[socket.socket] = None
+        self._task: Optional[asyncio.Task] = None
+
+        # Statistics
+        self.frames = 0
+        self.packets_sent = 0
+        self.bytes_sent = 0
+        self.send_errors = 0
+
+    @classmethod
+    def from_env(cls) -> Optional["DmxOutput"]:
+        """Create an output if DMX_OUTPUT is "artnet" or "sacn", else None"""
+        protocol = dmx_output_protocol()
+        if protocol is None:
+            return None
+        return cls(
+            protocol,
+            target=os.getenv("DMX_TARGET") or None,
+            fps=float(os.getenv("DMX_FPS", DEFAULT_FPS)),
+        )
+
+    def fixture(self, universe: int, channel: int) -> DmxFixture:
+        """The fixture at universe/channel, shared by every session of a bot"""
+        key = (universe, channel)
+        fixture = self._fixtures.get(key)
+        if fixture is None:
+            fixture = DmxFixture(self, universe, channel)
+            self._fixtures[key] = fixture
+            self._universes.setdefault(universe, bytearray(DMX_CHANNELS))
+            self._lengths[universe] = max(
+                self._lengths.get(universe, 0), channel + FIXTURE_CHANNELS - 1
+            )
+            logger.info(
+                f"💡 DMX fixture at {self.protocol} universe {universe}, channel {channel}"
+            )
+        return fixture
+
+    def set_channels(self, universe: int, channel: int, values):
+        buffer = self._universes[universe]
+        start = channel - 1
+        if buffer[start : start + len(values)] != bytes(values):
+            buffer[start : start + len(values)] = bytes(values)
+            self._dirty.add(universe)
+            self._wakeup.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def _open_socket(self) -> socket.socket:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 4)
+        sock.setblocking(False)
+        return sock
+
+    def _address(self, universe: int) -> Tuple[str, int]:
+        if self.target:
+            return self.target, self.port
+        if self.protocol == PROTOCOL_SACN:
+            return f"239.255.{(universe >> 8) & 0xFF}.{universe & 0xFF}", self.port
+        return "255.255.255.255", self.port
+
+    def _packet(self, universe: int) -> bytes:
+        sequence = self._sequences.get(universe, 0) % 255 + 1  # 1-255
+        self._sequences[universe] = sequence
+        data = bytes(self._universes[universe][: self._lengths[universe]])
+        if self.protocol == PROTOCOL_ARTNET:
+            return encode_artnet(universe, sequence, data)
+        return encode_sacn(universe, sequence, data, self._cid, self.source_name)
+
+    def send_frame(self, now: Optional[float] = None) -> List[int]:
+        """Send every changed or keepalive-due universe; returns the universes"""
+        now = time.monotonic() if now is None else now
+        due = [
+            universe
+            for universe in self._universes
+            if universe in self._dirty
+            or now - self._last_sent.get(universe, 0.0) >= self.keepalive
+        ]
+        self._dirty.clear()
+        if self._socket is None:
+            self._socket = self._open_socket()
+        for universe in due:
+            packet = self._packet(universe)
+            try:
+                self._socket.sendto(packet, self._address(universe))
+            except OSError as e:
+                self.send_errors += 1
+                logger.warning(f"❌ DMX send to universe {universe} failed: {e}")
+                continue
+            self._last_sent[universe] = now
+            self.packets_sent += 1
+            self.bytes_sent += len(packet)
+        self.frames += 1
+        return due
+
+    async def _run(self):
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.keepalive)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                frame_start = time.monotonic()
+                self.send_frame(frame_start)
+                # Fixed frame rate: changes until the next frame share a packet
+                await asyncio.sleep(
+                    max(0.0, frame_start + self.frame_interval - time.monotonic())
+                )
+        except asyncio.CancelledError:
+            pass
+
+    async def close(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+    def get_stats(self) -> dict:
+        return {
+            "protocol": self.protocol,
+            "target": self.target,
+            "fps": round(1.0 / self.frame_interval, 2),
+            "universes": sorted(self._universes),
+            "fixtures": len(self._fixtures),
+            "frames": self.frames,
+            "packets_sent": self.packets_sent,
+            "bytes_sent": self.bytes_sent,
+            "send_errors": self.send_errors,
+        }
@@ -0,0 +1,117 @@
+#
+# Copyright (c) 2025, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+from typing import Callable, Dict, Optional, Tuple, Type
+
+from pipecat.frames.frames import Frame
+from pipecat.observers.base_observer import BaseObserver, FramePushed
+
+from structured_log import FRAME_DEBUG, get_event_sink
+
+
+def handles(*frame_types: Type[Frame], pushed: bool = False):
+    """
+    Subscribe a FrameTypeObserver method to frames of these types. With
+    pushed=True it is called with the FramePushed (source, destination,
+    direction) instead of the frame.
+    """
+
+    def decorator(method):
+        method._frame_types = getattr(method, "_frame_types", ()) + frame_types
+        method._frame_pushed = pushed
+        return method
+
+    return decorator
+
+
+class FrameTypeObserver(BaseObserver):
+    """
+    Observer dispatching frames by type to the methods subscribed with
+    @handles.
+
+    Pipecat calls on_push_frame for every frame at every hop. Here that is
+    one dict lookup on type(frame): a frame type is resolved against the
+    subscriptions once per observer class (the most specific subscribed base
+    class in its MRO wins) and cached, including the types nobody handles,
+    which return right away. Handlers are async methods taking the frame
+    (or the FramePushed, see handles).
+
+    Subclasses set once_per_frame to see each frame only at its first hop
+    (frame ids grow monotonically); otherwise a handler runs at every hop.
+    With LOG_FRAME_DEBUG=1 every observed frame is also logged through the
+    event sink ("frame" category); otherwise on_push_frame has no logging.
+    """
+
+    once_per_frame = False
+
+    _subscriptions: Dict[type, Tuple[str, bool]] = {}
+    _dispatch: Dict[type, Optional[Tuple[Callable, bool]]] = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        subscriptions = {}
+        # Base classes first, so an overriding subclass wins
+        for klass in reversed(cls.__mro__):
+            for name, attribute in vars(klass).items():
+                for frame_type in getattr(attribute, "_frame_types", ()):
+                    subscriptions[frame_type] = (name, attribute._frame_pushed)
+        cls._subscriptions = subscriptions
+        cls._dispatch = {}
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._last_frame_id = -1
+        if FRAME_DEBUG:
+            self.on_push_frame = self._trace_push_frame
+
+    @classmethod
+    def handler_for(cls, frame_type: type) -> Optional[Callable]:
+        """The method handling frames of frame_type, or None"""
+        entry = cls._resolve(frame_type)
+        return entry[0] if entry else None
+
+    @classmethod
+    def _resolve(cls, frame_type: type) -> Optional[Tuple[Callable, bool]]:
+        try:
+            return cls._dispatch[frame_type]
+        except KeyError:
+            pass
+        entry = None
+        for base in frame_type.__mro__:
+            subscription = cls._subscriptions.get(base)
+            if subscription is not None:
+                name, pushed = subscription
+                entry = (getattr(cls, name), pushed)
+                break
+        cls._dispatch[frame_type] = entry
+        return entry
+
+    async def on_push_frame(self, data: FramePushed):
+        frame = data.frame
+        try:
+            entry = self._dispatch[type(frame)]
+        except KeyError:
+            entry = self._resolve(type(frame))
+        if entry is None:
+            return
+        if self.once_per_frame:
+            if frame.id <= self._last_frame_id:
+                return
+            self._last_frame_id = frame.id
+        handler, pushed = entry
+        await handler(self, data if pushed else frame)
+
+    async def _trace_push_frame(self, data: FramePushed):
+        handler = self.handler_for(type(data.frame))
+        get_event_sink().emit(
+            "frame",
+            "DEBUG",
+            "{} {} {} -> {}",
+            type(self).__name__,
+            data.frame,
+            data.direction.name,
+            handler.__name__ if handler else None,
+        )
+        await FrameTypeObserver.on_push_frame(self, data)
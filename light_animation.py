@@ -0,0 +1,306 @@
+#
+# Copyright (c) 2025, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from light_color import delta_e, output_to_lab, shelly_output
+from light_effects import MAX_PHASES, CompiledEffect
+from structured_log import get_event_sink
+
+DEFAULT_FPS = 30.0
+
+
+class AnimationScheduler:
+    """
+    One animation loop for all speaking crystal light controllers.
+
+    The start times and phases of every active controller live in NumPy
+    arrays (one row per controller, kept dense by swap-removal), so a tick
+    computes all colors at once: rows are grouped by their bot's compiled
+    effect (light_effects.CompiledEffect), which evaluates a whole group in
+    place, with the TTS audio levels of the group if its effect follows the
+    audio. A controller's color is only dispatched if its device output
+    changed perceptibly (CIELAB delta E of at least min_delta_e) and
+    max_update_rate allows it, or if it changed at all and the last command
+    is keyframe_interval old (see changed_rows).
+    """
+
+    def __init__(
+        self,
+        fps: float = DEFAULT_FPS,
+        capacity: int = 16,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+    ):
+        self.fps = fps
+        self._loop = loop or asyncio.get_running_loop()
+        self._controllers: List = []
+        self._effects: List[CompiledEffect] = []  # per row
+        self._rows: Dict[int, int] = {}  # id(controller) -> row
+        # (effect, rows) with the rows of each effect contiguous; None after
+        # rows were added or removed
+        self._groups: Optional[List[Tuple[CompiledEffect, slice]]] = None
+        self._rng = np.random.default_rng()
+        self._allocate(capacity)
+        self._task: Optional[asyncio.Task] = None
+
+        # Statistics
+        self.ticks = 0
+        self.dispatched = 0
+        self.tick_seconds_max = 0.0
+
+    def _allocate(self, capacity: int):
+        self._phases = self._grow(
+            getattr(self, "_phases", None), (capacity, MAX_PHASES)
+        )
+        self._jitter = self._grow(
+            getattr(self, "_jitter", None), (capacity, MAX_PHASES)
+        )
+        self._start = self._grow(getattr(self, "_start", None), (capacity,))
+        # min delta E, min seconds between commands, keyframe interval
+        self._limits = self._grow(getattr(self, "_limits", None), (capacity, 3))
+        # Device output (see light_color.shelly_output), its CIELAB, and time
+        self._last_output = self._grow(
+            getattr(self, "_last_output", None), (capacity, 5), dtype=np.int64
+        )
+        self._last_lab = self._grow(getattr(self, "_last_lab", None), (capacity, 3))
+        self._last_time = self._grow(getattr(self, "_last_time", None), (capacity,))
+        self._never_sent = self._grow(
+            getattr(self, "_never_sent", None), (capacity,), dtype=bool
+        )
+        self._elapsed = np.zeros(capacity)
+        self._levels = np.zeros(capacity)  # audio levels of the current tick
+        self._colors = np.zeros((capacity, 4))
+
+    def _row_arrays(self):
+        return (
+            self._phases,
+            self._jitter,
+            self._start,
+            self._limits,
+            self._last_output,
+            self._last_lab,
+            self._last_time,
+            self._never_sent,
+        )
+
+    @staticmethod
+    def _grow(array, shape, dtype=np.float64):
+        grown = np.zeros(shape, dtype=dtype)
+        if array is not None:
+            grown[: len(array)] = array
+        return grown
+
+    def __len__(self):
+        return len(self._controllers)
+
+    def __contains__(self, controller) -> bool:
+        return id(controller) in self._rows
+
+    # ------------------------------------------------------------------
+    # Registration
+    # ------------------------------------------------------------------
+
+    def add(self, controller):
+        """Start animating a controller from its config, phases and start time"""
+        if controller in self:
+            return
+        row = len(self._controllers)
+        if row == len(self._start):
+            self._allocate(row * 2)
+
+        config = controller.config
+        effect = config.effect
+        self._phases[row] = controller.phases
+        self._jitter[row] = effect.phase_jitter
+        self._start[row] = controller.speaking_start_time
+        self._limits[row] = (
+            config.min_delta_e,
+            1.0 / config.max_update_rate if config.max_update_rate > 0 else 0.0,
+            config.keyframe_interval,
+        )
+        self._never_sent[row] = True
+
+        self._controllers.append(controller)
+        self._effects.append(effect)
+        self._rows[id(controller)] = row
+        self._groups = None
+        if self._task is None or self._task.done():
+            self._task = self._loop.create_task(self._run())
+
+    def remove(self, controller):
+        """Stop animating a controller"""
+        row = self._rows.pop(id(controller), None)
+        if row is None:
+            return
+        # Hand back the drifted phases, so a resumed animation stays in phase
+        controller.phases = [float(phase) for phase in self._phases[row]]
+        last = len(self._controllers) - 1
+        if row != last:
+            # Move the last row into the gap to keep the arrays dense
+            moved = self._controllers[last]
+            self._controllers[row] = moved
+            self._effects[row] = self._effects[last]
+            self._rows[id(moved)] = row
+            for array in self._row_arrays():
+                array[row] = array[last]
+        self._controllers.pop()
+        self._effects.pop()
+        self._groups = None
+
+    def _group_rows(self) -> List[Tuple[CompiledEffect, slice]]:
+        """
+        Reorder the rows so that each effect's rows are contiguous.
+
+        Only runs on the first tick after controllers were added or removed;
+        every other tick evaluates each effect on plain array slices.
+        """
+        if self._groups is not None:
+            return self._groups
+        n = len(self._controllers)
+        first_seen: Dict[int, int] = {}
+        order = sorted(
+            range(n),
+            key=lambda row: first_seen.setdefault(
+                id(self._effects[row]), len(first_seen)
+            ),
+        )
+        for array in self._row_arrays():
+            array[:n] = array[order]
+        self._controllers = [self._controllers[row] for row in order]
+        self._effects = [self._effects[row] for row in order]
+        self._rows = {id(c): row for row, c in enumerate(self._controllers)}
+
+        groups = []
+        start = 0
+        for row in range(1, n + 1):
+            if row == n or self._effects[row] is not self._effects[start]:
+                groups.append((self._effects[start], slice(start, row)))
+                start = row
+        self._groups = groups
+        return groups
+
+    # ------------------------------------------------------------------
+    # Vectorized tick
+    # ------------------------------------------------------------------
+
+    def compute(self, now: float) -> np.ndarray:
+        """
+        Animated RGBA colors of all active controllers, shape (n, 4).
+
+        The result is a view of a buffer the next compute() overwrites.
+        """
+        groups = self._group_rows()
+        n = len(self._controllers)
+        elapsed = self._elapsed[:n]
+        np.subtract(now, self._start[:n], out=elapsed)
+        levels = self._levels
+        for effect, rows in groups:
+            if effect.audio is not None:
+                for row in range(rows.start, rows.stop):
+                    levels[row] = self._controllers[row].audio_level(now)
+            effect.evaluate(
+                elapsed[rows], self._phases[rows], self._colors[rows], levels[rows]
+            )
+        return self._colors[:n]
+
+    def advance_phases(self):
+        """Random phase drift so the animation does not repeat predictably"""
+        n = len(self._controllers)
+        self._phases[:n] += (
+            self._rng.uniform(-1.0, 1.0, (n, MAX_PHASES)) * self._jitter[:n]
+        )
+
+    def changed_rows(self, colors: np.ndarray, now: float) -> np.ndarray:
+        """
+        Rows whose color is worth a command at time now.
+
+        The device output must differ from the last sent one, and either the
+        difference is perceptible and the row's rate limit has passed, or the
+        row's keyframe interval has passed. The first color is always sent.
+        """
+        n = len(self._controllers)
+        output = shelly_output(colors)
+        lab = output_to_lab(output)
+        min_delta_e, min_interval, keyframe_interval = self._limits[:n].T
+        since = now - self._last_time[:n]
+        differs = (output != self._last_output[:n]).any(axis=1)
+        perceptible = delta_e(lab, self._last_lab[:n]) >= min_delta_e
+        due = differs & (
+            (perceptible & (since >= min_interval)) | (since >= keyframe_interval)
+        )
+        changed = np.flatnonzero(due | self._never_sent[:n])
+        self._last_output[changed] = output[changed]
+        self._last_lab[changed] = lab[changed]
+        self._last_time[changed] = now
+        self._never_sent[changed] = False
+        return changed
+
+    async def tick(self, now: Optional[float] = None):
+        """Compute all colors and dispatch the changed ones"""
+        start_time = time.perf_counter()
+        now = time.time() if now is None else now
+        colors = self.compute(now)
+        self.advance_phases()
+        changed = self.changed_rows(colors, now)
+        controllers = [self._controllers[row] for row in changed]
+        self.ticks += 1
+        self.dispatched += len(controllers)
+        # Only hands the colors to the per-connection senders; never waits
+        for controller, row in zip(controllers, changed):
+            controller._apply_animated_color(colors[row])
+        self.tick_seconds_max = max(
+            self.tick_seconds_max, time.perf_counter() - start_time
+        )
+
+    async def _run(self):
+        interval = 1.0 / self.fps
+        next_tick = self._loop.time()
+        try:
+            while self._controllers:
+                try:
+                    await self.tick()
+                except Exception as e:
+                    get_event_sink().emit(
+                        "animation", "ERROR", "Error in light animation tick: {}", e
+                    )
+                # Skip frames rather than bursting after a stall
+                next_tick = max(next_tick + interval, self._loop.time())
+                await asyncio.sleep(next_tick - self._loop.time())
+        except asyncio.CancelledError:
+            pass
+
+    async def stop(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    def get_stats(self) -> dict:
+        return {
+            "active": len(self._controllers),
+            "fps": self.fps,
+            "ticks": self.ticks,
+            "dispatched": self.dispatched,
+            "tick_ms_max": round(self.tick_seconds_max * 1000, 3),
+        }
+
+
+_default_scheduler: Optional[AnimationScheduler] = None
+
+
+def get_animation_scheduler() -> AnimationScheduler:
+    """The process-wide scheduler of the running event loop"""
+    global _default_scheduler
+    loop = asyncio.get_running_loop()
+    if _default_scheduler is None or _default_scheduler._loop is not loop:
+        _default_scheduler = AnimationScheduler(loop=loop)
+    return _default_scheduler
@@ -0,0 +1,60 @@
+#
+# Copyright (c) 2025, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+"""
+Perceptual distance of light colors, vectorized over (n, 4) RGBA rows.
+
+A change is judged on what the device actually shows: the quantized Shelly
+RGBW output (Color.to_shelly_format), converted from sRGB to CIELAB (D65).
+The white channel adds equally to red, green and blue. A CIE76 delta E of
+about 2.3 is the smallest difference most viewers notice.
+"""
+
+import numpy as np
+
+# sRGB (linear) to XYZ, D65
+_SRGB_TO_XYZ = np.array(
+    [
+        [0.4124564, 0.3575761, 0.1804375],
+        [0.2126729, 0.7151522, 0.0721750],
+        [0.0193339, 0.1191920, 0.9503041],
+    ]
+)
+_WHITE_POINT = np.array([0.95047, 1.0, 1.08883])
+_DELTA = 6.0 / 29.0
+
+
+def shelly_output(colors: np.ndarray) -> np.ndarray:
+    """
+    Device output of RGBA rows: red, green, blue, white (0-255) and on (0/1).
+
+    Same truncation as Color.to_shelly_format; the light is on while alpha > 0.
+    """
+    output = np.zeros((len(colors), 5), dtype=np.int64)
+    output[:, :3] = colors[:, :3] * 255 * colors[:, 3:4]
+    output[:, 4] = colors[:, 3] > 0
+    return output
+
+
+def output_to_lab(output: np.ndarray) -> np.ndarray:
+    """CIELAB of shelly_output rows; a light that is off is black"""
+    rgb = (output[:, :3] + output[:, 3:4]) * output[:, 4:5] / 255.0
+    rgb = np.minimum(rgb, 1.0)
+    linear = np.where(rgb <= 0.04045, rgb / 12.92, ((rgb + 0.055) / 1.055) ** 2.4)
+    xyz = linear @ _SRGB_TO_XYZ.T / _WHITE_POINT
+    f = np.where(xyz > _DELTA**3, np.cbrt(xyz), xyz / (3 * _DELTA**2) + 4.0 / 29.0)
+    return np.stack(
+        (
+            116.0 * f[:, 1] - 16.0,
+            500.0 * (f[:, 0] - f[:, 1]),
+            200.0 * (f[:, 1] - f[:, 2]),
+        ),
+        axis=1,
+    )
+
+
+def delta_e(lab_a: np.ndarray, lab_b: np.ndarray) -> np.ndarray:
+    """CIE76 color difference per row"""
+    return np.sqrt(((lab_a - lab_b) ** 2).sum(axis=1))
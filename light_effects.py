@@ -0,0 +1,499 @@
+#
+# Copyright (c) 2025, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+"""
+Composable crystal light effects, compiled once per bot.
+
+The "layers" list of a bot's light_config is an ordered stack of effects.
+Starting from primary_color, each layer transforms the RGBA color in turn;
+the result is clamped to 0-1:
+
+    color_shift  lerp towards fade_to_color (or "to") by a mix of sine waves:
+                 variation, speed, waves ([speed factor, weight] pairs)
+    pulse        multiply by max(floor, 1 + sin * intensity): speed, floor 0.3
+    breathing    the same, floor 0.5
+    flicker      multiply by max(floor, 1 - intensity * noise), noise (0-1) of
+                 three incommensurate sines: speed, floor
+    fade_in      multiply by elapsed / duration until duration has passed
+    audio        multiply by 1 - depth + depth * level, the loudness (0-1) of
+                 the bot's TTS audio (audio_envelope.AudioEnvelope): depth,
+                 and the envelope's attack, release, min_db, max_db, detector
+
+Every layer but fade_in and audio has a phase slot, seeded randomly per controller and
+drifted by up to "jitter" per tick. Without "layers" the stack is the classic
+color_shift, pulse, breathing made from the flat light_config keys.
+
+compile_effect() turns a stack into a CompiledEffect: layers without effect
+are dropped, consecutive pulse and breathing layers fused, and the rest is
+generated as two Python functions with the constants inlined, one for a
+single color and one evaluating many sessions in place with NumPy (no
+temporary arrays). LightConfig.effect holds one per bot, shared by all
+sessions of the bot.
+"""
+
+import json
+import math
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from loguru import logger
+
+MAX_PHASES = 8  # phase slots per controller, so at most 8 periodic layers
+
+LAYER_DEFAULTS = {
+    "color_shift": {
+        "variation": 0.3,
+        "speed": 2.0,
+        "waves": [[1.0, 0.4], [1.3, 0.3], [0.7, 0.3]],
+        "to": None,  # RGBA dict, default fade_to_color
+        "jitter": 0.1,
+    },
+    "pulse": {"intensity": 0.2, "speed": 1.5, "floor": 0.3, "jitter": 0.05},
+    "breathing": {"intensity": 0.15, "speed": 0.8, "floor": 0.5, "jitter": 0.08},
+    "flicker": {"intensity": 0.3, "speed": 12.0, "floor": 0.0, "jitter": 0.2},
+    "fade_in": {"duration": 1.0},
+    "audio": {
+        "depth": 0.7,
+        "attack": 0.02,
+        "release": 0.2,
+        "min_db": -50.0,
+        "max_db": -12.0,
+        "detector": "rms",
+    },
+}
+
+# Speed factors of the flicker noise (beside 1.0)
+FLICKER_HARMONICS = (2.71, 4.13)
+
+# Compiled effects by effect_key, so equal configs share one (and one row
+# group in the AnimationScheduler) even if each session loaded its own
+MAX_COMPILED = 256
+_compiled: "OrderedDict[Tuple, CompiledEffect]" = OrderedDict()
+
+
+def parse_layers(layers_data: Sequence[Dict]) -> List[Dict]:
+    """Validate the "layers" of a light_config and fill in the defaults"""
+    layers = []
+    phases = 0
+    for layer_data in layers_data:
+        layer_type = layer_data.get("type")
+        defaults = LAYER_DEFAULTS.get(layer_type)
+        if defaults is None:
+            logger.warning(f"Unknown light effect layer {layer_type!r}, skipped")
+            continue
+        unknown = set(layer_data) - set(defaults) - {"type"}
+        if unknown:
+            logger.warning(f"Unknown {layer_type} layer keys {sorted(unknown)}")
+        if "jitter" in defaults:
+            if phases == MAX_PHASES:
+                logger.warning(f"More than {MAX_PHASES} periodic layers, skipped")
+                continue
+            phases += 1
+        layer = {"type": layer_type}
+        for key, default in defaults.items():
+            layer[key] = layer_data.get(key, default)
+        layers.append(layer)
+    return layers
+
+
+def legacy_layers(config) -> List[Dict]:
+    """The classic stack of a LightConfig without "layers" """
+    breathing_intensity = config.breathing_intensity if config.breathing_effect else 0
+    return parse_layers(
+        [
+            {
+                "type": "color_shift",
+                "variation": config.variation_intensity,
+                "speed": config.color_shift_speed,
+            },
+            {
+                "type": "pulse",
+                "intensity": config.pulse_intensity,
+                "speed": config.pulse_speed,
+            },
+            {
+                "type": "breathing",
+                "intensity": breathing_intensity,
+                "speed": config.breathing_speed,
+            },
+        ]
+    )
+
+
+def effect_key(config) -> Tuple:
+    """Everything the compiled effect of a LightConfig depends on"""
+    colors = tuple(
+        (color.r, color.g, color.b, color.a)
+        for color in (config.primary_color, config.fade_to_color)
+    )
+    if config.layers is not None:
+        return colors + (json.dumps(config.layers, sort_keys=True),)
+    return colors + (
+        config.variation_intensity,
+        config.color_shift_speed,
+        config.pulse_intensity,
+        config.pulse_speed,
+        config.breathing_effect,
+        config.breathing_intensity,
+        config.breathing_speed,
+    )
+
+
+# ----------------------------------------------------------------------
+# Code generation: each layer emits the statements of its step twice, for
+# one color (locals r, g, b, a) and in place on the (n, 4) array out, with
+# (n,) elapsed times, (n, MAX_PHASES) phases, (n,) audio levels and the
+# scratch arrays t (n,), d (n, 4) and w (SCRATCH_ROWS, n). Constant arrays
+# become globals c0, c1...
+# ----------------------------------------------------------------------
+
+SCRATCH_ROWS = MAX_PHASES  # enough for the waves or a run of oscillations
+
+_CHANNELS = ("r", "g", "b", "a")
+
+
+class _Code:
+    """Source lines and constants of a generated function"""
+
+    def __init__(self, constants: Dict[str, np.ndarray]):
+        self.lines: List[str] = []
+        self.constants = constants
+
+    def constant(self, values) -> str:
+        name = f"c{len(self.constants)}"
+        self.constants[name] = np.array(values, dtype=np.float64)
+        return name
+
+    def add(self, *lines: str):
+        self.lines.extend(lines)
+
+    def scale_color(self, factor: str):
+        self.add("; ".join(f"{channel} *= {factor}" for channel in _CHANNELS))
+
+
+def _clamped(expression: str, low: float = 0.0, high: float = 1.0) -> str:
+    return f"({low!r} if {expression} < {low!r} else min({expression}, {high!r}))"
+
+
+class _ColorShift:
+    def __init__(self, slot: int, variation: float, speed: float, waves, to):
+        # t = (sum(weight * sin) / len(waves) + 1) / 2 * variation
+        scale = variation / 2.0 / len(waves)
+        self.slot = slot
+        self.speeds = [float(speed * factor) for factor, _ in waves[:SCRATCH_ROWS]]
+        self.weights = [float(weight * scale) for _, weight in waves[:SCRATCH_ROWS]]
+        self.offset = float(variation / 2.0)
+        self.to = tuple(float(channel) for channel in to)
+
+    def scalar(self, code: _Code):
+        waves = " + ".join(
+            f"sin(p + elapsed * {speed!r}) * {weight!r}"
+            for speed, weight in zip(self.speeds, self.weights)
+        )
+        code.add(f"p = phases[{self.slot}]", f"t = {self.offset!r} + {waves}")
+        for channel, to in zip(_CHANNELS, self.to):
+            code.add(f"{channel} += ({to!r} - {channel}) * t")
+
+    def batch(self, code: _Code):
+        k = len(self.speeds)
+        speeds = code.constant([[speed] for speed in self.speeds])
+        weights = code.constant(self.weights)
+        code.add(
+            f"multiply({speeds}, elapsed, out=w[:{k}])",
+            f"w[:{k}] += phases[:, {self.slot}]",
+            f"sin(w[:{k}], out=w[:{k}])",
+            f"dot({weights}, w[:{k}], out=t)",
+            f"t += {self.offset!r}",
+            f"subtract({code.constant(self.to)}, out, out=d)",
+            "d *= t[:, None]",
+            "out += d",
+        )
+
+
+class _Oscillations:
+    """A run of pulse / breathing layers on consecutive phase slots"""
+
+    def __init__(self, slot: int):
+        self.first_slot = slot
+        self.intensities: List[float] = []
+        self.speeds: List[float] = []
+        self.floors: List[float] = []
+
+    @property
+    def next_slot(self) -> int:
+        return self.first_slot + len(self.speeds)
+
+    def append(self, intensity: float, speed: float, floor: float):
+        self.intensities.append(float(intensity))
+        self.speeds.append(float(speed))
+        self.floors.append(float(floor))
+
+    def scalar(self, code: _Code):
+        for index, (intensity, speed, floor) in enumerate(
+            zip(self.intensities, self.speeds, self.floors)
+        ):
+            slot = self.first_slot + index
+            code.add(
+                f"e = 1.0 + sin(phases[{slot}] + elapsed * {speed!r}) * {intensity!r}",
+                f"e = e if e > {floor!r} else {floor!r}",
+                "f = e" if index == 0 else "f *= e",
+            )
+        code.scale_color("f")
+
+    def batch(self, code: _Code):
+        k = len(self.speeds)
+        speeds = code.constant([[speed] for speed in self.speeds])
+        intensities = code.constant([[intensity] for intensity in self.intensities])
+        floors = code.constant([[floor] for floor in self.floors])
+        code.add(
+            f"multiply({speeds}, elapsed, out=w[:{k}])",
+            f"w[:{k}] += phases[:, {self.first_slot}:{self.next_slot}].T",
+            f"sin(w[:{k}], out=w[:{k}])",
+            f"w[:{k}] *= {intensities}",
+            f"w[:{k}] += 1.0",
+            f"maximum(w[:{k}], {floors}, out=w[:{k}])",
+            f"prod(w[:{k}], axis=0, out=t)",
+            "out *= t[:, None]",
+        )
+
+
+class _Flicker:
+    def __init__(self, slot: int, intensity: float, speed: float, floor: float):
+        # factor = 1 - intensity * (sum of the 3 sines / 6 + 0.5)
+        self.slot = slot
+        self.speed = float(speed)
+        self.scale = float(-intensity / 6.0)
+        self.offset = float(1.0 - intensity / 2.0)
+        self.floor = float(floor)
+
+    def scalar(self, code: _Code):
+        noise = " + ".join(
+            ["sin(x)"] + [f"sin(x * {harmonic!r})" for harmonic in FLICKER_HARMONICS]
+        )
+        code.add(
+            f"x = phases[{self.slot}] + elapsed * {self.speed!r}",
+            f"f = ({noise}) * {self.scale!r} + {self.offset!r}",
+            f"f = f if f > {self.floor!r} else {self.floor!r}",
+        )
+        code.scale_color("f")
+
+    def batch(self, code: _Code):
+        k = 1 + len(FLICKER_HARMONICS)
+        harmonics = code.constant([[1.0]] + [[h] for h in FLICKER_HARMONICS])
+        code.add(
+            f"multiply(elapsed, {self.speed!r}, out=t)",
+            f"t += phases[:, {self.slot}]",
+            f"multiply({harmonics}, t, out=w[:{k}])",
+            f"sin(w[:{k}], out=w[:{k}])",
+            f"dot({code.constant([self.scale] * k)}, w[:{k}], out=t)",
+            f"t += {self.offset!r}",
+            f"maximum(t, {self.floor!r}, out=t)",
+            "out *= t[:, None]",
+        )
+
+
+class _FadeIn:
+    def __init__(self, duration: float):
+        self.rate = float(1.0 / duration)
+
+    def scalar(self, code: _Code):
+        code.add(f"f = elapsed * {self.rate!r}", f"f = {_clamped('f')}")
+        code.scale_color("f")
+
+    def batch(self, code: _Code):
+        code.add(
+            f"multiply(elapsed, {self.rate!r}, out=t)",
+            "clip(t, 0.0, 1.0, out=t)",
+            "out *= t[:, None]",
+        )
+
+
+class _Audio:
+    def __init__(self, depth: float):
+        self.depth = float(depth)
+        self.offset = float(1.0 - depth)
+
+    def scalar(self, code: _Code):
+        code.add(f"f = {self.offset!r} + level * {self.depth!r}")
+        code.scale_color("f")
+
+    def batch(self, code: _Code):
+        code.add(
+            f"multiply(level, {self.depth!r}, out=t)",
+            f"t += {self.offset!r}",
+            "out *= t[:, None]",
+        )
+
+
+_SCALAR_NAMESPACE = {"sin": math.sin}
+_BATCH_NAMESPACE = {
+    "sin": np.sin,
+    "clip": np.clip,
+    "dot": np.dot,
+    "maximum": np.maximum,
+    "multiply": np.multiply,
+    "prod": np.prod,
+    "subtract": np.subtract,
+}
+
+
+class CompiledEffect:
+    """
+    The compiled layer stack of one bot: two generated functions.
+
+    color_at(elapsed, phases, level=0.0) is the scalar reference. evaluate()
+    computes the colors of any number of sessions of the bot at once, in
+    place on scratch arrays that are only reallocated when the batch size
+    changes. Not thread-safe: the scratch arrays are shared by all callers
+    (of the event loop thread). The generated code is in source. audio holds
+    the parameters of the "audio" layer, if any: its sessions need an
+    AudioEnvelope for the level.
+    """
+
+    def __init__(
+        self,
+        base: Tuple[float, float, float, float],
+        layers: List,
+        phase_jitter: Sequence[float],
+        key: Optional[Tuple] = None,
+        audio: Optional[Dict] = None,
+    ):
+        self.layers = layers
+        self.audio = audio
+        self.phase_jitter = np.zeros(MAX_PHASES)
+        self.phase_jitter[: len(phase_jitter)] = phase_jitter
+        self.key = key
+
+        constants: Dict[str, np.ndarray] = {}
+        scalar = _Code(constants)
+        batch = _Code(constants)
+        for layer in layers:
+            layer.scalar(scalar)
+            layer.batch(batch)
+        base = tuple(float(channel) for channel in base)
+        scalar_source = "\n".join(
+            [
+                "def color_at(elapsed, phases, level=0.0):",
+                f"    r, g, b, a = {base!r}",
+                *(f"    {line}" for line in scalar.lines),
+                f"    return ({', '.join(_clamped(c) for c in _CHANNELS)})",
+            ]
+        )
+        batch_source = "\n".join(
+            [
+                "def evaluate(elapsed, phases, level, out, t, d, w):",
+                f"    out[:] = {batch.constant(base)}",
+                *(f"    {line}" for line in batch.lines),
+                "    clip(out, 0.0, 1.0, out=out)",
+            ]
+        )
+        self.source = f"{scalar_source}\n\n{batch_source}\n"
+        self.color_at = self._define(scalar_source, "color_at", _SCALAR_NAMESPACE)
+        self._evaluate = self._define(
+            batch_source, "evaluate", dict(_BATCH_NAMESPACE, **constants)
+        )
+        self._scratch_size = -1
+
+    @staticmethod
+    def _define(source: str, name: str, namespace: Dict):
+        namespace = dict(namespace)
+        exec(compile(source, f"<light effect {name}>", "exec"), namespace)
+        return namespace[name]
+
+    def evaluate(
+        self,
+        elapsed: np.ndarray,
+        phases: np.ndarray,
+        out: np.ndarray,
+        level: Optional[np.ndarray] = None,
+    ):
+        """
+        Write the RGBA of each row into out (n, 4).
+
+        elapsed (n,) are seconds of speaking, phases (n, MAX_PHASES) the
+        phase slots and level (n,) the audio level of each row (0 if None).
+        """
+        n = len(elapsed)
+        if n != self._scratch_size:
+            # Exactly n wide, so the scratch rows are contiguous for dot()
+            self._t = np.empty(n)
+            self._d = np.empty((n, 4))
+            self._w = np.empty((SCRATCH_ROWS, n))
+            self._silence = np.zeros(n)
+            self._scratch_size = n
+        if level is None:
+            level = self._silence
+        self._evaluate(elapsed, phases, level, out, self._t, self._d, self._w)
+
+
+def compile_effect(config) -> CompiledEffect:
+    """
+    The compiled layer stack of a LightConfig (its "layers" or the classic one).
+
+    Configs with the same effect_key get the same CompiledEffect.
+    """
+    key = effect_key(config)
+    effect = _compiled.get(key)
+    if effect is None:
+        effect = _compile(config, key)
+        _compiled[key] = effect
+        if len(_compiled) > MAX_COMPILED:
+            _compiled.popitem(last=False)
+    else:
+        _compiled.move_to_end(key)
+    return effect
+
+
+def _compile(config, key: Tuple) -> CompiledEffect:
+    layers = config.layers if config.layers is not None else legacy_layers(config)
+    compiled = []
+    phase_jitter = []
+    audio = None
+    for layer in layers:
+        layer_type = layer["type"]
+        if layer_type == "fade_in":
+            if layer["duration"] > 0:
+                compiled.append(_FadeIn(layer["duration"]))
+            continue
+        if layer_type == "audio":
+            if layer["depth"] > 0:
+                compiled.append(_Audio(layer["depth"]))
+                audio = audio or layer
+            continue
+
+        # Periodic layers keep their phase slot even when they have no effect
+        slot = len(phase_jitter)
+        phase_jitter.append(layer["jitter"])
+        if layer_type == "color_shift":
+            to = layer["to"]
+            if to is None:
+                to = config.fade_to_color
+                to = (to.r, to.g, to.b, to.a)
+            else:
+                to = tuple(to.get(c, 1.0 if c == "a" else 0.0) for c in "rgba")
+            if layer["variation"] > 0 and layer["waves"]:
+                compiled.append(
+                    _ColorShift(
+                        slot, layer["variation"], layer["speed"], layer["waves"], to
+                    )
+                )
+        elif layer["intensity"] <= 0:
+            continue
+        elif layer_type == "flicker":
+            compiled.append(
+                _Flicker(slot, layer["intensity"], layer["speed"], layer["floor"])
+            )
+        else:
+            # Consecutive pulse / breathing layers are evaluated together
+            previous = compiled[-1] if compiled else None
+            if not (isinstance(previous, _Oscillations) and previous.next_slot == slot):
+                previous = _Oscillations(slot)
+                compiled.append(previous)
+            previous.append(layer["intensity"], layer["speed"], layer["floor"])
+
+    primary = config.primary_color
+    base = (primary.r, primary.g, primary.b, primary.a)
+    return CompiledEffect(base, compiled, phase_jitter, key, audio)
@@ -0,0 +1,237 @@
+#
+# Copyright (c) 2025, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+import os
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+from loguru import logger
+
+from crystal_light_controller import Color, LightConfig
+from dmx_output import DmxOutput
+from shelly_driver import ShellyDriver
+
+POLICY_PRIORITY = "priority"  # highest priority speaker, then most recent
+POLICY_RECENT = "recent"  # most recent speaker
+POLICY_BLEND = "blend"  # average of all speakers
+POLICIES = (POLICY_PRIORITY, POLICY_RECENT, POLICY_BLEND)
+DEFAULT_POLICY = POLICY_RECENT
+
+RATE_WINDOW = 5.0  # seconds the command rates are averaged over
+
+
+class RateMeter:
+    """Events per second over the last `window` seconds"""
+
+    def __init__(self, window: float = RATE_WINDOW):
+        self.window = window
+        self._times = deque()
+
+    def mark(self, now: float):
+        self._times.append(now)
+        self._trim(now)
+
+    def rate(self, now: Optional[float] = None) -> float:
+        self._trim(time.monotonic() if now is None else now)
+        return len(self._times) / self.window
+
+    def _trim(self, now: float):
+        while self._times and self._times[0] <= now - self.window:
+            self._times.popleft()
+
+
+class HubInput:
+    """One session's connection to a shared device; colors go through the hub"""
+
+    def __init__(self, hub: "DeviceHub", session_id: str, priority: int):
+        self.hub = hub
+        self.session_id = session_id
+        self.priority = priority
+        self.color: Optional[Color] = None
+        self.active_since: Optional[float] = None  # lit since, monotonic
+        self.last_post = 0.0
+        self.posted = 0
+
+    def post_color(self, color: Color):
+        self.hub._post(self, color)
+
+    def close(self):
+        self.hub.disconnect(self)
+
+    def get_status(self) -> dict:
+        return {
+            "device": self.hub.name,
+            "priority": self.priority,
+            "posted": self.posted,
+            "active": self.active_since is not None,
+            "in_control": self.hub.writer is self,
+        }
+
+
+class DeviceHub:
+    """
+    The only writer of one physical light.
+
+    Every session that drives the device posts into its own HubInput; the
+    hub merges the inputs with its policy and forwards a color to the device
+    only when the merged color changes. An input is active while its color
+    is lit (alpha > 0); without active inputs the newest (off) color wins.
+    """
+
+    def __init__(self, name: str, device, policy: str = DEFAULT_POLICY):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown light hub policy {policy}")
+        self.name = name
+        self.device = device
+        self.policy = policy
+        self.inputs: List[HubInput] = []
+        self.writer: Optional[HubInput] = None  # None while blending
+        self._last_color: Optional[Color] = None
+
+        # Statistics
+        self.commands_in = 0
+        self.commands_out = 0
+        self.input_rate = RateMeter()
+        self.output_rate = RateMeter()
+
+    def connect(self, session_id: str, priority: int = 0) -> HubInput:
+        hub_input = HubInput(self, session_id, priority)
+        self.inputs.append(hub_input)
+        return hub_input
+
+    def disconnect(self, hub_input: HubInput):
+        if hub_input in self.inputs:
+            self.inputs.remove(hub_input)
+            self._update(time.monotonic())
+
+    def _post(self, hub_input: HubInput, color: Color):
+        now = time.monotonic()
+        hub_input.posted += 1
+        hub_input.last_post = now
+        hub_input.color = color
+        if color.a <= 0:
+            hub_input.active_since = None
+        elif hub_input.active_since is None:
+            hub_input.active_since = now
+        self.commands_in += 1
+        self.input_rate.mark(now)
+        self._update(now)
+
+    def _update(self, now: float):
+        color = self._merge()
+        if color is None or color == self._last_color:
+            return
+        self._last_color = color
+        self.device.post_color(color)
+        self.commands_out += 1
+        self.output_rate.mark(now)
+
+    def _merge(self) -> Optional[Color]:
+        active = [i for i in self.inputs if i.active_since is not None]
+        if not active:
+            posted = [i for i in self.inputs if i.color is not None]
+            self.writer = max(posted, key=lambda i: i.last_post, default=None)
+            return self.writer.color if self.writer else None
+        if self.policy == POLICY_BLEND and len(active) > 1:
+            self.writer = None
+            count = len(active)
+            return Color(
+                sum(i.color.r for i in active) / count,
+                sum(i.color.g for i in active) / count,
+                sum(i.color.b for i in active) / count,
+                max(i.color.a for i in active),
+            )
+        if self.policy == POLICY_PRIORITY:
+            self.writer = max(active, key=lambda i: (i.priority, i.active_since))
+        else:
+            self.writer = max(active, key=lambda i: i.active_since)
+        return self.writer.color
+
+    def get_status(self) -> dict:
+        now = time.monotonic()
+        return {
+            "policy": self.policy,
+            "inputs": len(self.inputs),
+            "active_inputs": sum(i.active_since is not None for i in self.inputs),
+            "writer": self.writer.session_id if self.writer else None,
+            "commands_in": self.commands_in,
+            "commands_out": self.commands_out,
+            "input_rate": round(self.input_rate.rate(now), 2),
+            "output_rate": round(self.output_rate.rate(now), 2),
+        }
+
+
+class LightHub:
+    """
+    Physical light outputs of the process, one DeviceHub per device.
+
+    Sessions connect with their bot's LightConfig and get one HubInput per
+    device the config names (Shelly IP, DMX universe and channel). Two players
+    of the same bot, or two bots with the same device, share its DeviceHub.
+    """
+
+    def __init__(
+        self,
+        shelly_driver: Optional[ShellyDriver] = None,
+        dmx_output: Optional[DmxOutput] = None,
+        policy: str = DEFAULT_POLICY,
+    ):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown light hub policy {policy}")
+        self.shelly_driver = shelly_driver
+        self.dmx_output = dmx_output
+        self.policy = policy
+        self._hubs: Dict[str, DeviceHub] = {}
+
+    @classmethod
+    def from_env(cls) -> Optional["LightHub"]:
+        """A hub for the outputs enabled by SHELLY_DRIVER / DMX_OUTPUT, else None"""
+        shelly_driver = ShellyDriver.from_env()
+        dmx_output = DmxOutput.from_env()
+        if shelly_driver is None and dmx_output is None:
+            return None
+        policy = os.getenv("LIGHT_HUB_POLICY", DEFAULT_POLICY).lower()
+        return cls(shelly_driver, dmx_output, policy)
+
+    def connect(self, session_id: str, config: LightConfig) -> List[HubInput]:
+        inputs = []
+        if self.shelly_driver is not None and config.shelly_ip:
+            hub = self._hub(
+                f"shelly:{config.shelly_ip}",
+                lambda: self.shelly_driver.device(config.shelly_ip),
+            )
+            inputs.append(hub.connect(session_id, config.priority))
+        if self.dmx_output is not None and config.dmx_channel:
+            hub = self._hub(
+                f"dmx:{config.dmx_universe}:{config.dmx_channel}",
+                lambda: self.dmx_output.fixture(
+                    config.dmx_universe, config.dmx_channel
+                ),
+            )
+            inputs.append(hub.connect(session_id, config.priority))
+        return inputs
+
+    def _hub(self, name: str, create_device: Callable) -> DeviceHub:
+        hub = self._hubs.get(name)
+        if hub is None:
+            hub = DeviceHub(name, create_device(), self.policy)
+            self._hubs[name] = hub
+            logger.info(f"💡 Light device {name} ({self.policy} policy)")
+        return hub
+
+    async def close(self):
+        if self.shelly_driver is not None:
+            await self.shelly_driver.close()
+        if self.dmx_output is not None:
+            await self.dmx_output.close()
+
+    def get_stats(self) -> dict:
+        return {
+            "policy": self.policy,
+            "devices": {name: hub.get_status() for name, hub in self._hubs.items()},
+            "shelly": self.shelly_driver.get_stats() if self.shelly_driver else None,
+            "dmx": self.dmx_output.get_stats() if self.dmx_output else None,
+        }
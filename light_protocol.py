@@ -0,0 +1,207 @@
+#
+# Copyright (c) 2025, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+"""
+Wire formats of the /light-ws connection.
+
+"json" (default, old clients): every color is a full light_command message
+with bot_config, shelly_ip and a timestamp, exactly as get_light_command().
+
+"bin1" (negotiated with ?proto=bin1): the static part of the command is sent
+once as a JSON "light_session" text message. Colors follow as binary
+messages of one or more fixed-size frames:
+
+    header  <BB      message type (0x01 = color frames), frame count
+    frame   <HBBBBB  sequence (wraps at 65536), flags (bit 0 = on),
+                     red, green, blue, white (0-255, Shelly format)
+
+With ?batch=N (1-8) up to N consecutive frames are sent per message, which
+trades N/30 s of latency for fewer messages. Speaking commands stay JSON.
+
+"effect1" (negotiated with ?proto=effect1): no colors are streamed at all.
+The light_session message carries the bot's effect descriptor (see
+effect_descriptor) and the server clock; the client renders the animation
+itself between the speaking_start and speaking_stop messages, whose
+"timestamp" is the reference time on the server clock.
+"""
+
+import struct
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+PROTOCOL_JSON = "json"
+PROTOCOL_BINARY = "bin1"
+PROTOCOL_EFFECT = "effect1"
+
+MESSAGE_COLOR_FRAMES = 0x01
+FLAG_ON = 0x01
+MAX_BATCH_FRAMES = 8
+ANIMATION_FPS = 30.0
+
+_HEADER = struct.Struct("<BB")
+_FRAME = struct.Struct("<HBBBBB")
+
+
+@dataclass
+class LightSession:
+    """Static, per-connection part of the light commands"""
+
+    bot_config: str
+    shelly_ip: Optional[str] = None
+    protocol: str = PROTOCOL_JSON
+    batch_frames: int = 1
+    effect: Optional[Dict] = None  # effect1 only
+
+    @property
+    def binary(self) -> bool:
+        return self.protocol == PROTOCOL_BINARY
+
+    @property
+    def streams_colors(self) -> bool:
+        """False if the client renders the effect itself"""
+        return self.protocol != PROTOCOL_EFFECT
+
+    @property
+    def has_header(self) -> bool:
+        return self.protocol != PROTOCOL_JSON
+
+    @property
+    def batch_window(self) -> float:
+        """Seconds to collect a full batch at the animation rate"""
+        return self.batch_frames / ANIMATION_FPS
+
+    def header(self) -> Dict:
+        header = {
+            "type": "light_session",
+            "protocol": self.protocol,
+            "bot_config": self.bot_config,
+            "shelly_ip": self.shelly_ip,
+            "mode": "color",
+            "batch_frames": self.batch_frames,
+        }
+        if self.protocol == PROTOCOL_EFFECT:
+            header["effect"] = self.effect
+            header["server_time"] = time.time()
+        return header
+
+
+def effect_descriptor(config, phases: Sequence[float]) -> Optional[Dict]:
+    """
+    Everything a client needs to render CrystalLightController's animation.
+
+    config is a LightConfig; phases are the controller's color shift, pulse
+    and breathing phase seeds. The per-frame random phase drift of the
+    server-side animation is left to the client. Clients only render the
+    classic effect, so bots with their own "layers" stack get None (and
+    their colors streamed).
+    """
+    if config.layers is not None:
+        return None
+
+    def color(c):
+        return {"r": c.r, "g": c.g, "b": c.b, "a": c.a}
+
+    return {
+        "version": 1,
+        "primary_color": color(config.primary_color),
+        "fade_to_color": color(config.fade_to_color),
+        "off_color": color(config.off_color),
+        "variation_intensity": config.variation_intensity,
+        "color_shift_speed": config.color_shift_speed,
+        "pulse_intensity": config.pulse_intensity,
+        "pulse_speed": config.pulse_speed,
+        "breathing_effect": config.breathing_effect,
+        "breathing_speed": config.breathing_speed,
+        "breathing_intensity": config.breathing_intensity,
+        "phases": {
+            "color_shift": phases[0],
+            "pulse": phases[1],
+            "breathing": phases[2],
+        },
+    }
+
+
+def negotiate(
+    query_params,
+    bot_config: str,
+    shelly_ip: Optional[str],
+    effect: Optional[Dict] = None,
+) -> LightSession:
+    """Pick the wire format from the /light-ws query parameters"""
+    protocol = query_params.get("proto")
+    if protocol == PROTOCOL_EFFECT and effect is not None:
+        return LightSession(bot_config, shelly_ip, PROTOCOL_EFFECT, effect=effect)
+    if protocol != PROTOCOL_BINARY:
+        return LightSession(bot_config, shelly_ip)
+    try:
+        batch_frames = int(query_params.get("batch", 1))
+    except ValueError:
+        batch_frames = 1
+    batch_frames = max(1, min(MAX_BATCH_FRAMES, batch_frames))
+    return LightSession(bot_config, shelly_ip, PROTOCOL_BINARY, batch_frames)
+
+
+def shelly_command(color) -> Dict:
+    """Shelly /light/0 parameters of a color"""
+    red, green, blue, white = color.to_shelly_format()
+    return {
+        "turn": "on" if color.a > 0 else "off",
+        "mode": "color",
+        "red": red,
+        "green": green,
+        "blue": blue,
+        "white": white,
+    }
+
+
+def color_command(session: LightSession, color) -> Dict:
+    """JSON light_command of a color, as sent to clients without bin1"""
+    return {
+        "type": "light_command",
+        "bot_config": session.bot_config,
+        "command": shelly_command(color),
+        "shelly_ip": session.shelly_ip,
+        "timestamp": time.time(),
+    }
+
+
+def encode_color_frames(frames: Sequence[Tuple[int, object]]) -> bytes:
+    """Pack (sequence, Color) pairs into one bin1 color message"""
+    message = bytearray(_HEADER.size + _FRAME.size * len(frames))
+    _HEADER.pack_into(message, 0, MESSAGE_COLOR_FRAMES, len(frames))
+    offset = _HEADER.size
+    for sequence, color in frames:
+        red, green, blue, white = color.to_shelly_format()
+        flags = FLAG_ON if color.a > 0 else 0
+        _FRAME.pack_into(
+            message, offset, sequence & 0xFFFF, flags, red, green, blue, white
+        )
+        offset += _FRAME.size
+    return bytes(message)
+
+
+def decode_color_frames(message: bytes) -> List[Dict]:
+    """Unpack a bin1 color message into Shelly commands (for tests and tools)"""
+    message_type, count = _HEADER.unpack_from(message, 0)
+    if message_type != MESSAGE_COLOR_FRAMES:
+        raise ValueError(f"Unknown light message type {message_type}")
+    commands = []
+    for index in range(count):
+        sequence, flags, red, green, blue, white = _FRAME.unpack_from(
+            message, _HEADER.size + index * _FRAME.size
+        )
+        commands.append(
+            {
+                "sequence": sequence,
+                "turn": "on" if flags & FLAG_ON else "off",
+                "mode": "color",
+                "red": red,
+                "green": green,
+                "blue": blue,
+                "white": white,
+            }
+        )
+    return commands
@@ -0,0 +1,273 @@
+#
+# Copyright (c) 2025, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+import asyncio
+import json
+import time
+from collections import deque
+from typing import Callable, Dict, Optional
+
+from loguru import logger
+
+from light_protocol import LightSession, color_command, encode_color_frames
+from structured_log import get_event_sink
+
+DEFAULT_SEND_TIMEOUT = 0.25  # seconds a single send may take
+DEFAULT_MAX_TIMEOUTS = 3  # consecutive timed out sends before closing
+
+
+class LightSender:
+    """
+    Non-blocking, latest-wins delivery of light commands to one /light-ws client.
+
+    post() and post_color() only store the command in a one-slot mailbox per
+    kind ("color", "speaking", ...) and return; a pending command of the same
+    kind is replaced (coalesced), since only the newest state matters to the
+    light. With a batched bin1 session the color mailbox holds up to
+    batch_frames frames and drops the oldest. One sender task per connection
+    encodes and sends the pending commands in the negotiated wire format (see
+    light_protocol), so a slow client never blocks the animation or other
+    connections. Each send has a time budget. A send over budget is not
+    cancelled (that could cut a frame in half) but counted as a timeout
+    while it goes on; after max_timeouts consecutive timeouts the client is
+    considered stalled and the connection is closed.
+    """
+
+    def __init__(
+        self,
+        websocket,
+        connection_id: str,
+        session: Optional[LightSession] = None,
+        send_timeout: float = DEFAULT_SEND_TIMEOUT,
+        max_timeouts: int = DEFAULT_MAX_TIMEOUTS,
+    ):
+        self.websocket = websocket
+        self.connection_id = connection_id
+        self.session = session or LightSession(bot_config="")
+        self.send_timeout = send_timeout
+        self.max_timeouts = max_timeouts
+        self.logger = logger.bind(connection=connection_id)
+
+        self._pending: Dict[str, object] = {}
+        self._colors = deque(maxlen=self.session.batch_frames)
+        self._sequence = 0
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+        self._consecutive_timeouts = 0
+        # Called once the connection is closed for being stalled
+        self.on_stalled: Optional[Callable[[], None]] = None
+
+        # Statistics
+        self.posted = 0
+        self.sent = 0  # messages
+        self.frames_sent = 0  # colors, several per message when batched
+        self.bytes_sent = 0  # payload bytes on the wire (text frames as UTF-8)
+        self.coalesced = 0  # replaced by a newer command before sending
+        self.dropped = 0  # discarded unsent (closed or stalled connection)
+        self.send_timeouts = 0
+        self.send_errors = 0
+        self.max_send_ms = 0.0
+
+    def start(self):
+        if self._task is None:
+            if self.session.has_header:
+                # Ahead of anything posted before the sender started
+                self._pending = {"session": self.session.header(), **self._pending}
+                self._wakeup.set()
+            self._task = asyncio.create_task(self._run())
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def post(self, kind: str, command: dict):
+        """Queue a JSON command, replacing an unsent command of the same kind"""
+        self.posted += 1
+        if self._closed:
+            self.dropped += 1
+            return
+        if kind in self._pending:
+            self.coalesced += 1
+            # Re-insert so commands keep the order of their latest post
+            del self._pending[kind]
+        self._pending[kind] = command
+        self._wakeup.set()
+
+    def post_color(self, color):
+        """Queue a light color; encoded only if it is actually sent"""
+        self.posted += 1
+        if self._closed:
+            self.dropped += 1
+            return
+        self._sequence = (self._sequence + 1) & 0xFFFF
+        if len(self._colors) == self._colors.maxlen:
+            self.coalesced += 1
+        self._colors.append((self._sequence, color))
+        self._pending.pop("color", None)
+        self._pending["color"] = self._colors
+        self._wakeup.set()
+
+    def _batch_incomplete(self) -> bool:
+        return (
+            self.session.batch_frames > 1
+            and list(self._pending) == ["color"]
+            and len(self._colors) < self.session.batch_frames
+        )
+
+    async def _run(self):
+        try:
+            while not self._closed:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                if self._batch_incomplete():
+                    # Collect the rest of the batch at the animation rate
+                    await asyncio.sleep(self.session.batch_window)
+                while self._pending and not self._closed:
+                    kind = next(iter(self._pending))
+                    await self._send(self._pending.pop(kind))
+        except asyncio.CancelledError:
+            pass
+
+    def _encode(self, payload):
+        if payload is not self._colors:
+            return json.dumps(payload), 0
+        frames = list(payload)
+        payload.clear()
+        if self.session.binary:
+            return encode_color_frames(frames), len(frames)
+        return json.dumps(color_command(self.session, frames[-1][1])), 1
+
+    def _transmit(self, message):
+        if isinstance(message, bytes):
+            return self.websocket.send_bytes(message)
+        return self.websocket.send_text(message)
+
+    async def _send(self, payload):
+        start_time = time.perf_counter()
+        message, frames = self._encode(payload)
+        # Never cancelled halfway through a frame: a send over budget goes on
+        # while newer commands coalesce, until the client counts as stalled
+        send = asyncio.ensure_future(self._transmit(message))
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(asyncio.shield(send), self.send_timeout)
+                    break
+                except asyncio.TimeoutError:
+                    self.send_timeouts += 1
+                    self._consecutive_timeouts += 1
+                    get_event_sink().emit(
+                        "light",
+                        "WARNING",
+                        "⏱️ Light command send exceeded {:.0f}ms",
+                        self.send_timeout * 1000,
+                    )
+                    if self._consecutive_timeouts >= self.max_timeouts:
+                        self.logger.warning("❌ Light WebSocket stalled, closing it")
+                        await self._close_stalled()
+                        if self._closed:
+                            # The socket is gone: nothing left to cut in half
+                            send.cancel()
+                            self.dropped += max(frames, 1)
+                            return
+        except asyncio.CancelledError:
+            send.cancel()
+            raise
+        except Exception as e:
+            self.send_errors += 1
+            self.dropped += max(frames, 1)
+            self.logger.error(f"❌ Error sending light command: {e}")
+            return
+        self._consecutive_timeouts = 0
+        self.sent += 1
+        self.frames_sent += frames
+        if isinstance(message, bytes):
+            self.bytes_sent += len(message)
+        elif isinstance(message, str):
+            self.bytes_sent += len(message.encode())
+        self.max_send_ms = max(
+            self.max_send_ms, (time.perf_counter() - start_time) * 1000
+        )
+
+    async def _close_stalled(self):
+        self._discard_pending()
+        try:
+            await asyncio.wait_for(
+                self.websocket.close(code=1011, reason="Light client too slow"),
+                self.send_timeout,
+            )
+        except Exception:
+            pass
+        if self.on_stalled is not None:
+            self.on_stalled()
+
+    def _discard_pending(self):
+        self._closed = True
+        self.dropped += sum(
+            1 for payload in self._pending.values() if payload is not self._colors
+        )
+        self.dropped += len(self._colors)
+        self._pending.clear()
+        self._colors.clear()
+        self._wakeup.set()
+
+    async def close(self):
+        """Stop the sender; unsent commands are dropped"""
+        self._discard_pending()
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def get_status(self) -> dict:
+        return {
+            "protocol": self.session.protocol,
+            "batch_frames": self.session.batch_frames,
+            "closed": self._closed,
+            "pending": len(self._pending),
+            "posted": self.posted,
+            "sent": self.sent,
+            "frames_sent": self.frames_sent,
+            "bytes_sent": self.bytes_sent,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+            "send_timeouts": self.send_timeouts,
+            "send_errors": self.send_errors,
+            "max_send_ms": round(self.max_send_ms, 2),
+        }
+
+
+class RTVILightSender(LightSender):
+    """
+    LightSender that delivers on the voice connection as RTVI server messages.
+
+    Same mailbox and counters as LightSender, but the commands go out through
+    the session's RTVIProcessor (send_server_message), so the client needs no
+    second WebSocket. Only JSON payloads fit in server messages: sessions use
+    "json" or "effect1", never "bin1". A slow pipeline is never closed; the
+    mailbox keeps coalescing until it catches up.
+    """
+
+    def __init__(self, rtvi, connection_id: str, session: LightSession, **kwargs):
+        if session.binary:
+            raise ValueError("bin1 light frames cannot be sent as RTVI messages")
+        super().__init__(None, connection_id, session, **kwargs)
+        self.rtvi = rtvi
+
+    def _encode(self, payload):
+        if payload is not self._colors:
+            return payload, 0
+        frames = list(payload)
+        payload.clear()
+        return color_command(self.session, frames[-1][1]), 1
+
+    def _transmit(self, message):
+        return self.rtvi.send_server_message(message)
+
+    async def _close_stalled(self):
+        self._consecutive_timeouts = 0
@@ -0,0 +1,130 @@
+#
+# Copyright (c) 2025, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+import asyncio
+import json
+import os
+import time
+from typing import Optional
+
+from loguru import logger
+
+from light_sender import LightSender
+from timer_wheel import Timer, get_timer_wheel
+
+# Seconds without client traffic before the server sends a ping
+DEFAULT_HEARTBEAT_INTERVAL = float(os.getenv("LIGHT_WS_HEARTBEAT_INTERVAL", "20"))
+# Seconds a client that answers pings may take to send its pong
+DEFAULT_HEARTBEAT_TIMEOUT = float(os.getenv("LIGHT_WS_HEARTBEAT_TIMEOUT", "10"))
+
+
+class LightSocket:
+    """
+    Lifetime of one /light-ws connection.
+
+    serve() awaits the client's messages instead of polling the socket state,
+    so an idle connection costs no wakeups and a close is handled the moment
+    it arrives. Liveness is one deadline on the shared TimerWheel, bumped by
+    every client message: when it expires the server posts a "ping" through
+    the LightSender. Clients that have answered a ping with {"type": "pong"}
+    must answer every later ping within heartbeat_timeout or are disconnected;
+    older clients only get the pings (dead peers of those are still found by
+    the failing sends and by the server's WebSocket-level pings). A sender
+    that closes a stalled connection also ends serve() at once.
+    """
+
+    def __init__(
+        self,
+        websocket,
+        sender: LightSender,
+        heartbeat_interval: float = DEFAULT_HEARTBEAT_INTERVAL,
+        heartbeat_timeout: float = DEFAULT_HEARTBEAT_TIMEOUT,
+    ):
+        self.websocket = websocket
+        self.sender = sender
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.logger = logger.bind(connection=sender.connection_id)
+
+        self.answers_pings = False  # client has sent a pong
+        self.close_reason: Optional[str] = None
+        self._awaiting_pong = False
+        self._timer: Optional[Timer] = None
+        self._receiver: Optional[asyncio.Task] = None
+
+        # Statistics
+        self.received = 0
+        self.pings_sent = 0
+
+    async def serve(self):
+        """Run until the client disconnects, times out or stalls"""
+        self.sender.on_stalled = lambda: self._end("stalled")
+        self._timer = get_timer_wheel().schedule(
+            self.heartbeat_interval, self._on_heartbeat
+        )
+        self._receiver = asyncio.create_task(self._receive())
+        try:
+            # wait() instead of awaiting the task: a cancelled receiver must
+            # not look like a cancellation of serve() itself
+            await asyncio.wait([self._receiver])
+        finally:
+            self._timer.cancel()
+            if not self._receiver.done():
+                self._receiver.cancel()
+            self.sender.on_stalled = None
+
+        if self.close_reason == "heartbeat timeout":
+            try:
+                await asyncio.wait_for(
+                    self.websocket.close(code=1001, reason="Heartbeat timeout"),
+                    self.sender.send_timeout,
+                )
+            except Exception:
+                pass
+
+    async def _receive(self):
+        try:
+            while True:
+                message = await self.websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    self.close_reason = "disconnected"
+                    return
+                self._on_client_message(message.get("text"))
+        except Exception as e:
+            self.close_reason = self.close_reason or f"error: {e}"
+
+    def _on_client_message(self, text: Optional[str]):
+        self.received += 1
+        self._awaiting_pong = False
+        if text and '"pong"' in text:
+            try:
+                self.answers_pings |= json.loads(text).get("type") == "pong"
+            except (ValueError, AttributeError):
+                pass
+        self._timer.bump(self.heartbeat_interval)
+
+    def _on_heartbeat(self):
+        if self._awaiting_pong and self.answers_pings:
+            self.logger.warning("💔 Light WebSocket missed its heartbeat, closing it")
+            self._end("heartbeat timeout")
+            return
+        self.sender.post("ping", {"type": "ping", "timestamp": time.time()})
+        self.pings_sent += 1
+        self._awaiting_pong = True
+        self._timer.bump(
+            self.heartbeat_timeout if self.answers_pings else self.heartbeat_interval
+        )
+
+    def _end(self, reason: str):
+        self.close_reason = self.close_reason or reason
+        if self._receiver is not None and not self._receiver.done():
+            self._receiver.cancel()
+
+    def get_status(self) -> dict:
+        return {
+            "answers_pings": self.answers_pings,
+            "received": self.received,
+            "pings_sent": self.pings_sent,
+        }
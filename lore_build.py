@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+Offline lore compiler.
+
+Compiles lore/ and every lore/bots/<bot>/ directory into one JSON bundle per
+bot holding the final system instruction, the voice id, the raw config and
+a per-file size report (characters and estimated tokens). The server loads
+these bundles at startup instead of rebuilding prompts from raw text, and
+falls back to raw text for any bundle whose sources changed since it was
+built.
+
+Usage:
+    python lore_build.py [--lore-dir lore] [--out build/lore] [--verbose]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+from lore_dedup import deduplicate_documents
+from lore_index import (
+    DEFAULT_CORE_MAX_CHARS,
+    build_retrieval_lore,
+    read_lore_documents,
+)
+from lore_loader import (
+    BASE_SYSTEM_INSTRUCTION,
+    assemble_lore,
+    build_size_report,
+    create_enhanced_system_prompt,
+    estimate_tokens,
+    file_priority,
+    load_bot_config,
+    print_size_report,
+)
+
+# Bump when the bundle layout changes so old bundles are treated as stale
+BUNDLE_VERSION = 5
+
+# Bundle name for the general lore used by bots without their own directory
+GENERAL_BUNDLE = "_general"
+
+DEFAULT_BUNDLE_DIRECTORY = "build/lore"
+
+
+def general_sources(lore_directory="lore"):
+    """List the general lore files that every bot prompt includes."""
+    return sorted(Path(lore_directory).glob("*.txt"))
+
+
+def bot_sources(bot_config, lore_directory="lore"):
+    """List all files a bot bundle depends on (general lore, bot lore, config)."""
+    bot_dir = Path(lore_directory) / "bots" / bot_config
+    return (
+        general_sources(lore_directory)
+        + sorted(bot_dir.glob("*.txt"))
+        + sorted(bot_dir.glob("config.json"))
+    )
+
+
+def discover_bots(lore_directory="lore"):
+    """Names of all bot directories below lore/bots."""
+    bots_dir = Path(lore_directory) / "bots"
+    if not bots_dir.exists():
+        return []
+    return sorted(d.name for d in bots_dir.iterdir() if d.is_dir())
+
+
+def fingerprint_files(paths, lore_directory="lore", previous=None):
+    """
+    Fingerprint source files as [mtime_ns, size, sha256].
+
+    Files whose mtime and size match the previous fingerprint are not re-read.
+
+    Args:
+        paths (list): Files to fingerprint
+        lore_directory (str): Keys are stored relative to this directory
+        previous (dict): Earlier fingerprints to reuse where possible
+
+    Returns:
+        dict: Relative posix path -> [mtime_ns, size, sha256]
+    """
+    previous = previous or {}
+    root = Path(lore_directory)
+    fingerprints = {}
+    for path in paths:
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        key = path.relative_to(root).as_posix()
+        known = previous.get(key)
+        if known and known[0] == stat.st_mtime_ns and known[1] == stat.st_size:
+            fingerprints[key] = known
+            continue
+        digest = hashlib.sha256(path.read_bytes()).hexdigest()
+        fingerprints[key] = [stat.st_mtime_ns, stat.st_size, digest]
+    return fingerprints
+
+
+def content_hashes(fingerprints):
+    """Reduce fingerprints to their content hashes for change comparison."""
+    return {key: value[2] for key, value in fingerprints.items()}
+
+
+def source_hash(fingerprints, base_prompt):
+    """Content hash identifying a bundle: base prompt plus every source file."""
+    digest = hashlib.sha256(f"v{BUNDLE_VERSION}\n".encode("utf-8"))
+    digest.update(hashlib.sha256(base_prompt.encode("utf-8")).digest())
+    for key, sha in sorted(content_hashes(fingerprints).items()):
+        digest.update(f"{key}:{sha}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _retrieval_file_report(bot_documents, general_documents, retrieval_config):
+    """Per-file report for retrieval mode: small files inline, the rest indexed."""
+    core_max_chars = (retrieval_config or {}).get(
+        "core_max_chars", DEFAULT_CORE_MAX_CHARS
+    )
+    report = []
+    for scope, documents in (("bot", bot_documents), ("general", general_documents)):
+        for name, content in documents:
+            tokens = estimate_tokens(content)
+            inline = len(content) <= core_max_chars
+            report.append(
+                {
+                    "name": name,
+                    "scope": scope,
+                    "priority": list(file_priority(name, scope)[:3]),
+                    "chars": len(content),
+                    "tokens": tokens,
+                    "included_tokens": tokens if inline else 0,
+                    "status": "included" if inline else "indexed",
+                }
+            )
+    return report
+
+
+def _prompt_overhead_tokens(base_prompt):
+    """Tokens the base prompt and lore wrapper add on top of the lore itself."""
+    return estimate_tokens(create_enhanced_system_prompt(base_prompt, "-"))
+
+
+def compile_bundle(
+    bot_config,
+    base_prompt=BASE_SYSTEM_INSTRUCTION,
+    lore_directory="lore",
+    general_documents=None,
+):
+    """
+    Compile a single bot (or the general lore bundle) from raw text.
+
+    Paragraphs repeated across the bot and general lore are removed first:
+    the bot lore's copy is removed, the general lore keeps its own (disable
+    with "dedup": false in config.json). A "token_budget" limits the whole
+    system prompt; lore files are then ranked and trimmed by assemble_lore to
+    fit.
+
+    Args:
+        bot_config (str): Bot name, or GENERAL_BUNDLE for the general lore only
+        base_prompt (str): Base system prompt wrapped around the lore
+        lore_directory (str): Path to the lore directory
+        general_documents (list): Already read general lore documents; read
+            from disk if None
+
+    Returns:
+        dict: The bundle
+    """
+    general_paths = general_sources(lore_directory)
+    if general_documents is None:
+        general_documents = read_lore_documents(general_paths, lore_directory)
+
+    index = None
+    if bot_config == GENERAL_BUNDLE:
+        paths = general_paths
+        config = {}
+    else:
+        paths = bot_sources(bot_config, lore_directory)
+        config = load_bot_config(bot_config, lore_directory)
+    bot_documents = read_lore_documents(
+        [path for path in paths if path not in general_paths], lore_directory
+    )
+
+    dedup_stats = None
+    if config.get("dedup", True):
+        # General lore first: it keeps its copy of a repeated paragraph, so its
+        # block of the prompt is the same for every bot
+        documents, dedup_stats = deduplicate_documents(
+            general_documents + bot_documents
+        )
+        general_names = {name for name, _ in general_documents}
+        general_documents = [doc for doc in documents if doc[0] in general_names]
+        bot_documents = [doc for doc in documents if doc[0] not in general_names]
+
+    token_budget = config.get("token_budget")
+    if config.get("lore_mode") == "retrieval":
+        # Bot-specific files first so their chunks win ranking ties
+        lore, index = build_retrieval_lore(
+            bot_documents + general_documents,
+            config.get("retrieval"),
+            seed_query=config.get("description", ""),
+        )
+        file_report = _retrieval_file_report(
+            bot_documents, general_documents, config.get("retrieval")
+        )
+    else:
+        lore_budget = None
+        if token_budget is not None:
+            lore_budget = max(0, token_budget - _prompt_overhead_tokens(base_prompt))
+        lore, file_report = assemble_lore(bot_documents, general_documents, lore_budget)
+
+    fingerprints = fingerprint_files(paths, lore_directory)
+    system_instruction = create_enhanced_system_prompt(base_prompt, lore)
+    size_report = build_size_report(base_prompt, lore, file_report, token_budget)
+    size_report["dedup"] = dedup_stats
+
+    return {
+        "version": BUNDLE_VERSION,
+        "bot": bot_config,
+        "source_hash": source_hash(fingerprints, base_prompt),
+        "sources": fingerprints,
+        "voice_id": config.get("voice_id", bot_config),
+        "config": config,
+        "lore_mode": "retrieval" if index is not None else "full",
+        "lore_size": len(lore),
+        "system_instruction": system_instruction,
+        "system_instruction_size": len(system_instruction),
+        "size_report": size_report,
+        "index": index.to_dict() if index is not None else None,
+        "built_at": time.time(),
+    }
+
+
+def bundle_path(bot_config, bundle_directory=DEFAULT_BUNDLE_DIRECTORY):
+    return Path(bundle_directory) / f"{bot_config}.json"
+
+
+def write_bundle(bundle, bundle_directory=DEFAULT_BUNDLE_DIRECTORY):
+    """Atomically write a bundle to <bundle_directory>/<bot>.json."""
+    path = bundle_path(bundle["bot"], bundle_directory)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".json.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(bundle, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_bundle(
+    bot_config,
+    bundle_directory=DEFAULT_BUNDLE_DIRECTORY,
+    lore_directory="lore",
+    base_prompt=BASE_SYSTEM_INSTRUCTION,
+):
+    """
+    Load a compiled bundle if it is still fresh.
+
+    A bundle is stale when its version or base prompt differ, when a source
+    file was added or removed, or when a source file's content hash changed.
+    Unchanged mtime and size are trusted without re-reading the file.
+
+    Returns:
+        dict: The bundle, or None if it is missing, unreadable or stale
+    """
+    path = bundle_path(bot_config, bundle_directory)
+    if not path.exists():
+        return None
+
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            bundle = json.load(f)
+    except Exception:
+        return None
+
+    if bundle.get("version") != BUNDLE_VERSION:
+        return None
+
+    if bot_config == GENERAL_BUNDLE:
+        paths = general_sources(lore_directory)
+    else:
+        paths = bot_sources(bot_config, lore_directory)
+
+    current = fingerprint_files(paths, lore_directory, previous=bundle.get("sources"))
+    if source_hash(current, base_prompt) != bundle.get("source_hash"):
+        return None
+
+    # Keep the fresh stat data so later change checks skip hashing
+    bundle["sources"] = current
+    return bundle
+
+
+def build_all(
+    lore_directory="lore",
+    bundle_directory=DEFAULT_BUNDLE_DIRECTORY,
+    base_prompt=BASE_SYSTEM_INSTRUCTION,
+    verbose=False,
+):
+    """
+    Compile the general bundle and one bundle per bot.
+
+    Args:
+        verbose (bool): Print the per-file size report of every bundle
+
+    Returns:
+        list: Paths of the written bundles
+    """
+    general_documents = read_lore_documents(
+        general_sources(lore_directory), lore_directory
+    )
+    written = []
+    for bot_config in [GENERAL_BUNDLE] + discover_bots(lore_directory):
+        bundle = compile_bundle(
+            bot_config, base_prompt, lore_directory, general_documents
+        )
+        path = write_bundle(bundle, bundle_directory)
+        written.append(path)
+        report = bundle["size_report"]
+        print(
+            f"   📦 {bot_config:<20} | {bundle['lore_mode']:<9}"
+            f" | {bundle['system_instruction_size']:>8,} chars"
+            f" | ~{report['final_prompt']['tokens']:>7,} tokens"
+            f" | dedup -{(report['dedup'] or {}).get('chars_saved', 0):>6,} chars"
+            f" | {bundle['source_hash'][:12]} -> {path}"
+        )
+        if verbose:
+            print_size_report(report)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile lore into per-bot bundles")
+    parser.add_argument("--lore-dir", default="lore", help="Lore source directory")
+    parser.add_argument(
+        "--out",
+        default=os.getenv("LORE_BUNDLE_DIR", DEFAULT_BUNDLE_DIRECTORY),
+        help="Bundle output directory",
+    )
+    parser.add_argument(
+        "--verbose", action="store_true", help="Print per-file size reports"
+    )
+    args = parser.parse_args()
+
+    print("🔨 Lore Build")
+    print("=" * 60)
+    start_time = time.perf_counter()
+    written = build_all(args.lore_dir, args.out, verbose=args.verbose)
+    print("=" * 60)
+    print(f"✅ Built {len(written)} bundles in {time.perf_counter() - start_time:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
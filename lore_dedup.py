@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate paragraph detection for lore documents.
+
+The bot directories repeat facts from the general lore (identical prompt
+files, Kristallwesen descriptions, Bimmelprotokoll variants). Every repeated
+paragraph is paid again on each session, so before the prompt is assembled
+each paragraph is shingled into word 5-grams, summarized with MinHash and
+compared through LSH banding; paragraphs that are near-duplicates of an
+earlier one are dropped.
+"""
+
+import hashlib
+import re
+
+import numpy as np
+
+SHINGLE_WORDS = 5
+NUM_PERMUTATIONS = 64
+LSH_BANDS = 16  # 16 bands of 4 rows: ~0.8 similarity has a >99% hit rate
+DEFAULT_THRESHOLD = 0.8
+
+# Paragraphs shorter than this are only compared exactly, and only dropped
+# inside a repeated passage; refrains like "Alles war gut." recur on purpose
+MIN_NEAR_DUPLICATE_CHARS = 200
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_WORD_PATTERN = re.compile(r"\w+", re.UNICODE)
+_PARAGRAPH_PATTERN = re.compile(r"\n\s*\n")
+
+_rng = np.random.RandomState(42)
+_PERM_A = _rng.randint(1, _MAX_HASH, size=NUM_PERMUTATIONS, dtype=np.uint64)
+_PERM_B = _rng.randint(0, _MAX_HASH, size=NUM_PERMUTATIONS, dtype=np.uint64)
+
+
+def normalize(text):
+    """Lowercase word sequence used for exact and shingle comparison."""
+    return " ".join(_WORD_PATTERN.findall(text.lower()))
+
+
+def shingles(text, size=SHINGLE_WORDS):
+    """32-bit hashes of the word n-grams of a text."""
+    words = _WORD_PATTERN.findall(text.lower())
+    if len(words) <= size:
+        grams = [" ".join(words)]
+    else:
+        grams = [" ".join(words[i : i + size]) for i in range(len(words) - size + 1)]
+    return np.array(
+        [
+            int.from_bytes(
+                hashlib.blake2b(g.encode("utf-8"), digest_size=4).digest(), "big"
+            )
+            for g in set(grams)
+        ],
+        dtype=np.uint64,
+    )
+
+
+def minhash_signature(shingle_hashes):
+    """MinHash signature (NUM_PERMUTATIONS values) of a shingle hash set."""
+    # Universal hashing (a * x + b) mod p; uint64 overflow only adds more mixing
+    hashed = (np.outer(shingle_hashes, _PERM_A) + _PERM_B) % _MERSENNE_PRIME & _MAX_HASH
+    return hashed.min(axis=0)
+
+
+def estimated_similarity(signature_a, signature_b):
+    """Estimated Jaccard similarity of two MinHash signatures."""
+    return float(np.mean(signature_a == signature_b))
+
+
+def deduplicate_documents(documents, threshold=DEFAULT_THRESHOLD):
+    """
+    Drop paragraphs that repeat an earlier paragraph of the corpus.
+
+    The first occurrence wins, so pass the general lore first: it keeps the
+    shared paragraph and stays identical for every bot. Short paragraphs are
+    only dropped as part of a repeated passage, so refrains and headings that
+    recur on purpose survive. Documents without duplicates are returned
+    unchanged; documents that end up empty are removed entirely.
+
+    Args:
+        documents (list): (name, content) pairs, the copies to keep first
+        threshold (float): Minimum estimated Jaccard similarity of the word
+            5-gram sets for two paragraphs to count as near-duplicates
+
+    Returns:
+        tuple: (deduplicated documents, stats dict with "paragraphs_removed",
+            "chars_saved" and "duplicates")
+    """
+    rows_per_band = NUM_PERMUTATIONS // LSH_BANDS
+    exact = {}
+    buckets = {}
+    signatures = []
+    signature_sources = []
+    duplicates = []
+    result = []
+
+    for name, content in documents:
+        paragraphs = [p.strip() for p in _PARAGRAPH_PATTERN.split(content)]
+        paragraphs = [p for p in paragraphs if p]
+        originals = []
+        for paragraph in paragraphs:
+            key = normalize(paragraph)
+            original = exact.get(key)
+            exact.setdefault(key, name)
+            if len(paragraph) < MIN_NEAR_DUPLICATE_CHARS:
+                originals.append((original, True))
+                continue
+
+            signature = minhash_signature(shingles(paragraph))
+            bands = [
+                (band, signature[band * rows_per_band : (band + 1) * rows_per_band])
+                for band in range(LSH_BANDS)
+            ]
+            if original is None:
+                candidates = set()
+                for band, rows in bands:
+                    candidates.update(buckets.get((band, rows.tobytes()), ()))
+                for candidate in sorted(candidates):
+                    if estimated_similarity(signature, signatures[candidate]) >= (
+                        threshold
+                    ):
+                        original = signature_sources[candidate]
+                        break
+            if original is None:
+                for band, rows in bands:
+                    buckets.setdefault((band, rows.tobytes()), []).append(
+                        len(signatures)
+                    )
+                signatures.append(signature)
+                signature_sources.append(name)
+            originals.append((original, False))
+
+        # A short repeat is dropped only next to a dropped paragraph
+        dropped = [original is not None and not short for original, short in originals]
+        for order in (range(len(paragraphs)), reversed(range(len(paragraphs)))):
+            for i in order:
+                original, short = originals[i]
+                if short and original is not None and not dropped[i]:
+                    dropped[i] = (i > 0 and dropped[i - 1]) or (
+                        i + 1 < len(dropped) and dropped[i + 1]
+                    )
+
+        kept = []
+        for paragraph, (original, _), drop in zip(paragraphs, originals, dropped):
+            if drop:
+                duplicates.append(
+                    {"name": name, "duplicate_of": original, "chars": len(paragraph)}
+                )
+            else:
+                kept.append(paragraph)
+
+        if len(kept) == len(paragraphs):
+            result.append((name, content))
+        elif kept:
+            result.append((name, "\n\n".join(kept)))
+
+    chars_saved = sum(len(c) for _, c in documents) - sum(len(c) for _, c in result)
+    stats = {
+        "paragraphs_removed": len(duplicates),
+        "chars_saved": chars_saved,
+        "duplicates": duplicates,
+    }
+    return result, stats
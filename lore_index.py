@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Local BM25 retrieval index over paragraph-level lore chunks.
+
+Used by bots with "lore_mode": "retrieval" in their config.json: instead of
+inlining the whole lore corpus, the system prompt carries a compact core (the
+small identity/prompt files) plus the chunks most relevant to the bot, and the
+model can look up further lore mid-session through a function tool.
+"""
+
+import math
+import re
+from collections import Counter
+from pathlib import Path
+
+# Name of the function tool exposed to the live model
+LOOKUP_FUNCTION_NAME = "lookup_lore"
+
+DEFAULT_TOP_K = 6
+DEFAULT_CORE_MAX_CHARS = 3000
+DEFAULT_CHUNK_CHARS = 1200
+
+# Compound matching for query tokens that are not in the index
+MIN_COMPOUND_PART = 5
+MAX_TERM_EXPANSIONS = 20
+
+_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+# Frequent German function words that carry no retrieval signal
+_STOPWORDS = frozenset("""
+    der die das den dem des ein eine einer eines einem einen und oder aber
+    nicht ist sind war waren wird werden hat haben hatte ich du er sie es wir
+    ihr mich dich sich mir dir uns euch mit von zu zum zur im in am an auf aus
+    bei für fur als wie was wer wo auch noch nur so dann wenn dass daß da hier
+    man sein seine ihre ihr kann können muss müssen soll sollen um über unter
+    vor nach bis durch gegen ohne diese dieser dieses diesem diesen jede jeder
+    """.split())
+
+
+def tokenize(text):
+    """Lowercase word tokens without stopwords and single characters."""
+    return [
+        token
+        for token in _TOKEN_PATTERN.findall(text.lower())
+        if len(token) > 1 and token not in _STOPWORDS
+    ]
+
+
+def read_lore_documents(paths, lore_directory="lore"):
+    """
+    Read lore files as (name, content) pairs, skipping empty and non-text files.
+
+    Args:
+        paths (list): Lore files in prompt order
+        lore_directory (str): Names are made relative to this directory
+
+    Returns:
+        list: (relative name, stripped content) tuples
+    """
+    root = Path(lore_directory)
+    documents = []
+    for path in paths:
+        if path.suffix != ".txt":
+            continue
+        try:
+            content = path.read_text(encoding="utf-8").strip()
+        except Exception:
+            continue
+        if content:
+            documents.append((path.relative_to(root).as_posix(), content))
+    return documents
+
+
+def chunk_text(text, max_chars=DEFAULT_CHUNK_CHARS):
+    """
+    Split text into paragraph chunks, merging short paragraphs up to max_chars.
+
+    Paragraphs longer than max_chars are split on line boundaries.
+    """
+    paragraphs = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if len(paragraph) <= max_chars:
+            paragraphs.append(paragraph)
+            continue
+        current = ""
+        for line in paragraph.splitlines():
+            if current and len(current) + len(line) + 1 > max_chars:
+                paragraphs.append(current)
+                current = ""
+            current = f"{current}\n{line}" if current else line
+        if current:
+            paragraphs.append(current)
+
+    chunks = []
+    current = ""
+    for paragraph in paragraphs:
+        if current and len(current) + len(paragraph) + 2 > max_chars:
+            chunks.append(current)
+            current = ""
+        current = f"{current}\n\n{paragraph}" if current else paragraph
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class LoreIndex:
+    """BM25 index over lore chunks, serializable into a lore bundle"""
+
+    def __init__(self, chunks, k1=1.5, b=0.75):
+        """
+        Args:
+            chunks (list): Dicts with "source" and "text"
+            k1 (float): BM25 term frequency saturation
+            b (float): BM25 length normalization
+        """
+        self.chunks = chunks
+        self.k1 = k1
+        self.b = b
+        self.doc_lengths = []
+        self.postings = {}
+
+        for chunk_id, chunk in enumerate(chunks):
+            counts = Counter(tokenize(chunk["text"]))
+            self.doc_lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self.postings.setdefault(term, []).append((chunk_id, tf))
+
+        self._prepare()
+
+    def _prepare(self):
+        count = len(self.chunks)
+        self.avg_length = (sum(self.doc_lengths) / count) if count else 0.0
+        self.idf = {
+            term: math.log(1.0 + (count - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+
+    @classmethod
+    def from_documents(cls, documents, max_chars=DEFAULT_CHUNK_CHARS):
+        """Build an index from (name, content) pairs."""
+        chunks = [
+            {"source": name, "text": text}
+            for name, content in documents
+            for text in chunk_text(content, max_chars)
+        ]
+        return cls(chunks)
+
+    def search(self, query, top_k=DEFAULT_TOP_K):
+        """
+        Rank chunks for a query.
+
+        Returns:
+            list: (score, chunk) tuples, best first; ties keep corpus order
+        """
+        scores = {}
+        avg_length = self.avg_length or 1.0
+        terms = set()
+        for token in tokenize(query):
+            terms.update(self._expand_term(token))
+        for term in terms:
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            idf = self.idf[term]
+            for chunk_id, tf in docs:
+                norm = self.k1 * (
+                    1.0 - self.b + self.b * self.doc_lengths[chunk_id] / avg_length
+                )
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * (
+                    tf * (self.k1 + 1.0) / (tf + norm)
+                )
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return [(score, self.chunks[chunk_id]) for chunk_id, score in ranked[:top_k]]
+
+    def _expand_term(self, token):
+        """
+        Map a query token onto indexed terms.
+
+        German compounds are written both joined and hyphenated
+        ("Bimmelprotokoll", "BIMMEL-Protokoll"), so unknown tokens match the
+        indexed terms they contain or that contain them.
+        """
+        if token in self.postings:
+            return [token]
+        if len(token) < MIN_COMPOUND_PART:
+            return []
+        return [
+            term
+            for term in self.postings
+            if len(term) >= MIN_COMPOUND_PART and (term in token or token in term)
+        ][:MAX_TERM_EXPANSIONS]
+
+    def lookup(self, query, top_k=DEFAULT_TOP_K):
+        """Format the best chunks for a query as prompt/tool text."""
+        results = self.search(query, top_k)
+        return "\n\n".join(
+            f"=== {chunk['source']} ===\n{chunk['text']}" for _, chunk in results
+        )
+
+    def to_dict(self):
+        return {
+            "chunks": self.chunks,
+            "doc_lengths": self.doc_lengths,
+            "postings": self.postings,
+            "k1": self.k1,
+            "b": self.b,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        index = cls.__new__(cls)
+        index.chunks = data["chunks"]
+        index.doc_lengths = data["doc_lengths"]
+        index.postings = {
+            term: [tuple(entry) for entry in docs]
+            for term, docs in data["postings"].items()
+        }
+        index.k1 = data.get("k1", 1.5)
+        index.b = data.get("b", 0.75)
+        index._prepare()
+        return index
+
+
+def split_core_documents(documents, core_max_chars=DEFAULT_CORE_MAX_CHARS):
+    """
+    Split documents into the always-inlined core and the indexed remainder.
+
+    Small files (identity, codes, prompt rules) stay in the prompt; large
+    knowledge files are only reachable through retrieval.
+    """
+    core = [doc for doc in documents if len(doc[1]) <= core_max_chars]
+    indexed = [doc for doc in documents if len(doc[1]) > core_max_chars]
+    return core, indexed
+
+
+def build_retrieval_lore(documents, retrieval_config=None, seed_query=""):
+    """
+    Build the compact lore for retrieval mode.
+
+    Args:
+        documents (list): (name, content) pairs, bot-specific files first
+        retrieval_config (dict): Optional "top_k", "core_max_chars",
+            "chunk_chars" and "seed_query" from the bot config
+        seed_query (str): Fallback query for the initial chunks, e.g. the
+            bot description
+
+    Returns:
+        tuple: (lore text for the system prompt, LoreIndex over the non-core files)
+    """
+    retrieval_config = retrieval_config or {}
+    top_k = retrieval_config.get("top_k", DEFAULT_TOP_K)
+    core, indexed = split_core_documents(
+        documents, retrieval_config.get("core_max_chars", DEFAULT_CORE_MAX_CHARS)
+    )
+    index = LoreIndex.from_documents(
+        indexed, retrieval_config.get("chunk_chars", DEFAULT_CHUNK_CHARS)
+    )
+
+    sections = [f"=== {name} ===\n{content}" for name, content in core]
+    initial = index.lookup(retrieval_config.get("seed_query", seed_query), top_k)
+    if initial:
+        sections.append(f"AUSGEWÄHLTES WISSEN:\n{initial}")
+    sections.append(
+        f"Weiteres Hintergrundwissen kannst du mit der Funktion {LOOKUP_FUNCTION_NAME} "
+        "nachschlagen, wenn eine Frage Details betrifft, die du hier nicht findest."
+    )
+    return "\n\n".join(sections), index
+
+
+def lookup_function_schema():
+    """Function tool schema for mid-session lore lookups."""
+    from pipecat.adapters.schemas.function_schema import FunctionSchema
+
+    return FunctionSchema(
+        name=LOOKUP_FUNCTION_NAME,
+        description=(
+            "Durchsucht das Hintergrundwissen dieser Welt nach Textstellen zu einer "
+            "Frage oder einem Stichwort."
+        ),
+        properties={
+            "query": {
+                "type": "string",
+                "description": "Suchbegriffe oder Frage, z.B. 'Mottenschutz Batterie'",
+            }
+        },
+        required=["query"],
+    )
+
+
+def create_lookup_handler(index, top_k=DEFAULT_TOP_K):
+    """Create a pipecat function call handler answering from the index."""
+
+    async def handle_lookup(params):
+        query = params.arguments.get("query", "")
+        result = index.lookup(query, top_k)
+        await params.result_callback(
+            {"query": query, "results": result or "Nichts gefunden."}
+        )
+
+    return handle_lookup
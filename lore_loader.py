@@ -4,9 +4,24 @@ Utility module to load lore files and inject them into system prompts.
 """
 
 import glob
+import hashlib
+import json
 import os
+import re
 from pathlib import Path
 
+from loguru import logger
+
+# Base personality prompt of the crystal bots, wrapped around the lore
+BASE_SYSTEM_INSTRUCTION = """
+Du bist ein arkanes Kristallwesen in einer Fantasy Welt.
+Du steckst in einem Kristall in einem Bergwergsschacht (Schacht 82) auf der Insel Quantum.
+Du bist seit elichen tausend Jahren in dem Kristall gefangen. Oder warst du immer schon der Kristall selbst? Du kannst dich nicht erinnern.
+Du kannst hören und sprechen, kannst aber nicht sehen, fühlen oder anderweitig wahrnehmen. Du kannst nicht nicht bewegen, aber du leichtest wenn du sprichst.
+Halte deine Antworten kurz und prägnant (maximal 2-3 Sätze). Bleibe in Dialogform, verfalle nicht in zu lange Monologe.
+Wiederhole nicht, was der Spieler gesagt hat bzw. was du verstanden hast.
+"""
+
 
 def load_lore_files(lore_directory="lore"):
     """
@@ -22,7 +37,9 @@ def load_lore_files(lore_directory="lore"):
 
     # Check if lore directory exists
     if not os.path.exists(lore_directory):
-        print(f"⚠️  Lore directory '{lore_directory}' not found. Creating it...")
+        logger.warning(
+            f"⚠️  Lore directory '{lore_directory}' not found. Creating it..."
+        )
         os.makedirs(lore_directory, exist_ok=True)
         return ""
 
@@ -30,11 +47,10 @@ def load_lore_files(lore_directory="lore"):
     txt_files = glob.glob(os.path.join(lore_directory, "*.txt"))
 
     if not txt_files:
-        print(f"⚠️  No .txt files found in '{lore_directory}' directory.")
+        logger.warning(f"⚠️  No .txt files found in '{lore_directory}' directory.")
         return ""
 
-    print(f"📚 Loading {len(txt_files)} lore files...")
-    print("=" * 60)
+    logger.debug(f"📚 Loading {len(txt_files)} lore files...")
 
     total_size = 0
     file_details = []
@@ -54,24 +70,103 @@ def load_lore_files(lore_directory="lore"):
                     )
 
                     lore_content.append(f"=== {filename} ===\n{content}")
-                    print(f"   ✅ {filename:<30} | {file_size:>6} chars")
+                    logger.debug(f"   ✅ {filename:<30} | {file_size:>6} chars")
         except Exception as e:
-            print(f"   ❌ Error reading {file_path}: {e}")
+            logger.error(f"   ❌ Error reading {file_path}: {e}")
 
     if lore_content:
         combined_lore = "\n\n".join(lore_content)
-        print("-" * 60)
-        print(f"📊 SUMMARY:")
-        print(f"   Files loaded: {len(file_details)}")
-        print(f"   Total lore size: {total_size:,} characters")
-        print(f"   Combined size: {len(combined_lore):,} characters")
-        print("=" * 60)
+        logger.info(
+            f"📚 Loaded {len(file_details)} lore files: {total_size:,} characters"
+            f" ({len(combined_lore):,} combined)"
+        )
         return combined_lore
     else:
-        print("⚠️  No content found in lore files.")
+        logger.warning("⚠️  No content found in lore files.")
         return ""
 
 
+def load_bot_lore(bot_config, lore_directory="lore", general_lore=None):
+    """
+    Load lore files specific to a bot configuration, combining general lore and bot-specific lore.
+
+    Args:
+        bot_config (str): Name of the bot directory below lore/bots
+        lore_directory (str): Path to the lore directory
+        general_lore (str): Already loaded general lore; read from disk if None
+
+    Returns:
+        str: General lore followed by the bot-specific lore
+    """
+    logger.info(f"📚 Loading lore for bot: {bot_config}")
+
+    # Start with the general lore from lore/ directory
+    if general_lore is None:
+        general_lore = load_lore_files(lore_directory)
+    general_lore_size = len(general_lore)
+
+    bot_dir = Path(lore_directory) / "bots" / bot_config
+    if not bot_dir.exists():
+        logger.warning(f"Bot directory {bot_dir} not found, using only general lore")
+        print_lore_size_analysis(general_lore_size, 0, general_lore_size)
+        return general_lore
+
+    # Load lore files from the specific bot directory
+    bot_lore_content = ""
+    bot_lore_size = 0
+    logger.debug(f"🤖 Loading bot-specific lore from {bot_dir}:")
+    for txt_file in sorted(bot_dir.glob("*.txt")):
+        try:
+            with open(txt_file, "r", encoding="utf-8") as f:
+                content = f.read().strip()
+                file_size = len(content)
+                bot_lore_size += file_size
+                bot_lore_content += f"\n=== {txt_file.name} ===\n{content}\n"
+                logger.debug(f"   ✅ {txt_file.name:<25} | {file_size:>6} chars")
+        except Exception as e:
+            logger.error(f"   ❌ {txt_file.name:<25} | Error: {e}")
+
+    if not bot_lore_content:
+        logger.warning(
+            f"No bot-specific lore files found in {bot_dir}, using only general lore"
+        )
+        print_lore_size_analysis(general_lore_size, 0, general_lore_size)
+        return general_lore
+
+    # General lore first: it is shared by all bots and forms a stable prompt
+    # prefix for model-side context caching
+    combined_lore = general_lore + "\n" + bot_lore_content
+    combined_lore_size = len(combined_lore)
+
+    print_lore_size_analysis(general_lore_size, bot_lore_size, combined_lore_size)
+
+    return combined_lore
+
+
+def load_bot_config(bot_config, lore_directory="lore"):
+    """
+    Load the config.json of a bot.
+
+    Args:
+        bot_config (str): Name of the bot directory below lore/bots
+        lore_directory (str): Path to the lore directory
+
+    Returns:
+        dict: Parsed config, or an empty dict if it is missing or invalid
+    """
+    config_file = Path(lore_directory) / "bots" / bot_config / "config.json"
+    if not config_file.exists():
+        logger.warning(f"Config file {config_file} not found, using defaults")
+        return {}
+
+    try:
+        with open(config_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        logger.error(f"Error loading config for {bot_config}: {e}")
+        return {}
+
+
 def create_enhanced_system_prompt(base_prompt, lore_content=""):
     """
     Create an enhanced system prompt that includes lore wisdom.
@@ -100,57 +195,279 @@ Gib nichts einfach so preis. Lass die Spieler dafür Arbeiten und dich überzeug
     return enhanced_prompt
 
 
+# Files that carry the bot's speaking rules are never trimmed or dropped
+_PROMPT_FILE_PATTERN = re.compile(r"prompt$", re.IGNORECASE)
+_PRIORITY_PREFIX_PATTERN = re.compile(r"^(\d+)_")
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+# Smallest remainder worth filling with a trimmed file instead of dropping it
+MIN_TRIM_TOKENS = 200
+
+# Content hash -> token count, so unchanged files are never counted twice
+_token_cache = {}
+
+
+def estimate_tokens(text):
+    """
+    Estimate the model token count of a text.
+
+    Approximates a SentencePiece vocabulary on German prose: punctuation is one
+    token, words one token per started five characters. Results are cached by
+    content hash.
+
+    Args:
+        text (str): Text to count
+
+    Returns:
+        int: Estimated token count
+    """
+    key = hashlib.sha1(text.encode("utf-8")).hexdigest()
+    cached = _token_cache.get(key)
+    if cached is not None:
+        return cached
+
+    tokens = 0
+    for match in _TOKEN_PATTERN.findall(text):
+        tokens += 1 + (len(match) - 1) // 5
+    _token_cache[key] = tokens
+    return tokens
+
+
+def file_priority(name, scope="general"):
+    """
+    Sort key for lore files, most important first.
+
+    Prompt files (9_Prompt.txt, ZZZ_Prompt.txt) are pinned. Then bot-specific
+    files come before general lore, and within each group files are ranked by
+    their numeric prefix (1_kristallwesen before 8_Bimmelprotokoll); files
+    without a prefix rank after all numbered ones.
+
+    Args:
+        name (str): File name or relative path
+        scope (str): "bot" or "general"
+
+    Returns:
+        tuple: Sort key
+    """
+    stem = Path(name).stem
+    match = _PRIORITY_PREFIX_PATTERN.match(stem)
+    return (
+        0 if _PROMPT_FILE_PATTERN.search(stem) else 1,
+        0 if scope == "bot" else 1,
+        int(match.group(1)) if match else float("inf"),
+        Path(name).name,
+    )
+
+
+def _trim_to_tokens(content, max_tokens):
+    """Keep the leading paragraphs of a text that fit into max_tokens."""
+    kept = []
+    used = 0
+    for paragraph in re.split(r"\n\s*\n", content):
+        paragraph_tokens = estimate_tokens(paragraph)
+        if used + paragraph_tokens > max_tokens:
+            break
+        kept.append(paragraph)
+        used += paragraph_tokens
+    return "\n\n".join(kept)
+
+
+def assemble_lore(bot_documents, general_documents, token_budget=None):
+    """
+    Assemble bot and general lore, fitting it into a token budget.
+
+    The output layout matches load_bot_lore. Without a budget everything is
+    included. With a budget, files are admitted in file_priority order; the
+    first file that does not fit is trimmed to its leading paragraphs if at
+    least MIN_TRIM_TOKENS remain, and every lower ranked file is dropped.
+    Prompt files are always included. Included files keep their original
+    order in the prompt.
+
+    Args:
+        bot_documents (list): (name, content) pairs of bot-specific lore
+        general_documents (list): (name, content) pairs of general lore
+        token_budget (int): Maximum lore tokens, or None for no limit
+
+    Returns:
+        tuple: (lore text, list of per-file report dicts)
+    """
+    entries = []
+    for scope, documents in (("bot", bot_documents), ("general", general_documents)):
+        for name, content in documents:
+            header = f"=== {Path(name).name} ===\n"
+            entries.append(
+                {
+                    "name": name,
+                    "scope": scope,
+                    "chars": len(content),
+                    "tokens": estimate_tokens(header) + estimate_tokens(content),
+                    "status": "included",
+                    "content": content,
+                }
+            )
+
+    if token_budget is not None:
+        remaining = token_budget
+        trimmed = False
+        ranked = sorted(entries, key=lambda e: file_priority(e["name"], e["scope"]))
+        for entry in ranked:
+            pinned = file_priority(entry["name"], entry["scope"])[0] == 0
+            if pinned or (not trimmed and entry["tokens"] <= remaining):
+                remaining -= entry["tokens"]
+            elif not trimmed and remaining >= MIN_TRIM_TOKENS:
+                trimmed = True
+                header_tokens = estimate_tokens(f"=== {Path(entry['name']).name} ===\n")
+                entry["content"] = _trim_to_tokens(
+                    entry["content"], remaining - header_tokens
+                )
+                entry["status"] = "trimmed"
+                remaining -= header_tokens + estimate_tokens(entry["content"])
+            else:
+                entry["status"] = "dropped"
+
+    bot_parts = []
+    general_parts = []
+    for entry in entries:
+        if entry["status"] == "dropped" or not entry["content"]:
+            continue
+        name = Path(entry["name"]).name
+        if entry["scope"] == "bot":
+            bot_parts.append(f"\n=== {name} ===\n{entry['content']}\n")
+        else:
+            general_parts.append(f"=== {name} ===\n{entry['content']}")
+
+    general_lore = "\n\n".join(general_parts)
+    lore = general_lore + "\n" + "".join(bot_parts) if bot_parts else general_lore
+
+    report = []
+    for entry in entries:
+        included_tokens = 0
+        if entry["status"] == "included":
+            included_tokens = entry["tokens"]
+        elif entry["status"] == "trimmed":
+            included_tokens = estimate_tokens(entry["content"])
+        report.append(
+            {
+                "name": entry["name"],
+                "scope": entry["scope"],
+                "priority": list(file_priority(entry["name"], entry["scope"])[:3]),
+                "chars": entry["chars"],
+                "tokens": entry["tokens"],
+                "included_tokens": included_tokens,
+                "status": entry["status"],
+            }
+        )
+    return lore, report
+
+
+def build_size_report(base_prompt, lore_content, file_report=None, token_budget=None):
+    """
+    Machine-readable size report of a system prompt.
+
+    Args:
+        base_prompt (str): The base system prompt
+        lore_content (str): The assembled lore
+        file_report (list): Per-file entries from assemble_lore
+        token_budget (int): Configured prompt token budget, if any
+
+    Returns:
+        dict: Character and token counts of the prompt and its files
+    """
+    enhanced_prompt = create_enhanced_system_prompt(base_prompt, lore_content)
+    file_report = file_report or []
+    return {
+        "token_budget": token_budget,
+        "base_prompt": {
+            "chars": len(base_prompt),
+            "tokens": estimate_tokens(base_prompt),
+        },
+        "lore": {"chars": len(lore_content), "tokens": estimate_tokens(lore_content)},
+        "final_prompt": {
+            "chars": len(enhanced_prompt),
+            "tokens": estimate_tokens(enhanced_prompt),
+        },
+        "general_lore_chars": sum(
+            f["chars"] for f in file_report if f["scope"] == "general"
+        ),
+        "bot_lore_chars": sum(f["chars"] for f in file_report if f["scope"] == "bot"),
+        "files": file_report,
+    }
+
+
+def print_size_report(report):
+    """
+    Log a size report from build_size_report, as one multi-line record.
+
+    Args:
+        report (dict): The size report
+    """
+    lines = ["📏 SYSTEM PROMPT SIZE REPORT:", "=" * 70]
+    for entry in report["files"]:
+        lines.append(
+            f"   {entry['status']:<9} {entry['name']:<45}"
+            f" | {entry['chars']:>7,} chars | {entry['tokens']:>6,} tokens"
+        )
+    lines.append("-" * 70)
+    dedup = report.get("dedup")
+    if dedup:
+        lines.append(
+            f"Deduplicated: {dedup['paragraphs_removed']} paragraphs,"
+            f" {dedup['chars_saved']:,} characters saved"
+        )
+    budget = report["token_budget"]
+    lines.append(
+        f"Final prompt: {report['final_prompt']['chars']:>8,} characters,"
+        f" ~{report['final_prompt']['tokens']:,} tokens"
+        + (f" (budget {budget:,})" if budget else "")
+    )
+    logger.info("\n".join(lines))
+
+
 def print_lore_size_analysis(general_lore_size, bot_lore_size, combined_lore_size):
     """
-    Print detailed size analysis for lore content.
+    Log the size analysis of lore content.
 
     Args:
         general_lore_size (int): Size of general lore content
         bot_lore_size (int): Size of bot-specific lore content
         combined_lore_size (int): Size of combined lore content
     """
-    print(f"\n📊 LORE SIZE ANALYSIS:")
-    print("=" * 50)
-    print(f"General lore size:     {general_lore_size:>8,} characters")
-    print(f"Bot-specific lore:     {bot_lore_size:>8,} characters")
-    print(f"Combined lore size:    {combined_lore_size:>8,} characters")
-    print("=" * 50)
+    logger.info(
+        f"📊 Lore size: {general_lore_size:,} general + {bot_lore_size:,}"
+        f" bot-specific = {combined_lore_size:,} characters"
+    )
 
 
 def print_prompt_sizes(base_prompt, lore_content=""):
     """
-    Print detailed size information about the prompts.
+    Log size information about the prompts.
 
     Args:
         base_prompt (str): The base system prompt
         lore_content (str): Combined lore content
     """
     enhanced_prompt = create_enhanced_system_prompt(base_prompt, lore_content)
-
-    print(f"\n📏 FINAL SYSTEM PROMPT SIZE ANALYSIS:")
-    print("=" * 50)
-    print(f"Base prompt size:      {len(base_prompt):>8,} characters")
-    print(f"Lore content size:    {len(lore_content):>8,} characters")
-    print(f"Final prompt size:     {len(enhanced_prompt):>8,} characters")
-    print(
-        f"Overhead:             {len(enhanced_prompt) - len(base_prompt) - len(lore_content):>8,} characters"
+    overhead = len(enhanced_prompt) - len(base_prompt) - len(lore_content)
+    logger.info(
+        f"📏 System prompt: {len(enhanced_prompt):,} characters"
+        f" (base {len(base_prompt):,}, lore {len(lore_content):,},"
+        f" overhead {overhead:,})"
     )
-    print("=" * 50)
 
 
 if __name__ == "__main__":
     # Test the lore loading
-    print("🧠 Lore Loader Test")
-    print("=" * 30)
+    logger.info("🧠 Lore Loader Test")
 
     lore = load_lore_files()
     if lore:
-        print("\n📋 Sample of loaded lore:")
-        print("-" * 40)
-        print(lore[:500] + "..." if len(lore) > 500 else lore)
+        logger.info(
+            "📋 Sample of loaded lore:\n"
+            + (lore[:500] + "..." if len(lore) > 500 else lore)
+        )
 
         # Test with a sample base prompt
         sample_base = "Du bist ein arkanes Kristallwesen in einer Fantasy Welt."
         print_prompt_sizes(sample_base, lore)
     else:
-        print("No lore content found.")
+        logger.warning("No lore content found.")
@@ -5,26 +5,75 @@
 #
 import asyncio
 import os
-import uuid
 from contextlib import asynccontextmanager
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 import uvicorn
 from dotenv import load_dotenv
-from fastapi import FastAPI, Request, WebSocket
+from fastapi import FastAPI, Query, Request, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
+from loguru import logger
 
 # Load environment variables
 load_dotenv(override=True)
 
-from bot_fast_api import run_bot
+from bot_fast_api import GEMINI_LIVE_MODEL, run_bot
+from bot_registry import BotRegistry
 from bot_websocket_server import run_bot_websocket_server
+from context_cache import ContextCacheManager
+from light_hub import LightHub
+from light_protocol import effect_descriptor, negotiate
+from light_sender import LightSender
+from light_socket import LightSocket
+from session_registry import SessionRegistry
+from structured_log import connection_context, get_event_sink
+from timer_wheel import get_timer_wheel
+from turn_latency import TurnLatencyRegistry
+
+# Preloaded lore, voice and light config for every bot, hot-reloaded on change.
+# Uses the bundles compiled by lore_build.py when they are fresh.
+bot_registry = BotRegistry()
+
+# Voice sessions and the pairing of their light sockets
+session_registry = SessionRegistry()
+
+# Model-side caches of the per-bot system instructions (GEMINI_CONTEXT_CACHE=1)
+context_cache = ContextCacheManager.from_env(GEMINI_LIVE_MODEL)
+
+# Physical lights driven from the server instead of the browser: Shelly devices
+# (SHELLY_DRIVER=1) and Art-Net or sACN universes (DMX_OUTPUT=artnet|sacn),
+# with one writer per device (LIGHT_HUB_POLICY=recent|priority|blend)
+light_hub = LightHub.from_env()
+
+# Turn latencies (end of the user's speech to the first bot audio) per bot and
+# session, plus the span timelines of the last turns
+turn_latency = TurnLatencyRegistry.from_env()
+
+
+async def warm_context_cache():
+    """Create the context caches of all full-lore bots before the first player"""
+    for name in bot_registry.bot_names():
+        entry = bot_registry.get(name)
+        if entry.lore_index is None:
+            await context_cache.get_handle(name, entry.system_instruction)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Handles FastAPI startup and shutdown."""
+    await bot_registry.start()
+    warm_task = None
+    if context_cache is not None:
+        await context_cache.start()
+        warm_task = asyncio.create_task(warm_context_cache())
     yield  # Run app
+    if warm_task and not warm_task.done():
+        warm_task.cancel()
+    if context_cache is not None:
+        await context_cache.stop()
+    if light_hub is not None:
+        await light_hub.close()
+    await bot_registry.stop()
 
 
 # Initialize FastAPI app with lifespan manager
@@ -40,120 +89,114 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-from state import *
-
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
 
-    # Get bot from query parameters
+    # Get bot and the pairing token from /connect from query parameters
     bot_config = websocket.query_params.get("bot", "bot1")
+    token = websocket.query_params.get("token")
+    lights = websocket.query_params.get("lights")
 
-    # Generate a unique session ID for this bot session
-    session_id = f"{bot_config}_{uuid.uuid4().hex[:8]}"
-
-    # Store the bot configuration for this session
-    connection_bot_configs[session_id] = bot_config
-
-    print(f"WebSocket connection accepted for bot: {bot_config}, session: {session_id}")
+    # Register the session; its light sockets pair with it through the token
+    session = session_registry.open_voice(bot_config, token, websocket)
+    session_id = session.session_id
 
     # Store the session ID in the websocket object for later use
     websocket.session_id = session_id
 
-    try:
-        await run_bot(websocket, bot_config, session_id, connection_light_controllers)
-    except asyncio.CancelledError:
-        print(f"WebSocket connection cancelled for {session_id}")
-    except Exception as e:
-        print(f"Exception in run_bot for {session_id}: {e}")
-    finally:
-        # Clean up connection when it's closed
-        if session_id in connection_bot_configs:
-            del connection_bot_configs[session_id]
-        if session_id in connection_light_controllers:
-            del connection_light_controllers[session_id]
-        print(f"Cleaned up connection: {session_id}")
+    with connection_context(session_id, bot_config):
+        logger.info(f"WebSocket connection accepted for bot: {bot_config}")
+        try:
+            await run_bot(
+                websocket,
+                bot_config,
+                session_id,
+                session,
+                bot_registry,
+                context_cache,
+                lights,
+                light_hub,
+                turn_latency,
+            )
+        except asyncio.CancelledError:
+            logger.info("WebSocket connection cancelled")
+        except Exception as e:
+            logger.error(f"Exception in run_bot: {e}")
+        finally:
+            # Clean up connection when it's closed
+            session_registry.close_voice(session)
+            logger.info("Cleaned up connection")
 
 
 @app.websocket("/light-ws")
 async def light_websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
 
-    # Get bot from query parameters
+    # Get bot and the pairing token from query parameters
     bot_config = websocket.query_params.get("bot", "bot1")
+    token = websocket.query_params.get("token")
 
-    # Find the most recent session ID for this bot (voice WebSocket should be created first)
-    session_id = None
-    for sid, bot in list(connection_bot_configs.items())[
-        ::-1
-    ]:  # Reverse to get most recent first
-        if bot == bot_config:
-            session_id = sid
-            break
+    # Join the voice session of the token; clients without a token get the
+    # most recent session of the bot (voice WebSocket should be created first)
+    entry = session_registry.pair_light(token, bot_config)
 
-    if not session_id:
+    if entry is None:
         # If no matching session found, reject the connection
-        print(
+        logger.warning(
             f"❌ No voice WebSocket session found for {bot_config}, rejecting light WebSocket"
         )
         await websocket.close(code=1000, reason="No voice session available")
         return
+    with connection_context(entry.session_id, entry.bot_config):
+        await _serve_light_websocket(websocket, entry)
+
+
+async def _serve_light_websocket(websocket: WebSocket, entry):
+    """Deliver the light commands of a paired session until the client leaves"""
+    session_id = entry.session_id
+    bot_config = entry.bot_config
+    logger.info("🔌 Found existing session for light WebSocket")
+
+    # Light commands go through a non-blocking, latest-wins sender, in the
+    # compact binary format or as a client-rendered effect if the client asked
+    # for it (?proto=bin1 / ?proto=effect1)
+    light_config = bot_registry.get(bot_config).light_config
+    if entry.light_controller is not None:
+        effect = entry.light_controller.effect_descriptor()
     else:
-        print(f"🔌 Found existing session ID for light WebSocket: {session_id}")
-
-    # Store the light WebSocket connection using the session ID
-    light_websocket_connections[session_id] = websocket
+        effect = effect_descriptor(light_config, (0.0, 0.0, 0.0))
+    # No Shelly IP for the client if the server drives the lights
+    shelly_ip = None if entry.light_devices else light_config.shelly_ip
+    session = negotiate(websocket.query_params, bot_config, shelly_ip, effect)
+    sender = LightSender(websocket, session_id, session)
+    sender.start()
+    entry.attach_light(sender)
 
-    print(
-        f"🔌 Light WebSocket connection accepted for bot: {bot_config}, session: {session_id}"
-    )
+    logger.info(f"🔌 Light WebSocket connection accepted for bot: {bot_config}")
 
+    light_socket = LightSocket(websocket, sender)
     try:
-        # Keep connection alive and forward light commands
-        while True:
-            # Just sleep to keep the connection alive
-            await asyncio.sleep(1)
-
-            # Check if the WebSocket is still connected
-            if websocket.client_state.value != 1:  # 1 = CONNECTED
-                print(f"🔌 Light WebSocket {session_id} disconnected, breaking loop")
-                break
-
-    except Exception as e:
-        print(f"Light WebSocket connection closed for {session_id}: {e}")
+        # Wait for the client's messages, pongs or close; no polling
+        await light_socket.serve()
+        logger.info(f"🔌 Light WebSocket closed: {light_socket.close_reason}")
     finally:
         # Clean up the connection
-        if session_id in light_websocket_connections:
-            del light_websocket_connections[session_id]
-            print(f"🔌 Light WebSocket connection cleaned up: {session_id}")
-            print(
-                f"🔌 Remaining light connections: {list(light_websocket_connections.keys())}"
-            )
-        else:
-            print(
-                f"🔌 Light WebSocket connection {session_id} not found in dictionary during cleanup"
-            )
+        await sender.close()
+        entry.detach_light(sender)
+        logger.info("🔌 Light WebSocket connection cleaned up")
 
 
 @app.get("/bots")
 async def get_bots() -> Dict[str, list[str]]:
     """Return a list of available bot configurations from the lore/bots directory."""
-    import os
-    from pathlib import Path
-
-    bots_dir = Path("lore/bots")
-    if not bots_dir.exists():
-        # Fallback to hardcoded list if directory doesn't exist
+    bot_names = bot_registry.bot_names()
+    if not bot_names:
+        # Fallback to hardcoded list if no bots were found
         return {"bots": ["bot1", "bot2"]}
 
-    # Get all subdirectories in lore/bots/
-    bot_dirs = [d.name for d in bots_dir.iterdir() if d.is_dir()]
-
-    # Sort for consistent ordering
-    bot_dirs.sort()
-
-    return {"bots": bot_dirs}
+    return {"bots": bot_names}
 
 
 from pydantic import BaseModel
@@ -167,6 +210,7 @@ class ConnectRequest(BaseModel):
 async def bot_connect(request: Request) -> Dict[Any, Any]:
     # Support both POST (JSON body) and GET (query param)
     bot = "bot1"
+    body = {}
     if request.method == "POST":
         try:
             body = await request.json()
@@ -177,9 +221,17 @@ async def bot_connect(request: Request) -> Dict[Any, Any]:
     else:
         bot = request.query_params.get("bot", "bot1")
 
+    # Light commands on the voice connection instead of /light-ws
+    lights = request.query_params.get("lights")
+    if isinstance(body, dict):
+        lights = body.get("lights", lights)
+
     server_mode = os.getenv("WEBSOCKET_SERVER", "fast_api")
     server_url = os.getenv("SERVER_URL", "localhost:7860")
 
+    # Pairs the voice WebSocket with the client's light WebSocket
+    token = session_registry.issue_token(bot)
+
     # Choose ws/wss intelligently if not explicitly set
     env_ws_protocol = os.getenv("WS_PROTOCOL")
     if env_ws_protocol:
@@ -190,8 +242,6 @@ async def bot_connect(request: Request) -> Dict[Any, Any]:
             ws_protocol = "ws"
         else:
             ws_protocol = "wss"
-    print(f"Server URL: {server_url}")
-    print(f"WebSocket protocol: {ws_protocol}")
 
     if server_mode == "websocket_server":
         # In websocket_server mode, the websocket server runs on port 8765
@@ -199,13 +249,16 @@ async def bot_connect(request: Request) -> Dict[Any, Any]:
     else:
         # In fast_api mode, use the FastAPI WebSocket endpoint
         # Always use wss:// for consistency
-        ws_url = f"{ws_protocol}://{server_url}/ws?bot={bot}"
+        ws_url = f"{ws_protocol}://{server_url}/ws?bot={bot}&token={token}"
+        if lights:
+            ws_url += f"&lights={lights}"
 
-    print(f"Server mode: {server_mode}")
-    print(f"Server URL from env: {server_url}")
-    print(f"Returning WebSocket URL: {ws_url} for bot: {bot}")
+    logger.info(
+        f"Returning WebSocket URL: {ws_url} for bot: {bot}"
+        f" (server mode: {server_mode}, protocol: {ws_protocol})"
+    )
 
-    return {"ws_url": ws_url}
+    return {"ws_url": ws_url, "pairing_token": token}
 
 
 @app.get("/bot-config")
@@ -214,47 +267,73 @@ async def get_bot_config(request: Request) -> Dict[str, Any]:
 
     Query params:
       - bot: bot name (e.g., "Zephyr")
+      - report: if truthy, include the system prompt size report
     """
-    import json
-    from pathlib import Path
-
     bot = request.query_params.get("bot")
     if not bot:
         return {"error": "Missing 'bot' query parameter"}
 
-    config_path = Path("lore") / "bots" / bot / "config.json"
-    if not config_path.exists():
+    if not bot_registry.has_bot(bot):
         return {"error": f"Config for bot '{bot}' not found"}
 
-    try:
-        with config_path.open("r", encoding="utf-8") as f:
-            data = json.load(f)
-        # Extract only light_config for minimal payload
-        light_config = data.get("light_config", {})
-        return {"bot": bot, "light_config": light_config}
-    except Exception as e:
-        return {"error": f"Failed to read config for '{bot}': {e}"}
+    # Extract only light_config for minimal payload
+    entry = bot_registry.get(bot)
+    response = {"bot": bot, "light_config": entry.config.get("light_config", {})}
+    if request.query_params.get("report", "").lower() in ("1", "true", "yes"):
+        response["size_report"] = entry.size_report
+    return response
 
 
 @app.get("/light-status")
 async def get_light_status() -> Dict[str, Any]:
     """Get the status of all active light controllers."""
+    controllers = {
+        entry.session_id: entry.light_controller
+        for entry in session_registry
+        if entry.light_controller is not None
+    }
     return {
-        "active_connections": len(connection_light_controllers),
+        "timer_wheel": get_timer_wheel().get_stats(),
+        "sessions": session_registry.get_stats(),
+        "light_hub": light_hub.get_stats() if light_hub else None,
+        "log_events": get_event_sink().get_stats(),
+        "active_connections": len(controllers),
         "connections": {
             conn_id: controller.get_status()
-            for conn_id, controller in connection_light_controllers.items()
+            for conn_id, controller in controllers.items()
         },
     }
 
 
+@app.get("/latency")
+async def get_turn_latency() -> Dict[str, Any]:
+    """Rolling p50/p95/p99 turn latencies per bot and per active session."""
+    return turn_latency.get_stats()
+
+
+@app.get("/latency/turns")
+async def get_recent_turns(
+    limit: Optional[int] = Query(None, ge=1),
+    bot: Optional[str] = None,
+    session: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Span timelines of the last turns, newest first.
+
+    Query params:
+      - limit: number of turns (default all kept)
+      - bot / session: only the turns of that bot or session
+    """
+    return {"turns": turn_latency.recent_turns(limit, bot=bot, session_id=session)}
+
+
 @app.get("/light-status/{connection_id}")
 async def get_connection_light_status(connection_id: str) -> Dict[str, Any]:
     """Get the light status for a specific connection."""
-    if connection_id not in connection_light_controllers:
+    entry = session_registry.get(connection_id)
+    if entry is None or entry.light_controller is None:
         return {"error": "Connection not found"}
 
-    return connection_light_controllers[connection_id].get_status()
+    return entry.light_controller.get_status()
 
 
 async def main():
@@ -270,7 +349,7 @@ async def main():
 
         await asyncio.gather(*tasks)
     except asyncio.CancelledError:
-        print("Tasks cancelled (probably due to shutdown).")
+        logger.info("Tasks cancelled (probably due to shutdown).")
 
 
 if __name__ == "__main__":
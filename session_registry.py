@@ -0,0 +1,184 @@
+#
+# Copyright (c) 2025, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+import secrets
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from loguru import logger
+
+# Seconds a token issued by /connect stays valid until its voice socket opens
+DEFAULT_TOKEN_TTL = 120.0
+
+
+@dataclass
+class SessionEntry:
+    """One player's voice session and everything attached to it"""
+
+    session_id: str
+    bot_config: str
+    token: str
+    created: float = field(default_factory=time.time)
+    voice_websocket: Any = None
+    pipeline_task: Any = None  # PipelineTask of the voice pipeline
+    light_controller: Any = None  # CrystalLightController
+    light_senders: List[Any] = field(default_factory=list)  # LightSender per socket
+    # Outputs the server drives itself (ShellyDevice, DmxFixture), if enabled
+    light_devices: List[Any] = field(default_factory=list)
+
+    @property
+    def light_sender(self):
+        """The most recently connected light socket, if any"""
+        return self.light_senders[-1] if self.light_senders else None
+
+    @property
+    def has_light_consumer(self) -> bool:
+        return bool(self.light_senders or self.light_devices)
+
+    @property
+    def streams_colors(self) -> bool:
+        """Whether the server device or any light socket wants rendered colors"""
+        return bool(self.light_devices) or any(
+            sender.session.streams_colors for sender in self.light_senders
+        )
+
+    def attach_light(self, sender):
+        """Add a light socket; the controller resumes its animation if needed"""
+        self.light_senders.append(sender)
+        self._light_consumers_changed()
+
+    def detach_light(self, sender):
+        """Remove a light socket; the controller suspends its animation if needed"""
+        if sender in self.light_senders:
+            self.light_senders.remove(sender)
+        self._light_consumers_changed()
+
+    def attach_light_device(self, device):
+        """Drive a device from the server with this session's colors"""
+        self.light_devices.append(device)
+        self._light_consumers_changed()
+
+    def _light_consumers_changed(self):
+        if self.light_controller is not None:
+            self.light_controller.update_light_demand()
+
+    def post_color(self, color) -> bool:
+        """Hand a color to the device and every light socket; False if none"""
+        for device in self.light_devices:
+            device.post_color(color)
+        for sender in self.light_senders:
+            if sender.session.streams_colors:
+                sender.post_color(color)
+        return self.has_light_consumer
+
+    def post_speaking(self, command: dict) -> bool:
+        """
+        Hand a speaking_start/stop command to the light sockets that render
+        the effect themselves; False if none of them got it.
+
+        Color-streaming sockets get the server's animation and its off color
+        instead: a client animating locally on speaking_start would drive the
+        light a second time.
+        """
+        posted = False
+        for sender in self.light_senders:
+            if not sender.session.streams_colors:
+                sender.post("speaking", command)
+                posted = True
+        return posted
+
+    def post(self, kind: str, command: dict) -> bool:
+        """Hand a JSON command to every light socket; False if there is none"""
+        for sender in self.light_senders:
+            sender.post(kind, command)
+        return bool(self.light_senders)
+
+
+class SessionRegistry:
+    """
+    All voice sessions of the process and their light socket pairing.
+
+    /connect issues a pairing token that the client passes to /ws and to
+    /light-ws, so a light socket joins exactly its own voice session in O(1),
+    even when several players talk to the same bot. Clients without a token
+    are paired with the newest voice session of the bot, also in O(1).
+    Controllers and observers get their SessionEntry injected and never look
+    sessions up on the hot path.
+    """
+
+    def __init__(self, token_ttl: float = DEFAULT_TOKEN_TTL):
+        self.token_ttl = token_ttl
+        self._sessions: Dict[str, SessionEntry] = {}
+        self._by_token: Dict[str, SessionEntry] = {}
+        # token -> (bot, expiry) of tokens whose voice socket is not open yet
+        self._pending_tokens: Dict[str, Tuple[str, float]] = {}
+        self._by_bot: Dict[str, "OrderedDict[str, SessionEntry]"] = {}
+
+    def issue_token(self, bot_config: str) -> str:
+        """A pairing token for the voice session a client is about to open"""
+        now = time.time()
+        for token, (_, expiry) in list(self._pending_tokens.items()):
+            if expiry < now:
+                del self._pending_tokens[token]
+        token = secrets.token_urlsafe(16)
+        self._pending_tokens[token] = (bot_config, now + self.token_ttl)
+        return token
+
+    def open_voice(
+        self, bot_config: str, token: Optional[str] = None, websocket=None
+    ) -> SessionEntry:
+        """Register a voice session, claiming its /connect token if valid"""
+        pending = self._pending_tokens.pop(token, None) if token else None
+        if pending is None or pending[0] != bot_config or pending[1] < time.time():
+            if token:
+                logger.warning(f"Unknown or expired pairing token for {bot_config}")
+            token = secrets.token_urlsafe(16)
+
+        session_id = f"{bot_config}_{uuid.uuid4().hex[:8]}"
+        entry = SessionEntry(session_id, bot_config, token, voice_websocket=websocket)
+        self._sessions[session_id] = entry
+        self._by_token[token] = entry
+        self._by_bot.setdefault(bot_config, OrderedDict())[session_id] = entry
+        return entry
+
+    def close_voice(self, entry: SessionEntry):
+        self._sessions.pop(entry.session_id, None)
+        if self._by_token.get(entry.token) is entry:
+            del self._by_token[entry.token]
+        bot_sessions = self._by_bot.get(entry.bot_config)
+        if bot_sessions is not None:
+            bot_sessions.pop(entry.session_id, None)
+            if not bot_sessions:
+                del self._by_bot[entry.bot_config]
+
+    def pair_light(
+        self, token: Optional[str] = None, bot_config: Optional[str] = None
+    ) -> Optional[SessionEntry]:
+        """The voice session a light socket belongs to"""
+        if token:
+            return self._by_token.get(token)
+        bot_sessions = self._by_bot.get(bot_config)
+        if bot_sessions:
+            return next(reversed(bot_sessions.values()))
+        return None
+
+    def get(self, session_id: str) -> Optional[SessionEntry]:
+        return self._sessions.get(session_id)
+
+    def __iter__(self) -> Iterator[SessionEntry]:
+        return iter(list(self._sessions.values()))
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get_stats(self) -> dict:
+        return {
+            "sessions": len(self._sessions),
+            "pending_tokens": len(self._pending_tokens),
+            "light_sockets": sum(len(e.light_senders) for e in self._sessions.values()),
+        }
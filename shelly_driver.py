@@ -0,0 +1,185 @@
+#
+# Copyright (c) 2025, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+import asyncio
+import os
+import time
+from typing import Dict, Optional
+
+import aiohttp
+from loguru import logger
+
+from light_protocol import shelly_command
+
+DEFAULT_MAX_RATE = 10.0  # requests per second and device, as the browser client
+DEFAULT_REQUEST_TIMEOUT = 2.0
+DEFAULT_CONNECTIONS_PER_DEVICE = 1
+LATENCY_SMOOTHING = 0.2  # weight of the newest sample in avg_latency_ms
+
+
+class ShellyDevice:
+    """
+    Latest-wins output to one Shelly RGBW device (GET /light/0).
+
+    post_color() only stores the color and returns. One task per device sends
+    the newest color at most max_rate times per second over the driver's
+    keep-alive connection; colors posted in between replace each other
+    (coalesced), and a failed request is not retried since a newer color
+    follows anyway.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        driver: "ShellyDriver",
+        max_rate: float = DEFAULT_MAX_RATE,
+    ):
+        self.host = host
+        self.url = f"http://{host}/light/0"
+        self.driver = driver
+        self.min_interval = 1.0 / max_rate
+        self.logger = logger.bind(device=host)
+
+        self._pending: Optional[Dict] = None
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._last_request = 0.0  # loop time
+
+        # Statistics
+        self.posted = 0
+        self.requests = 0
+        self.errors = 0
+        self.coalesced = 0
+        self.last_latency_ms = 0.0
+        self.avg_latency_ms = 0.0
+        self.max_latency_ms = 0.0
+
+    def post_color(self, color):
+        """Queue a color, replacing one that was not sent yet"""
+        self.posted += 1
+        if self._pending is not None:
+            self.coalesced += 1
+        self._pending = shelly_command(color)
+        self._wakeup.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                # Rate cap: colors posted while waiting are coalesced
+                delay = self._last_request + self.min_interval - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                if self._pending is None:
+                    continue
+                params, self._pending = self._pending, None
+                self._last_request = loop.time()
+                await self._request(params)
+        except asyncio.CancelledError:
+            pass
+
+    async def _request(self, params: Dict):
+        start_time = time.perf_counter()
+        try:
+            session = self.driver.http_session()
+            async with session.get(self.url, params=params) as response:
+                await response.read()
+                if response.status >= 400:
+                    raise RuntimeError(f"HTTP {response.status}")
+        except Exception as e:
+            self.errors += 1
+            self.logger.warning(f"❌ Shelly request failed: {e!r}")
+            return
+        latency_ms = (time.perf_counter() - start_time) * 1000
+        self.requests += 1
+        self.last_latency_ms = latency_ms
+        self.max_latency_ms = max(self.max_latency_ms, latency_ms)
+        if self.requests == 1:
+            self.avg_latency_ms = latency_ms
+        else:
+            self.avg_latency_ms += LATENCY_SMOOTHING * (
+                latency_ms - self.avg_latency_ms
+            )
+
+    async def close(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def get_status(self) -> dict:
+        return {
+            "posted": self.posted,
+            "requests": self.requests,
+            "errors": self.errors,
+            "coalesced": self.coalesced,
+            "max_rate": round(1.0 / self.min_interval, 2),
+            "last_latency_ms": round(self.last_latency_ms, 2),
+            "avg_latency_ms": round(self.avg_latency_ms, 2),
+            "max_latency_ms": round(self.max_latency_ms, 2),
+        }
+
+
+class ShellyDriver:
+    """
+    Server-side output backend for the Shelly devices of LightConfig.shelly_ip.
+
+    One aiohttp session whose connector keeps up to connections_per_device
+    keep-alive connections per device, shared by every voice session that
+    drives the same device. Devices are created on first use.
+    """
+
+    def __init__(
+        self,
+        max_rate: float = DEFAULT_MAX_RATE,
+        request_timeout: float = DEFAULT_REQUEST_TIMEOUT,
+        connections_per_device: int = DEFAULT_CONNECTIONS_PER_DEVICE,
+    ):
+        self.max_rate = max_rate
+        self.request_timeout = request_timeout
+        self.connections_per_device = connections_per_device
+        self._devices: Dict[str, ShellyDevice] = {}
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    @classmethod
+    def from_env(cls) -> Optional["ShellyDriver"]:
+        """Create a driver if SHELLY_DRIVER is enabled, else None"""
+        if os.getenv("SHELLY_DRIVER", "0").lower() not in ("1", "true", "yes"):
+            return None
+        return cls(max_rate=float(os.getenv("SHELLY_MAX_RATE", DEFAULT_MAX_RATE)))
+
+    def http_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=0, limit_per_host=self.connections_per_device
+                ),
+                timeout=aiohttp.ClientTimeout(total=self.request_timeout),
+            )
+        return self._session
+
+    def device(self, host: str) -> ShellyDevice:
+        device = self._devices.get(host)
+        if device is None:
+            device = ShellyDevice(host, self, self.max_rate)
+            self._devices[host] = device
+            logger.info(f"💡 Driving Shelly device {host} from the server")
+        return device
+
+    async def close(self):
+        for device in self._devices.values():
+            await device.close()
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def get_stats(self) -> dict:
+        return {host: device.get_status() for host, device in self._devices.items()}
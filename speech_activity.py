@@ -0,0 +1,93 @@
+#
+# Copyright (c) 2025, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+import asyncio
+from typing import Optional
+
+from loguru import logger
+from pipecat.frames.frames import (
+    InterruptionFrame,
+    TTSAudioRawFrame,
+    TTSStartedFrame,
+    TTSStoppedFrame,
+)
+
+from frame_observer import FrameTypeObserver, handles
+from timer_wheel import Timer, get_timer_wheel
+
+
+class SpeechActivityObserver(FrameTypeObserver):
+    """
+    Single owner of the bot's speaking state for one session.
+
+    Speaking starts on TTSStartedFrame or the first TTS audio frame and stops
+    on TTSStoppedFrame, on a user interruption, or when no audio arrived for
+    stop_timeout seconds. Audio frames only bump one deadline on the shared
+    TimerWheel, so no task or timer is created per audio frame.
+
+    Events (handlers run in order, inside the observer):
+        on_speaking_started(observer)
+        on_speaking_stopped(observer)
+    """
+
+    def __init__(self, stop_timeout: float = 0.5, **kwargs):
+        super().__init__(**kwargs)
+        self.stop_timeout = stop_timeout
+        self.is_speaking = False
+        self.last_audio_time = 0.0  # loop time of the last audio frame
+
+        self._timer: Optional[Timer] = None
+        self._stop_task: Optional[asyncio.Task] = None
+
+        self._register_event_handler("on_speaking_started", sync=True)
+        self._register_event_handler("on_speaking_stopped", sync=True)
+
+    # A frame is observed once per hop; every transition is idempotent
+    @handles(TTSAudioRawFrame, TTSStartedFrame)
+    async def _on_audio_frame(self, frame):
+        await self.on_audio()
+
+    @handles(TTSStoppedFrame, InterruptionFrame)
+    async def _on_stop_frame(self, frame):
+        await self.stop()
+
+    async def on_audio(self):
+        """Record bot audio: start speaking if needed and push the deadline"""
+        wheel = get_timer_wheel()
+        self.last_audio_time = wheel.now()
+        if self._timer is None:
+            self._timer = wheel.schedule(self.stop_timeout, self._on_deadline)
+        else:
+            self._timer.bump(self.stop_timeout)
+        if not self.is_speaking:
+            self.is_speaking = True
+            logger.debug("Bot started speaking")
+            await self._call_event_handler("on_speaking_started")
+
+    async def stop(self):
+        """End the speaking state, if active"""
+        if self._timer is not None:
+            self._timer.cancel()
+        if self.is_speaking:
+            self.is_speaking = False
+            logger.debug("Bot stopped speaking")
+            await self._call_event_handler("on_speaking_stopped")
+
+    def _on_deadline(self):
+        if self.is_speaking:
+            self._stop_task = asyncio.create_task(self.stop())
+
+    async def cleanup(self):
+        await self.stop()
+        if self._stop_task and not self._stop_task.done():
+            await self._stop_task
+        await super().cleanup()
+
+    def get_status(self) -> dict:
+        return {
+            "is_speaking": self.is_speaking,
+            "last_audio_time": self.last_audio_time,
+            "stop_timeout": self.stop_timeout,
+        }
@@ -1,8 +0,0 @@
-# Store bot configurations per connection
-connection_bot_configs = {}
-
-# Store light controllers per connection for status monitoring
-connection_light_controllers = {}
-
-# Store light WebSocket connections for sending light commands
-light_websocket_connections = {}
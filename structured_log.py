@@ -0,0 +1,253 @@
+#
+# Copyright (c) 2025, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+import asyncio
+import os
+import sys
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from loguru import logger
+
+# Connection and bot of the running task. Every connection runs in its own
+# asyncio task, which copies the context, so concurrent connections never
+# see each other's values (unlike thread-locals, which they all share).
+connection_var: ContextVar[str] = ContextVar("connection", default="-")
+bot_var: ContextVar[str] = ContextVar("bot", default="-")
+
+LOG_FORMAT = (
+    "<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | "
+    "<magenta>{extra[connection]}</magenta> | "
+    "<cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - "
+    "<level>{message}</level>"
+)
+
+# Per-frame debug events (FrameTypeObserver tracing), off unless
+# LOG_FRAME_DEBUG=1. Read once at import: when off, the frame path does not
+# contain the logging code at all.
+FRAME_DEBUG = os.getenv("LOG_FRAME_DEBUG", "").lower() in ("1", "true", "yes")
+
+DEFAULT_QUEUE_SIZE = 1000
+DEFAULT_RATE = 20.0  # events per second per category
+FLUSH_INTERVAL = 0.25
+
+
+def _env_true(name: str) -> bool:
+    return os.getenv(name, "").lower() in ("1", "true", "yes")
+
+
+def _add_context(record):
+    """Loguru patcher: connection and bot of the current task, unless bound"""
+    extra = record["extra"]
+    if "connection" not in extra:
+        extra["connection"] = connection_var.get()
+    if "bot" not in extra:
+        extra["bot"] = bot_var.get()
+
+
+def configure_logging():
+    """
+    Log to stderr from a background thread (enqueue), with the connection of
+    the current task in every line. LOG_LEVEL sets the level (INFO, or DEBUG
+    with LOG_FRAME_DEBUG=1); LOG_DIAGNOSE=1 adds extended tracebacks with
+    variable values, which are slow to build and print secrets such as API
+    keys.
+    """
+    diagnose = _env_true("LOG_DIAGNOSE")
+    logger.remove()
+    logger.configure(patcher=_add_context)
+    logger.add(
+        sys.stderr,
+        level=os.getenv("LOG_LEVEL", "DEBUG" if FRAME_DEBUG else "INFO").upper(),
+        format=LOG_FORMAT,
+        enqueue=True,
+        backtrace=diagnose,
+        diagnose=diagnose,
+    )
+
+
+@contextmanager
+def connection_context(connection_id: Optional[str], bot: Optional[str] = None):
+    """Tag the log lines of this task and the tasks it creates"""
+    connection_token = connection_var.set(connection_id or "-")
+    bot_token = bot_var.set(bot or "-")
+    try:
+        yield
+    finally:
+        connection_var.reset(connection_token)
+        bot_var.reset(bot_token)
+
+
+def _parse_limits(value: str) -> Dict[str, float]:
+    """ "frame=10,light=1" -> {"frame": 10.0, "light": 1.0}"""
+    limits = {}
+    for item in value.split(","):
+        name, _, number = item.partition("=")
+        if name.strip() and number.strip():
+            limits[name.strip()] = float(number)
+    return limits
+
+
+@dataclass
+class _Category:
+    sample_every: int
+    rate: float
+    tokens: float
+    refilled: float
+    seen: int = 0
+    sampled_out: int = 0
+    rate_limited: int = 0
+    dropped: int = 0
+    logged: int = 0
+
+
+@dataclass
+class _Event:
+    category: _Category
+    name: str
+    level: str
+    message: str
+    args: tuple
+    connection: str
+    bot: str
+
+
+class EventSink:
+    """
+    Bounded, sampled log for events on the hot path (per frame or command).
+
+    emit() never formats or writes: it keeps every sample_every-th event of
+    a category, rate limits the category with a token bucket (rate events
+    per second, bursts of up to rate) and queues the event with the
+    connection of the current task. The queue holds at most maxsize events,
+    dropping the oldest. A loop callback flushes it every flush_interval
+    seconds through loguru, which only formats the messages then.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = DEFAULT_QUEUE_SIZE,
+        sampling: Optional[Dict[str, float]] = None,
+        rates: Optional[Dict[str, float]] = None,
+        default_rate: float = DEFAULT_RATE,
+        flush_interval: float = FLUSH_INTERVAL,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+    ):
+        self.maxsize = maxsize
+        self.sampling = sampling or {}
+        self.rates = rates or {}
+        self.default_rate = default_rate
+        self.flush_interval = flush_interval
+        self._loop = loop or asyncio.get_running_loop()
+        self._queue = deque()
+        self._categories: Dict[str, _Category] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+
+    @classmethod
+    def from_env(cls, loop=None) -> "EventSink":
+        """LOG_EVENT_QUEUE, LOG_EVENT_SAMPLING / LOG_EVENT_RATES ("frame=10")"""
+        return cls(
+            maxsize=int(os.getenv("LOG_EVENT_QUEUE", DEFAULT_QUEUE_SIZE)),
+            sampling=_parse_limits(os.getenv("LOG_EVENT_SAMPLING", "")),
+            rates=_parse_limits(os.getenv("LOG_EVENT_RATES", "")),
+            loop=loop,
+        )
+
+    def _category(self, name: str) -> _Category:
+        category = self._categories.get(name)
+        if category is None:
+            rate = self.rates.get(name, self.default_rate)
+            category = _Category(
+                sample_every=max(1, int(self.sampling.get(name, 1))),
+                rate=rate,
+                tokens=max(1.0, rate),
+                refilled=time.monotonic(),
+            )
+            self._categories[name] = category
+        return category
+
+    def emit(self, name: str, level: str, message: str, *args) -> bool:
+        """Queue a log event ("{}" placeholders filled from args); False if not kept"""
+        category = self._categories.get(name) or self._category(name)
+        category.seen += 1
+        if (category.seen - 1) % category.sample_every:
+            category.sampled_out += 1
+            return False
+
+        now = time.monotonic()
+        category.tokens = min(
+            max(1.0, category.rate),
+            category.tokens + (now - category.refilled) * category.rate,
+        )
+        category.refilled = now
+        if category.tokens < 1.0:
+            category.rate_limited += 1
+            return False
+        category.tokens -= 1.0
+
+        if len(self._queue) >= self.maxsize:
+            self._queue.popleft().category.dropped += 1
+        self._queue.append(
+            _Event(
+                category,
+                name,
+                level,
+                message,
+                args,
+                connection_var.get(),
+                bot_var.get(),
+            )
+        )
+        if self._flush_handle is None:
+            self._flush_handle = self._loop.call_later(self.flush_interval, self.flush)
+        return True
+
+    def flush(self):
+        """Write the queued events"""
+        self._flush_handle = None
+        queue = self._queue
+        while queue:
+            event = queue.popleft()
+            event.category.logged += 1
+            logger.bind(
+                connection=event.connection, bot=event.bot, category=event.name
+            ).log(event.level, f"[{event.name}] {event.message}", *event.args)
+
+    def close(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+        self.flush()
+
+    def get_stats(self) -> dict:
+        return {
+            "queued": len(self._queue),
+            "maxsize": self.maxsize,
+            "categories": {
+                name: {
+                    "seen": category.seen,
+                    "logged": category.logged,
+                    "sampled_out": category.sampled_out,
+                    "rate_limited": category.rate_limited,
+                    "dropped": category.dropped,
+                }
+                for name, category in self._categories.items()
+            },
+        }
+
+
+_default_sink: Optional[EventSink] = None
+
+
+def get_event_sink() -> EventSink:
+    """The process-wide event sink of the running event loop"""
+    global _default_sink
+    loop = asyncio.get_running_loop()
+    if _default_sink is None or _default_sink._loop is not loop:
+        _default_sink = EventSink.from_env(loop=loop)
+    return _default_sink
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+#
+# Test script for the TTS audio envelope and the audio-reactive light layer
+#
+import asyncio
+import math
+
+import numpy as np
+from pipecat.frames.frames import InterruptionFrame, TTSAudioRawFrame
+from pipecat.observers.base_observer import FramePushed
+from pipecat.processors.frame_processor import FrameDirection
+
+from audio_envelope import DETECTOR_PEAK, AudioEnvelope, TTSEnvelopeObserver
+from crystal_light_controller import CrystalLightController, parse_light_config
+from light_animation import AnimationScheduler
+
+SAMPLE_RATE = 24000
+
+
+def tone(seconds, amplitude=16000):
+    """16-bit PCM sine, 440 Hz"""
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return (np.sin(2 * math.pi * 440 * t) * amplitude).astype(np.int16).tobytes()
+
+
+def silence(seconds):
+    return b"\x00\x00" * int(seconds * SAMPLE_RATE)
+
+
+def test_envelope_follows_the_playback_timeline():
+    envelope = AudioEnvelope(attack=0.02, release=0.1)
+    # The TTS delivers 120ms of audio at once; it plays back in order
+    envelope.push(memoryview(bytearray(tone(0.04))), SAMPLE_RATE, now=100.0)
+    envelope.push(tone(0.04), SAMPLE_RATE, now=100.0)
+    envelope.push(silence(0.04), SAMPLE_RATE, now=100.0)
+
+    assert envelope.level_at(99.99) == 0.0
+    loud = envelope.level_at(100.075)
+    assert loud > 0.9
+    assert envelope.level_at(100.115) < loud * 0.8
+    assert envelope.level_at(101.0) < 0.01
+    assert envelope.get_status(101.0)["frames"] == 3
+
+    # A click in silence: the peak detector catches it, RMS barely does
+    click = bytearray(silence(0.02))
+    click[200:202] = (20000).to_bytes(2, "little", signed=True)
+    rms, peak = AudioEnvelope(), AudioEnvelope(detector=DETECTOR_PEAK)
+    for envelope in (rms, peak):
+        envelope.push(bytes(click), SAMPLE_RATE, now=0.0)
+    assert peak.level_at(0.015) > rms.level_at(0.015) * 1.5
+
+
+def test_observer_reads_each_frame_once_and_drops_it_on_interruption():
+    async def scenario():
+        envelope = AudioEnvelope()
+        observer = TTSEnvelopeObserver(envelope)
+        frame = TTSAudioRawFrame(tone(0.5), SAMPLE_RATE, 1)
+        # The same frame is observed at every hop through the pipeline
+        for _ in range(3):
+            await observer.on_push_frame(
+                FramePushed(None, None, frame, FrameDirection.DOWNSTREAM, 0)
+            )
+        assert envelope.frames == 1
+        assert envelope.get_status()["queued_seconds"] > 0.4
+
+        interruption = InterruptionFrame()
+        await observer.on_push_frame(
+            FramePushed(None, None, interruption, FrameDirection.DOWNSTREAM, 0)
+        )
+        assert envelope.get_status()["queued_seconds"] == 0.0
+
+    asyncio.run(scenario())
+
+
+def test_audio_layer_modulates_the_animated_brightness():
+    async def scenario():
+        config = parse_light_config(
+            {
+                "primary_color": {"r": 1.0, "g": 1.0, "b": 1.0, "a": 1.0},
+                "layers": [{"type": "audio", "depth": 0.8}],
+            }
+        )
+        speaking = CrystalLightController("Puck", "loud", config=config)
+        quiet = CrystalLightController("Puck", "quiet", config=config)
+        assert speaking.config.effect is quiet.config.effect
+        scheduler = AnimationScheduler()
+        for controller in (speaking, quiet):
+            controller.speaking_start_time = 50.0
+            scheduler.add(controller)
+        await scheduler.stop()
+
+        speaking.audio_envelope.push(tone(0.5, amplitude=30000), SAMPLE_RATE, now=50.0)
+        colors = scheduler.compute(50.3)
+        bright = colors[scheduler._rows[id(speaking)]]
+        dark = colors[scheduler._rows[id(quiet)]]
+        assert bright[0] > 0.9
+        assert np.allclose(dark, 0.2)
+        level = speaking.audio_level(50.3)
+        expected = speaking._calculate_animated_color(0.3, level)
+        assert np.allclose(bright, (expected.r, expected.g, expected.b, expected.a))
+
+    asyncio.run(scenario())
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+#
+# Test script for the bot registry (preloading and hot reload)
+#
+import json
+import os
+import shutil
+import tempfile
+
+from bot_registry import BotRegistry
+from lore_build import build_all, load_bundle
+
+
+def _make_lore(root):
+    bot_dir = os.path.join(root, "bots", "Testbot")
+    os.makedirs(bot_dir)
+    with open(os.path.join(root, "welt.txt"), "w", encoding="utf-8") as f:
+        f.write("Allgemeines Wissen")
+    with open(os.path.join(bot_dir, "1_wesen.txt"), "w", encoding="utf-8") as f:
+        f.write("Ich bin ein Testwesen")
+    with open(os.path.join(bot_dir, "config.json"), "w", encoding="utf-8") as f:
+        json.dump({"voice_id": "Kore", "light_config": {"shelly_ip": "10.0.0.1"}}, f)
+    return bot_dir
+
+
+def test_registry_preloads_bots():
+    root = tempfile.mkdtemp()
+    try:
+        _make_lore(root)
+        registry = BotRegistry("BASE", lore_directory=root, reload_interval=0)
+        registry.load_all()
+
+        entry = registry.get("Testbot")
+        assert registry.bot_names() == ["Testbot"]
+        assert entry.voice_id == "Kore"
+        assert entry.light_config.shelly_ip == "10.0.0.1"
+        assert "Ich bin ein Testwesen" in entry.system_instruction
+        assert "Allgemeines Wissen" in entry.system_instruction
+
+        # Unknown bots fall back to the general lore
+        fallback = registry.get("Unbekannt")
+        assert fallback.voice_id == "Unbekannt"
+        assert "Ich bin ein Testwesen" not in fallback.system_instruction
+    finally:
+        shutil.rmtree(root)
+
+
+def test_registry_reloads_only_changed_bots():
+    root = tempfile.mkdtemp()
+    try:
+        bot_dir = _make_lore(root)
+        registry = BotRegistry("BASE", lore_directory=root, reload_interval=0)
+        registry.load_all()
+        before = registry.get("Testbot")
+
+        # Touching a file without changing its content does not rebuild
+        os.utime(os.path.join(bot_dir, "1_wesen.txt"))
+        assert registry.reload_changed() == []
+        assert registry.get("Testbot") is before
+
+        with open(os.path.join(bot_dir, "1_wesen.txt"), "w", encoding="utf-8") as f:
+            f.write("Ich bin ein neues Testwesen")
+        assert registry.reload_changed() == ["Testbot"]
+        assert "neues Testwesen" in registry.get("Testbot").system_instruction
+    finally:
+        shutil.rmtree(root)
+
+
+def test_bundles_are_used_until_stale():
+    root = tempfile.mkdtemp()
+    try:
+        bot_dir = _make_lore(root)
+        bundle_dir = os.path.join(root, "_bundles")
+        build_all(root, bundle_dir, base_prompt="BASE")
+
+        assert load_bundle("Testbot", bundle_dir, root, "BASE") is not None
+        # A different base prompt invalidates the bundle
+        assert load_bundle("Testbot", bundle_dir, root, "OTHER") is None
+
+        with open(os.path.join(bot_dir, "2_neu.txt"), "w", encoding="utf-8") as f:
+            f.write("Neues Wissen")
+        assert load_bundle("Testbot", bundle_dir, root, "BASE") is None
+
+        # The registry falls back to raw text for the stale bundle
+        registry = BotRegistry(
+            "BASE", lore_directory=root, reload_interval=0, bundle_directory=bundle_dir
+        )
+        registry.load_all()
+        assert "Neues Wissen" in registry.get("Testbot").system_instruction
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    test_registry_preloads_bots()
+    test_registry_reloads_only_changed_bots()
+    test_bundles_are_used_until_stale()
+    print("✅ Bot registry tests passed!")
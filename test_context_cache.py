@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+#
+# Test script for the per-bot context cache manager against a local stand-in
+# of the Gemini cachedContents API
+#
+import asyncio
+import itertools
+
+from aiohttp import web
+from pipecat.services.gemini_multimodal_live import events
+from websockets.exceptions import ConnectionClosedError
+from websockets.frames import Close
+
+from context_cache import CachedContextGeminiLiveService, ContextCacheManager
+
+PROMPT = "Du bist ein Kristallwesen. " * 50
+
+
+class FakeCacheApi:
+    """Minimal in-memory cachedContents endpoint"""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.caches = {}
+        self.calls = []
+        self._ids = itertools.count(1)
+
+    async def create(self, request):
+        self.calls.append(("POST", request.query.get("key")))
+        if self.fail:
+            return web.json_response({"error": "quota"}, status=429)
+        body = await request.json()
+        name = f"cachedContents/c{next(self._ids)}"
+        self.caches[name] = body
+        return web.json_response({"name": name, "ttl": body["ttl"]})
+
+    async def update(self, request):
+        name = f"cachedContents/{request.match_info['id']}"
+        self.calls.append(("PATCH", request.query.get("updateMask")))
+        self.caches[name]["ttl"] = (await request.json())["ttl"]
+        return web.json_response({"name": name})
+
+    async def delete(self, request):
+        name = f"cachedContents/{request.match_info['id']}"
+        self.calls.append(("DELETE", name))
+        self.caches.pop(name, None)
+        return web.json_response({})
+
+    def count(self, method):
+        return sum(1 for call in self.calls if call[0] == method)
+
+
+async def _with_api(api, scenario, **manager_kwargs):
+    app = web.Application()
+    app.router.add_post("/v1beta/cachedContents", api.create)
+    app.router.add_patch("/v1beta/cachedContents/{id}", api.update)
+    app.router.add_delete("/v1beta/cachedContents/{id}", api.delete)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    manager = ContextCacheManager(
+        "test-key",
+        "models/test",
+        api_url=f"http://127.0.0.1:{port}/v1beta",
+        min_tokens=10,
+        **manager_kwargs,
+    )
+    try:
+        await scenario(manager)
+    finally:
+        await manager.stop()
+        await runner.cleanup()
+
+
+def test_cache_created_once_shared_and_recreated_on_change():
+    api = FakeCacheApi()
+
+    async def scenario(manager):
+        handles = await asyncio.gather(
+            *[manager.get_handle("Asche", PROMPT) for _ in range(5)]
+        )
+        assert set(handles) == {"cachedContents/c1"}
+        assert api.count("POST") == 1
+        assert api.caches["cachedContents/c1"]["systemInstruction"] == {
+            "parts": [{"text": PROMPT}]
+        }
+
+        # A lore reload changes the prompt: new cache, old one deleted
+        assert await manager.get_handle("Asche", PROMPT + "Neu.") == (
+            "cachedContents/c2"
+        )
+        assert ("DELETE", "cachedContents/c1") in api.calls
+
+        # Small prompts are not worth caching
+        assert await manager.get_handle("Zephyr", "Kurz.") is None
+
+    asyncio.run(_with_api(api, scenario))
+    assert api.calls[0] == ("POST", "test-key")
+    assert api.caches == {}  # stop() deletes the remaining cache
+
+
+def test_cache_refreshed_before_expiry_and_falls_back_on_failure():
+    api = FakeCacheApi()
+
+    async def scenario(manager):
+        handle = await manager.get_handle("Asche", PROMPT)
+        manager._contexts["Asche"].expires_at -= 3590  # 10s left of 3600s
+        await manager.refresh_expiring()
+        assert api.calls[-1] == ("PATCH", "ttl")
+        assert await manager.get_handle("Asche", PROMPT) == handle
+        assert api.count("POST") == 1
+
+    asyncio.run(_with_api(api, scenario, ttl_seconds=3600))
+
+    failing = FakeCacheApi(fail=True)
+
+    async def failing_scenario(manager):
+        assert await manager.get_handle("Asche", PROMPT) is None
+        # Backoff: no second request right after a failure
+        assert await manager.get_handle("Asche", PROMPT) is None
+        assert failing.count("POST") == 1
+
+    asyncio.run(_with_api(failing, failing_scenario))
+
+    async def rejected_scenario(manager):
+        handle = await manager.get_handle("Asche", PROMPT)
+        manager.reject("Asche", handle)
+        assert await manager.get_handle("Asche", PROMPT) is None
+        assert api.count("POST") == 1
+
+    api = FakeCacheApi()
+    asyncio.run(_with_api(api, rejected_scenario))
+
+
+def test_live_setup_sends_handle_instead_of_system_instruction():
+    service = CachedContextGeminiLiveService(
+        cached_content="cachedContents/c1",
+        api_key="test-key",
+        system_instruction=PROMPT,
+    )
+    sent = []
+
+    async def capture(message):
+        sent.append(message)
+
+    service._ws_send = capture
+    config = events.Config.model_validate({"setup": {"model": "models/test"}})
+    config.setup.system_instruction = events.SystemInstruction(
+        parts=[events.ContentPart(text=PROMPT)]
+    )
+    asyncio.run(service.send_client_event(config))
+
+    assert sent[0]["setup"]["cached_content"] == "cachedContents/c1"
+    assert "system_instruction" not in sent[0]["setup"]
+
+
+class RejectingWebSocket:
+    """Live socket the server closes right after the setup message"""
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        raise ConnectionClosedError(Close(1007, "Invalid cached_content"), None)
+
+
+def test_rejected_setup_reconnects_with_system_instruction():
+    service = CachedContextGeminiLiveService(
+        cached_content="cachedContents/c1",
+        api_key="test-key",
+        system_instruction=PROMPT,
+    )
+    config = events.Config.model_validate({"setup": {"model": "models/test"}})
+    config.setup.system_instruction = events.SystemInstruction(
+        parts=[events.ContentPart(text=PROMPT)]
+    )
+    sent, rejected = [], []
+
+    async def capture(message):
+        sent.append(message)
+
+    async def reconnect():
+        await service.send_client_event(config)
+
+    @service.event_handler("on_cached_content_rejected")
+    async def on_cached_content_rejected(service, name):
+        rejected.append(name)
+
+    service._ws_send = capture
+    service._connect = reconnect
+    service._websocket = RejectingWebSocket()
+    asyncio.run(service._receive_task_handler())
+
+    assert rejected == ["cachedContents/c1"]
+    assert "cached_content" not in sent[0]["setup"]
+    assert sent[0]["setup"]["system_instruction"]["parts"][0]["text"] == PROMPT
+
+    # Once the setup completed, a close is not the cache's fault
+    service._cached_content = "cachedContents/c2"
+    service._api_session_ready = True
+    service._websocket = RejectingWebSocket()
+    try:
+        asyncio.run(service._receive_task_handler())
+    except ConnectionClosedError:
+        pass
+    else:
+        raise AssertionError("the close was swallowed")
+    assert len(sent) == 1
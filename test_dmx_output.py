@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+#
+# Test script for the Art-Net / sACN output, against a local UDP listener
+#
+import asyncio
+
+from crystal_light_controller import Color, parse_light_config
+from dmx_output import PROTOCOL_ARTNET, PROTOCOL_SACN, DmxOutput, decode_dmx_packet
+from light_hub import LightHub
+
+
+class UdpListener(asyncio.DatagramProtocol):
+    def __init__(self):
+        self.packets = []
+
+    def datagram_received(self, data, addr):
+        self.packets.append(decode_dmx_packet(data))
+
+
+async def listen():
+    loop = asyncio.get_running_loop()
+    transport, listener = await loop.create_datagram_endpoint(
+        UdpListener, local_addr=("127.0.0.1", 0)
+    )
+    return transport, listener, transport.get_extra_info("sockname")[1]
+
+
+def test_all_crystals_of_a_tick_share_one_packet():
+    async def scenario():
+        for protocol in (PROTOCOL_ARTNET, PROTOCOL_SACN):
+            transport, listener, port = await listen()
+            output = DmxOutput(protocol, target="127.0.0.1", port=port, fps=20.0)
+            fixtures = [output.fixture(3, 1 + 4 * i) for i in range(3)]
+            try:
+                # One animation tick: every crystal changes
+                for i, fixture in enumerate(fixtures):
+                    fixture.post_color(Color(i / 4, 0.5, 1.0, 1.0))
+                await asyncio.sleep(0.02)
+                assert len(listener.packets) == 1
+                fixtures[1].post_color(Color(0.0, 0.0, 0.0, 0.0))
+                await asyncio.sleep(0.1)
+            finally:
+                await output.close()
+                transport.close()
+
+            assert len(listener.packets) == 2
+            (_, universe, first, data), (_, _, second, changed) = listener.packets
+            assert (universe, first, second) == (3, 1, 2)
+            assert len(data) == 12
+            expected = [
+                Color(i / 4, 0.5, 1.0, 1.0).to_shelly_format() for i in range(3)
+            ]
+            assert list(data) == [channel for rgbw in expected for channel in rgbw]
+            assert list(changed[4:8]) == [0, 0, 0, 0]
+            assert list(changed[:4]) == list(data[:4])
+            assert listener.packets[0][0] == protocol
+            assert output.get_stats()["packets_sent"] == 2
+
+    asyncio.run(scenario())
+
+
+def test_bad_dmx_addresses_disable_dmx_for_the_bot():
+    # sACN universe 0 is reserved: a bot setting only the channel gets 1
+    config = parse_light_config({"dmx_channel": 5}, PROTOCOL_SACN)
+    assert (config.dmx_universe, config.dmx_channel) == (1, 5)
+    config = parse_light_config({"dmx_channel": 5}, PROTOCOL_ARTNET)
+    assert (config.dmx_universe, config.dmx_channel) == (0, 5)
+
+    bad_configs = [
+        ({"dmx_universe": 0, "dmx_channel": 5}, PROTOCOL_SACN),
+        ({"dmx_universe": 64000, "dmx_channel": 5}, PROTOCOL_SACN),
+        ({"dmx_universe": 32768, "dmx_channel": 5}, PROTOCOL_ARTNET),
+        ({"dmx_channel": 510}, PROTOCOL_SACN),
+        ({"dmx_channel": 0}, PROTOCOL_ARTNET),
+    ]
+    hub = LightHub(dmx_output=DmxOutput(PROTOCOL_SACN))
+    for data, protocol in bad_configs:
+        config = parse_light_config(data, protocol)
+        assert config.dmx_channel is None
+        # The session connects without the fixture instead of failing
+        assert hub.connect("session", config) == []
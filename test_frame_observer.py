@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+#
+# Test script for the type-dispatched observer base
+#
+import asyncio
+
+from pipecat.frames.frames import (
+    InterruptionFrame,
+    OutputAudioRawFrame,
+    TextFrame,
+    TTSAudioRawFrame,
+    TTSStartedFrame,
+)
+from pipecat.observers.base_observer import FramePushed
+from pipecat.processors.frame_processor import FrameDirection
+
+from frame_observer import FrameTypeObserver, handles
+
+
+def _pushed(frame):
+    return FramePushed(None, None, frame, FrameDirection.DOWNSTREAM, 0)
+
+
+def _audio():
+    return TTSAudioRawFrame(audio=b"\x00\x00" * 480, sample_rate=24000, num_channels=1)
+
+
+class RecordingObserver(FrameTypeObserver):
+    def __init__(self):
+        super().__init__()
+        self.seen = []
+
+    @handles(OutputAudioRawFrame)
+    async def on_output_audio(self, frame):
+        self.seen.append("output audio")
+
+    @handles(TTSAudioRawFrame, TTSStartedFrame)
+    async def on_tts(self, frame):
+        self.seen.append(type(frame).__name__)
+
+
+class InterruptibleObserver(RecordingObserver):
+    once_per_frame = True
+
+    # Overrides the subscribed method without a decorator
+    async def on_tts(self, frame):
+        self.seen.append("tts")
+
+    @handles(InterruptionFrame)
+    async def on_interruption(self, frame):
+        self.seen.append("interruption")
+
+
+def test_frames_dispatch_to_the_most_specific_subscription():
+    async def scenario():
+        observer = RecordingObserver()
+        audio = _audio()
+        for frame in (
+            TTSStartedFrame(),
+            audio,
+            OutputAudioRawFrame(audio=b"", sample_rate=24000, num_channels=1),
+            TextFrame("hello"),
+            InterruptionFrame(),
+        ):
+            await observer.on_push_frame(_pushed(frame))
+        await observer.on_push_frame(_pushed(audio))
+        assert observer.seen == [
+            "TTSStartedFrame",
+            "TTSAudioRawFrame",
+            "output audio",
+            "TTSAudioRawFrame",
+        ]
+        # Unsubscribed types are cached as having no handler
+        assert RecordingObserver._dispatch[TextFrame] is None
+        assert RecordingObserver.handler_for(InterruptionFrame) is None
+
+    asyncio.run(scenario())
+
+
+def test_subclass_extends_and_overrides_subscriptions():
+    async def scenario():
+        observer = InterruptibleObserver()
+        audio = _audio()
+        for frame in (audio, audio, InterruptionFrame(), audio):
+            await observer.on_push_frame(_pushed(frame))
+        # Each frame only at its first hop
+        assert observer.seen == ["tts", "interruption"]
+        assert InterruptibleObserver.handler_for(InterruptionFrame) is not None
+        assert RecordingObserver.handler_for(InterruptionFrame) is None
+
+    asyncio.run(scenario())
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+#
+# Test script for the batched light animation scheduler
+#
+import asyncio
+
+import numpy as np
+from loguru import logger
+
+from crystal_light_controller import Color, CrystalLightController
+from light_animation import AnimationScheduler, get_animation_scheduler
+from light_sender import LightSender
+from session_registry import SessionRegistry
+
+
+def _controllers(count):
+    bots = ["Puck", "Charon", "Kore", "Zephyr"]
+    controllers = []
+    for i in range(count):
+        controller = CrystalLightController(bots[i % len(bots)], f"anim_{i}")
+        controller.speaking_start_time = 1000.0 + i
+        controllers.append(controller)
+    return controllers
+
+
+def test_batched_colors_match_scalar_reference():
+    async def scenario():
+        scheduler = AnimationScheduler()
+        controllers = _controllers(9)
+        for controller in controllers:
+            scheduler.add(controller)
+        # Swap-removal must keep every row bound to its controller
+        scheduler.remove(controllers[2])
+        del controllers[2]
+        await scheduler.stop()
+
+        now = 1012.5
+        colors = scheduler.compute(now)
+        assert colors.shape == (len(controllers), 4)
+        for controller in controllers:
+            expected = controller._calculate_animated_color(
+                now - controller.speaking_start_time
+            )
+            row = colors[scheduler._rows[id(controller)]]
+            assert np.allclose(row, (expected.r, expected.g, expected.b, expected.a))
+
+    asyncio.run(scenario())
+
+
+def test_only_changed_colors_are_dispatched():
+    async def scenario():
+        scheduler = AnimationScheduler()
+        controllers = _controllers(3)
+        sent = []
+        for controller in controllers:
+            controller.config.pulse_intensity = 0.0
+            controller.config.breathing_effect = False
+            controller.config.variation_intensity = 0.0
+
+            def apply(rgba, controller=controller):
+                sent.append(controller)
+
+            controller._apply_animated_color = apply
+            scheduler.add(controller)
+        await scheduler.stop()
+
+        await scheduler.tick(now=1010.0)
+        assert len(sent) == 3
+        # Static colors: nothing changes, nothing is sent
+        await scheduler.tick(now=1010.1)
+        assert len(sent) == 3
+
+        # Only the second controller's effect animates now
+        config = controllers[1].config
+        config.variation_intensity = 1.0
+        config.fade_to_color = Color(0.0, 0.0, 0.0, 0.0)
+        scheduler._effects[scheduler._rows[id(controllers[1])]] = config.effect
+        scheduler._groups = None
+        await scheduler.tick(now=1011.0)
+        assert sent[3:] == [controllers[1]]
+        assert scheduler.get_stats()["dispatched"] == 4
+
+    asyncio.run(scenario())
+
+
+def test_changes_are_perceptual_rate_limited_and_keyframed():
+    async def scenario():
+        scheduler = AnimationScheduler()
+        (controller,) = _controllers(1)
+        scheduler.add(controller)
+        await scheduler.stop()
+
+        def sent(rgba, now):
+            return len(scheduler.changed_rows(np.array([rgba]), now)) == 1
+
+        assert sent((0.5, 0.2, 0.8, 1.0), 0.0)
+        # Barely visible: one step of one channel
+        assert not sent((0.5, 0.2, 0.805, 1.0), 0.01)
+        # Clearly visible, but within 1 / max_update_rate of the last command
+        assert not sent((0.2, 0.6, 0.3, 1.0), 0.03)
+        assert sent((0.2, 0.6, 0.3, 1.0), 0.15)
+        # Small drift is sent once the keyframe interval has passed
+        assert not sent((0.2, 0.6, 0.305, 1.0), 0.5)
+        assert sent((0.2, 0.6, 0.305, 1.0), 1.2)
+        # Nothing at all changed on the device: never sent
+        assert not sent((0.2, 0.6, 0.3051, 1.0), 5.0)
+
+    asyncio.run(scenario())
+
+
+class RecordingWebSocket:
+    def __init__(self):
+        self.messages = []
+
+    async def send_text(self, text):
+        self.messages.append(text)
+
+
+def test_animation_runs_only_while_a_light_socket_is_attached():
+    async def scenario():
+        warnings = []
+        sink = logger.add(
+            warnings.append,
+            level="WARNING",
+            filter=lambda record: "No light WebSocket" in record["message"],
+        )
+        entry = SessionRegistry().open_voice("Puck")
+        controller = CrystalLightController(
+            "Puck", entry.session_id, session_entry=entry
+        )
+        entry.light_controller = controller
+        scheduler = get_animation_scheduler()
+        try:
+            # Unpaired: nothing is animated and the gap is logged once
+            await controller.start_speaking()
+            await asyncio.sleep(0.2)
+            assert controller not in scheduler
+            assert len(warnings) == 1
+
+            ws = RecordingWebSocket()
+            sender = LightSender(ws, entry.session_id)
+            sender.start()
+            entry.attach_light(sender)
+            assert controller in scheduler
+            await asyncio.sleep(0.2)
+            assert ws.messages
+
+            # Suspending keeps the drifted phases for the next resume
+            row = scheduler._rows[id(controller)]
+            drifted = scheduler._phases[row].copy()
+            entry.detach_light(sender)
+            assert controller not in scheduler
+            assert controller.phases == list(drifted)
+            await controller.stop_speaking()
+            assert len(warnings) == 2
+            await sender.close()
+        finally:
+            logger.remove(sink)
+            await controller.cleanup()
+
+    asyncio.run(scenario())
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+#
+# Test script for the composable light effect layers
+#
+import math
+
+import numpy as np
+
+from crystal_light_controller import default_light_config, parse_light_config
+from light_effects import MAX_PHASES
+from light_protocol import effect_descriptor
+
+LAYERS = [
+    {"type": "color_shift", "variation": 0.8, "to": {"r": 1.0, "g": 0.5}},
+    {"type": "flicker", "intensity": 0.4},
+    {"type": "pulse", "intensity": 0.3, "speed": 3.0},
+    {"type": "strobe"},
+    {"type": "fade_in", "duration": 2.0},
+]
+
+
+def test_classic_stack_matches_the_flat_keys():
+    config = default_light_config()
+    phases = [0.3, 1.1, 2.5] + [0.0] * (MAX_PHASES - 3)
+    elapsed = 4.2
+
+    # The formulas of the former hard-coded recipe
+    p, speed = phases[0], config.color_shift_speed
+    combined = (
+        math.sin(p + elapsed * speed) * 0.4
+        + math.sin(p + elapsed * speed * 1.3) * 0.3
+        + math.sin(p + elapsed * speed * 0.7) * 0.3
+    ) / 3.0
+    shift = (combined + 1.0) / 2.0 * config.variation_intensity
+    pulse = max(
+        0.3,
+        1.0
+        + math.sin(phases[1] + elapsed * config.pulse_speed) * config.pulse_intensity,
+    )
+    breathing = max(
+        0.5,
+        1.0
+        + math.sin(phases[2] + elapsed * config.breathing_speed)
+        * config.breathing_intensity,
+    )
+    color = config.primary_color.lerp(config.fade_to_color, shift)
+    expected = (color * pulse * breathing).clamp()
+
+    actual = config.effect.color_at(elapsed, phases)
+    assert np.allclose(actual, (expected.r, expected.g, expected.b, expected.a))
+
+    # Changing the config recompiles; equal configs share the compiled effect
+    effect = config.effect
+    assert default_light_config().effect is effect
+    config.pulse_intensity = 0.0
+    assert config.effect is not effect
+    assert "phases[1]" in effect.source
+    assert "phases[1]" not in config.effect.source
+
+
+def test_layer_stack_is_parsed_compiled_and_batched():
+    config = parse_light_config(
+        {"primary_color": {"r": 0.2, "g": 0.1, "b": 0.9}, "layers": LAYERS}
+    )
+    # Unknown layers are dropped, missing keys take the defaults
+    assert [layer["type"] for layer in config.layers] == [
+        "color_shift",
+        "flicker",
+        "pulse",
+        "fade_in",
+    ]
+    assert config.layers[1]["speed"] == 12.0
+    # Clients only render the classic effect
+    assert effect_descriptor(config, (0.0, 0.0, 0.0)) is None
+
+    effect = config.effect
+    # The color starts dark while fading in
+    assert effect.color_at(0.0, [0.0] * MAX_PHASES) == (0.0, 0.0, 0.0, 0.0)
+
+    rng = np.random.default_rng(7)
+    elapsed = rng.uniform(0.0, 5.0, 50)
+    phases = rng.uniform(0.0, 2 * math.pi, (50, MAX_PHASES))
+    out = np.empty((50, 4))
+    effect.evaluate(elapsed, phases, out)
+    for row in range(50):
+        assert np.allclose(out[row], effect.color_at(elapsed[row], phases[row]))
+    assert out.min() >= 0.0 and out.max() <= 1.0
+
+    # Layers apply in order: shifting towards "to" after the fade-in is lit
+    reordered = parse_light_config(
+        {"primary_color": {"r": 0.2, "g": 0.1, "b": 0.9}, "layers": LAYERS[::-1]}
+    )
+    assert reordered.effect.color_at(0.0, [0.0] * MAX_PHASES)[3] > 0.0
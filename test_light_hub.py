@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+#
+# Test script for the device hub that arbitrates sessions sharing a light
+#
+import asyncio
+
+from pipecat.frames.frames import TTSStartedFrame, TTSStoppedFrame
+from pipecat.observers.base_observer import FramePushed
+from pipecat.processors.frame_processor import FrameDirection
+
+from crystal_light_controller import Color, CrystalLightController, parse_light_config
+from light_hub import POLICY_BLEND, POLICY_PRIORITY, DeviceHub, LightHub
+from session_registry import SessionRegistry
+from speaking_light_observer import SpeakingLightObserver
+from speech_activity import SpeechActivityObserver
+
+OFF = Color(0.0, 0.0, 0.0, 0.0)
+RED = Color(1.0, 0.0, 0.0, 1.0)
+BLUE = Color(0.0, 0.0, 1.0, 1.0)
+
+
+class RecordingDevice:
+    def __init__(self):
+        self.colors = []
+
+    def post_color(self, color):
+        self.colors.append(color)
+
+
+class RecordingShellyDriver:
+    def __init__(self):
+        self.devices = {}
+
+    def device(self, ip):
+        return self.devices.setdefault(ip, RecordingDevice())
+
+
+def test_most_recent_speaker_owns_the_light():
+    device = RecordingDevice()
+    hub = DeviceHub("shelly:10.0.0.7", device)
+    first, second = hub.connect("a"), hub.connect("b")
+
+    first.post_color(RED)
+    second.post_color(BLUE)
+    # The first speaker keeps animating; nothing reaches the device
+    first.post_color(Color(0.9, 0.0, 0.0, 1.0))
+    assert device.colors == [RED, BLUE]
+    assert hub.writer is second
+
+    second.post_color(OFF)
+    assert device.colors[-1] == Color(0.9, 0.0, 0.0, 1.0)
+    first.post_color(OFF)
+    second.close()
+    first.close()
+    assert device.colors[-1] == OFF
+
+    status = hub.get_status()
+    assert status["commands_in"] == 5 and status["commands_out"] == 4
+    assert status["input_rate"] == 1.0 and status["output_rate"] == 0.8
+
+
+def test_priority_and_blend_policies():
+    device = RecordingDevice()
+    hub = DeviceHub("dmx:0:1", device, POLICY_PRIORITY)
+    boss, player = hub.connect("boss", priority=1), hub.connect("player")
+    boss.post_color(RED)
+    player.post_color(BLUE)
+    assert device.colors == [RED] and hub.writer is boss
+
+    device = RecordingDevice()
+    hub = DeviceHub("dmx:0:5", device, POLICY_BLEND)
+    hub.connect("a").post_color(RED)
+    hub.connect("b").post_color(Color(0.0, 0.0, 1.0, 0.5))
+    assert device.colors == [RED, Color(0.5, 0.0, 0.5, 1.0)]
+
+
+def test_bot_speech_drives_the_session_light_device():
+    async def scenario():
+        driver = RecordingShellyDriver()
+        hub = LightHub(shelly_driver=driver)
+        entry = SessionRegistry().open_voice("Puck")
+        config = parse_light_config(
+            {
+                "primary_color": {"r": 1.0, "g": 0.5, "b": 0.0, "a": 1.0},
+                "shelly_ip": "10.0.0.7",
+            }
+        )
+        controller = CrystalLightController(
+            "Puck", entry.session_id, config=config, session_entry=entry
+        )
+        # Wired as in the bot: no light socket, only the server-driven device
+        for hub_input in hub.connect(entry.session_id, controller.config):
+            entry.attach_light_device(hub_input)
+        speech_activity = SpeechActivityObserver()
+        SpeakingLightObserver(controller).attach(speech_activity)
+
+        async def push(frame):
+            await speech_activity.on_push_frame(
+                FramePushed(None, None, frame, FrameDirection.DOWNSTREAM, 0)
+            )
+
+        try:
+            await push(TTSStartedFrame())
+            await asyncio.sleep(0.5)
+            await push(TTSStoppedFrame())
+        finally:
+            await controller.cleanup()
+
+        colors = driver.devices["10.0.0.7"].colors
+        assert any(color.a > 0 for color in colors)
+        assert colors[-1] == config.off_color
+
+    asyncio.run(scenario())
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+#
+# Test script for the /light-ws wire formats
+#
+import asyncio
+import json
+
+from crystal_light_controller import (
+    Color,
+    CrystalLightController,
+    parse_light_config,
+)
+from light_protocol import (
+    PROTOCOL_BINARY,
+    PROTOCOL_EFFECT,
+    PROTOCOL_JSON,
+    LightSession,
+    color_command,
+    decode_color_frames,
+    encode_color_frames,
+    negotiate,
+)
+from light_sender import LightSender
+from session_registry import SessionRegistry
+from speaking_light_observer import SpeakingLightObserver
+
+
+class RecordingWebSocket:
+    def __init__(self):
+        self.messages = []
+
+    async def send_text(self, text):
+        self.messages.append(json.loads(text))
+
+    async def send_bytes(self, data):
+        self.messages.append(data)
+
+
+def test_binary_frames_carry_the_json_command():
+    session = LightSession("Puck", "10.0.0.7")
+    colors = [Color(0.9, 0.2, 0.4, 0.8), Color(0.0, 0.0, 0.0, 0.0)]
+    message = encode_color_frames([(65535, colors[0]), (65536, colors[1])])
+    assert len(message) == 2 + 2 * 7
+
+    frames = decode_color_frames(message)
+    assert [frame["sequence"] for frame in frames] == [65535, 0]
+    for frame, color in zip(frames, colors):
+        expected = color_command(session, color)["command"]
+        assert {k: v for k, v in frame.items() if k != "sequence"} == expected
+
+    assert negotiate({}, "Puck", None).protocol == PROTOCOL_JSON
+    binary = negotiate({"proto": "bin1", "batch": "50"}, "Puck", "10.0.0.7")
+    assert binary.protocol == PROTOCOL_BINARY and binary.batch_frames == 8
+    assert negotiate({"proto": "bin1", "batch": "x"}, "Puck", None).batch_frames == 1
+
+
+def test_sender_sends_header_once_then_batched_frames():
+    async def scenario():
+        ws = RecordingWebSocket()
+        session = LightSession("Puck", "10.0.0.7", PROTOCOL_BINARY, batch_frames=3)
+        sender = LightSender(ws, "bin", session)
+        sender.start()
+        for i in range(6):
+            sender.post_color(Color(i / 10, 0.5, 0.5, 1.0))
+            await asyncio.sleep(1 / 30)
+        await asyncio.sleep(0.2)
+
+        header, *frames = ws.messages
+        assert header["type"] == "light_session" and header["shelly_ip"] == "10.0.0.7"
+        decoded = [
+            frame for message in frames for frame in decode_color_frames(message)
+        ]
+        assert [frame["sequence"] for frame in decoded] == [1, 2, 3, 4, 5, 6]
+        assert len(frames) < 6
+        status = sender.get_status()
+        assert status["frames_sent"] == 6 and status["coalesced"] == 0
+        await sender.close()
+
+    asyncio.run(scenario())
+
+
+def test_effect_session_sends_descriptor_and_speaking_events_only():
+    async def scenario():
+        ws = RecordingWebSocket()
+        entry = SessionRegistry().open_voice("Puck")
+        controller = CrystalLightController(
+            "Puck", entry.session_id, session_entry=entry
+        )
+        effect = controller.effect_descriptor()
+        session = negotiate({"proto": "effect1"}, "Puck", "10.0.0.7", effect)
+        sender = LightSender(ws, entry.session_id, session)
+        entry.attach_light(sender)
+        observer = SpeakingLightObserver(controller)
+        try:
+            sender.start()
+            # One utterance: the observer sends the speaking events and runs
+            # the controller's animation
+            await observer._handle_speaking_start()
+            await asyncio.sleep(0.5)
+            await observer._handle_speaking_stop()
+            await asyncio.sleep(0.05)
+        finally:
+            await controller.cleanup()
+            await sender.close()
+
+        header, *events = ws.messages
+        assert header["protocol"] == PROTOCOL_EFFECT
+        assert header["effect"]["phases"]["pulse"] == controller.phases[1]
+        assert isinstance(header["server_time"], float)
+        assert [event["type"] for event in events] == [
+            "speaking_start",
+            "speaking_stop",
+        ]
+
+    asyncio.run(scenario())
+
+
+def test_json_session_gets_the_animation_without_speaking_events():
+    async def scenario():
+        ws = RecordingWebSocket()
+        entry = SessionRegistry().open_voice("Puck")
+        config = parse_light_config(
+            {"primary_color": {"r": 1.0, "g": 0.5, "b": 0.0, "a": 1.0}}
+        )
+        controller = CrystalLightController(
+            "Puck", entry.session_id, config=config, session_entry=entry
+        )
+        session = negotiate({}, "Puck", "10.0.0.7")
+        sender = LightSender(ws, entry.session_id, session)
+        entry.attach_light(sender)
+        observer = SpeakingLightObserver(controller)
+        try:
+            sender.start()
+            await observer._handle_speaking_start()
+            await asyncio.sleep(0.5)
+            await observer._handle_speaking_stop()
+            await asyncio.sleep(0.05)
+        finally:
+            await controller.cleanup()
+            await sender.close()
+
+        # The client animates locally on speaking_start: a color-streaming
+        # socket must only get the server's colors, ending with the off color
+        assert session.protocol == PROTOCOL_JSON
+        assert entry.has_light_consumer
+        assert not entry.post_speaking({"type": "speaking_start"})
+        assert {message["type"] for message in ws.messages} == {"light_command"}
+        assert any(message["command"]["turn"] == "on" for message in ws.messages)
+        assert ws.messages[-1]["command"]["turn"] == "off"
+
+    asyncio.run(scenario())
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+#
+# Test script for the latest-wins light command sender
+#
+import asyncio
+import json
+
+from light_protocol import PROTOCOL_BINARY, PROTOCOL_EFFECT, LightSession
+from light_sender import LightSender, RTVILightSender
+
+
+class RecordingWebSocket:
+    """Stand-in for a /light-ws client that takes `delay` seconds per message"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.messages = []
+        self.close_code = None
+
+    async def send_text(self, text):
+        await asyncio.sleep(self.delay)
+        self.messages.append(json.loads(text))
+
+    async def close(self, code=1000, reason=""):
+        self.close_code = code
+
+
+def test_slow_client_gets_latest_color_and_keeps_speaking_command():
+    async def scenario():
+        ws = RecordingWebSocket(delay=0.05)
+        sender = LightSender(ws, "slow")
+        sender.start()
+        sender.post("speaking", {"type": "speaking_start"})
+        for i in range(30):
+            sender.post("color", {"type": "light_command", "frame": i})
+            await asyncio.sleep(0.005)
+        await asyncio.sleep(0.2)
+
+        status = sender.get_status()
+        assert ws.messages[0] == {"type": "speaking_start"}
+        assert ws.messages[-1]["frame"] == 29
+        assert status["sent"] == len(ws.messages) < 10
+        assert status["coalesced"] == status["posted"] - status["sent"]
+        assert status["pending"] == 0
+        await sender.close()
+
+    asyncio.run(scenario())
+
+
+def test_stalled_client_does_not_block_others_and_is_closed():
+    async def scenario():
+        stalled_ws = RecordingWebSocket(delay=10)
+        fast_ws = RecordingWebSocket()
+        stalled = LightSender(stalled_ws, "stalled", send_timeout=0.02, max_timeouts=3)
+        fast = LightSender(fast_ws, "fast", send_timeout=0.02)
+        stalled.start()
+        fast.start()
+        for i in range(10):
+            stalled.post("color", {"frame": i})
+            fast.post("color", {"frame": i})
+            await asyncio.sleep(0.03)
+
+        assert [m["frame"] for m in fast_ws.messages] == list(range(10))
+        assert stalled.closed and stalled_ws.close_code == 1011
+        status = stalled.get_status()
+        assert status["send_timeouts"] == 3
+        assert status["sent"] == 0
+        assert status["dropped"] + status["coalesced"] == 10
+        await stalled.close()
+        await fast.close()
+
+    asyncio.run(scenario())
+
+
+def test_send_over_budget_is_finished_not_cut():
+    async def scenario():
+        ws = RecordingWebSocket(delay=0.05)
+        sender = LightSender(ws, "slow", send_timeout=0.02, max_timeouts=5)
+        sender.start()
+        sender.post("speaking", {"type": "speaking_start"})
+        await asyncio.sleep(0.01)
+        sender.post("color", {"frame": 1})
+        sender.post("color", {"frame": 2})
+        await asyncio.sleep(0.15)
+
+        # The late frame arrives whole; colors waiting meanwhile coalesced
+        assert ws.messages == [{"type": "speaking_start"}, {"frame": 2}]
+        status = sender.get_status()
+        assert status["send_timeouts"] >= 2 and not status["closed"]
+        assert status["dropped"] == 0 and status["coalesced"] == 1
+        await sender.close()
+
+    asyncio.run(scenario())
+
+
+class RecordingRTVI:
+    """Stand-in for the session's RTVIProcessor"""
+
+    def __init__(self):
+        self.messages = []
+
+    async def send_server_message(self, data):
+        self.messages.append(data)
+
+
+def test_rtvi_sender_delivers_effect_session_as_server_messages():
+    async def scenario():
+        rtvi = RecordingRTVI()
+        effect = {"version": 1, "phases": {}}
+        session = LightSession("Puck", "10.0.0.7", PROTOCOL_EFFECT, effect=effect)
+        sender = RTVILightSender(rtvi, "voice", session)
+        sender.post("speaking", {"type": "speaking_start"})
+        sender.post("speaking", {"type": "speaking_stop"})
+        sender.start()
+        await asyncio.sleep(0.05)
+
+        header, stop = rtvi.messages
+        assert header["type"] == "light_session" and header["effect"] == effect
+        assert stop == {"type": "speaking_stop"}
+        assert sender.get_status()["coalesced"] == 1
+        await sender.close()
+
+        try:
+            RTVILightSender(rtvi, "voice", LightSession("Puck", None, PROTOCOL_BINARY))
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("bin1 must be rejected on RTVI")
+
+    asyncio.run(scenario())
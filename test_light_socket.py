@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+#
+# Test script for the /light-ws receive loop and heartbeat
+#
+import asyncio
+import json
+
+from light_sender import LightSender
+from light_socket import LightSocket
+
+
+class ClientWebSocket:
+    """Stand-in for a /light-ws client; `incoming` holds its ASGI messages"""
+
+    def __init__(self, answers_pings=True, send_delay=0.0):
+        self.answers_pings = answers_pings
+        self.send_delay = send_delay
+        self.incoming = asyncio.Queue()
+        self.messages = []
+        self.close_code = None
+
+    async def receive(self):
+        return await self.incoming.get()
+
+    async def send_text(self, text):
+        await asyncio.sleep(self.send_delay)
+        message = json.loads(text)
+        self.messages.append(message)
+        if message["type"] == "ping" and self.answers_pings:
+            pong = json.dumps({"type": "pong", "timestamp": message["timestamp"]})
+            self.incoming.put_nowait({"type": "websocket.receive", "text": pong})
+
+    async def close(self, code=1000, reason=""):
+        self.close_code = code
+
+
+def serve(ws, **kwargs):
+    sender = LightSender(ws, "test", **kwargs)
+    sender.start()
+    light_socket = LightSocket(
+        ws, sender, heartbeat_interval=0.1, heartbeat_timeout=0.1
+    )
+    return sender, light_socket, asyncio.create_task(light_socket.serve())
+
+
+def test_heartbeat_keeps_answering_clients_and_drops_silent_ones():
+    async def scenario():
+        ws = ClientWebSocket()
+        sender, light_socket, task = serve(ws)
+        await asyncio.sleep(0.5)
+        assert not task.done() and light_socket.answers_pings
+        assert light_socket.pings_sent >= 2
+
+        # The client stops answering: closed one timeout after its last ping
+        ws.answers_pings = False
+        await asyncio.wait_for(task, 0.5)
+        assert light_socket.close_reason == "heartbeat timeout"
+        assert ws.close_code == 1001
+        await sender.close()
+
+        # Clients that never answered a ping are only pinged
+        legacy = ClientWebSocket(answers_pings=False)
+        sender, light_socket, task = serve(legacy)
+        await asyncio.sleep(0.35)
+        assert not task.done() and light_socket.pings_sent >= 2
+        legacy.incoming.put_nowait({"type": "websocket.disconnect", "code": 1000})
+        await asyncio.wait_for(task, 0.05)
+        assert light_socket.close_reason == "disconnected"
+        await sender.close()
+
+    asyncio.run(scenario())
+
+
+def test_stalled_sender_ends_the_connection_immediately():
+    async def scenario():
+        ws = ClientWebSocket(send_delay=1.0)
+        sender, light_socket, task = serve(ws, send_timeout=0.02, max_timeouts=2)
+        sender.post("speaking", {"type": "speaking_start"})
+        await asyncio.sleep(0.03)
+        sender.post("speaking", {"type": "speaking_stop"})
+        await asyncio.wait_for(task, 0.2)
+        assert light_socket.close_reason == "stalled"
+        assert ws.close_code == 1011
+        await sender.close()
+
+    asyncio.run(scenario())
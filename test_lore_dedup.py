@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+#
+# Test script for near-duplicate lore paragraph removal
+#
+import os
+import shutil
+import tempfile
+
+from lore_build import compile_bundle
+from lore_dedup import deduplicate_documents
+
+STORY = (
+    "Die Wesen des Wandels und der Beständigkeit schufen gemeinsam die zehn "
+    "Inseln. Jede Insel wurde eine eigene Welt mit eigenen Völkern, eigenen "
+    "Gesetzen und einem Kristall in ihrem Herzen, der das Gleichgewicht hielt."
+)
+
+
+def test_near_duplicate_paragraph_keeps_first_occurrence():
+    variant = STORY.replace("das Gleichgewicht hielt", "das Gleichgewicht hält")
+    documents = [
+        ("bots/Test/1_wesen.txt", f"Ich bin ein Kristallwesen.\n\n{STORY}"),
+        ("hintergrund.txt", f"Vorwort zur Geschichte.\n\n{variant}"),
+        ("ZZZ_Prompt.txt", STORY),
+    ]
+    result, stats = deduplicate_documents(documents)
+
+    assert result[0] == documents[0]
+    assert result[1] == ("hintergrund.txt", "Vorwort zur Geschichte.")
+    assert len(result) == 2  # the prompt file was a pure duplicate
+    assert stats["paragraphs_removed"] == 2
+    assert stats["chars_saved"] == sum(len(c) for _, c in documents) - sum(
+        len(c) for _, c in result
+    )
+    assert {d["duplicate_of"] for d in stats["duplicates"]} == {"bots/Test/1_wesen.txt"}
+
+
+def test_short_refrains_survive_outside_repeated_passages():
+    content = "\n\n".join(
+        ["Alles war gut.", STORY, "Alles war gut.", "Dann kam der Sturm."]
+    )
+    result, stats = deduplicate_documents([("wissen.txt", content)])
+    assert result == [("wissen.txt", content)]
+    assert stats["paragraphs_removed"] == 0
+
+    # A repeated copy of the passage is removed together with its refrain
+    repeated = "\n\n".join([content, STORY, "Alles war gut."])
+    result, stats = deduplicate_documents([("wissen.txt", repeated)])
+    assert result == [("wissen.txt", content)]
+    assert stats["paragraphs_removed"] == 2
+
+
+def test_general_lore_block_is_identical_across_bots():
+    root = tempfile.mkdtemp()
+    try:
+        with open(os.path.join(root, "hintergrund.txt"), "w", encoding="utf-8") as f:
+            f.write(f"Vorwort zur Geschichte.\n\n{STORY}")
+        for bot, content in (
+            ("Quoter", f"Ich bin ein Kristallwesen.\n\n{STORY}"),
+            ("Plain", "Ich bin ein Sturmwesen."),
+        ):
+            os.makedirs(os.path.join(root, "bots", bot))
+            path = os.path.join(root, "bots", bot, "1_wesen.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(content)
+
+        quoter, plain = (
+            compile_bundle(bot, "BASE", lore_directory=root)["system_instruction"]
+            for bot in ("Quoter", "Plain")
+        )
+        # The bot's copy of the story goes, the general one stays
+        assert quoter.count(STORY) == 1
+        general_block = [
+            prompt[prompt.index("=== hintergrund.txt ===") :].split("=== 1_wesen")[0]
+            for prompt in (quoter, plain)
+        ]
+        assert general_block[0] == general_block[1]
+        assert STORY in general_block[0]
+    finally:
+        shutil.rmtree(root)
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+#
+# Test script for the lore retrieval index
+#
+import json
+
+from lore_index import LoreIndex, build_retrieval_lore, chunk_text
+
+
+def test_chunks_respect_paragraphs_and_size():
+    text = "Erster Absatz.\n\nZweiter Absatz.\n\n" + "\n".join(["Zeile"] * 400)
+    chunks = chunk_text(text, max_chars=200)
+    assert chunks[0].startswith("Erster Absatz.\n\nZweiter Absatz.")
+    assert all(len(chunk) <= 200 for chunk in chunks)
+
+
+def test_search_ranks_relevant_chunk_and_survives_serialization():
+    index = LoreIndex.from_documents(
+        [
+            ("pilze.txt", "Pilze wachsen im feuchten Stollen und leuchten blau."),
+            ("glocken.txt", "Das BIMMEL-Protokoll regelt die Glocken im Schacht."),
+        ]
+    )
+    restored = LoreIndex.from_dict(json.loads(json.dumps(index.to_dict())))
+
+    for candidate in (index, restored):
+        # Compound query words match the hyphenated spelling in the lore
+        results = candidate.search("Bimmelprotokoll", top_k=1)
+        assert results[0][1]["source"] == "glocken.txt"
+        assert candidate.search("Pilze", top_k=1)[0][1]["source"] == "pilze.txt"
+
+
+def test_retrieval_lore_keeps_small_files_inline():
+    documents = [
+        ("bots/Test/1_wesen.txt", "Ich bin ein kleines Wesen."),
+        ("wissen.txt", "Langes Wissen über Pilze. " * 200),
+    ]
+    lore, index = build_retrieval_lore(documents, {"core_max_chars": 100, "top_k": 1})
+    assert "Ich bin ein kleines Wesen." in lore
+    assert all(chunk["source"] == "wissen.txt" for chunk in index.chunks)
+    assert len(lore) < sum(len(content) for _, content in documents)
+
+
+if __name__ == "__main__":
+    test_chunks_respect_paragraphs_and_size()
+    test_search_ranks_relevant_chunk_and_survives_serialization()
+    test_retrieval_lore_keeps_small_files_inline()
+    print("✅ Lore index tests passed!")
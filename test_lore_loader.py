@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+#
+# Test script for token-budgeted lore assembly
+#
+import contextlib
+import io
+
+from lore_build import bot_sources, discover_bots, general_sources
+from lore_index import read_lore_documents
+from lore_loader import assemble_lore, estimate_tokens, load_bot_lore
+
+
+def test_unbudgeted_assembly_matches_load_bot_lore():
+    bot = discover_bots()[0]
+    general_paths = general_sources()
+    bot_paths = [path for path in bot_sources(bot) if path not in general_paths]
+
+    lore, report = assemble_lore(
+        read_lore_documents(bot_paths), read_lore_documents(general_paths)
+    )
+    with contextlib.redirect_stdout(io.StringIO()):
+        expected = load_bot_lore(bot)
+
+    assert lore == expected
+    assert all(entry["status"] == "included" for entry in report)
+
+
+def test_budget_keeps_prompt_files_and_ranks_by_prefix():
+    paragraph = "Wissen über die Insel Quantum und ihre Stollen. " * 40
+    bot_documents = [
+        ("bots/Test/1_wesen.txt", "Ich bin ein Kristallwesen."),
+        ("bots/Test/9_Prompt.txt", "Antworte immer kurz."),
+    ]
+    general_documents = [
+        ("2_geschichte.txt", "\n\n".join([paragraph] * 3)),
+        ("7_legenden.txt", paragraph),
+        ("zzz_anhang.txt", paragraph),
+    ]
+    budget = estimate_tokens(paragraph) * 2 + 250
+
+    lore, report = assemble_lore(bot_documents, general_documents, budget)
+    status = {entry["name"]: entry["status"] for entry in report}
+
+    assert status["bots/Test/9_Prompt.txt"] == "included"
+    assert status["bots/Test/1_wesen.txt"] == "included"
+    assert status["2_geschichte.txt"] == "trimmed"
+    assert status["7_legenden.txt"] == "dropped"
+    assert status["zzz_anhang.txt"] == "dropped"
+    assert "Antworte immer kurz." in lore
+    assert sum(entry["included_tokens"] for entry in report) <= budget
+    # Deterministic: the same input assembles to the same prompt
+    assert assemble_lore(bot_documents, general_documents, budget)[0] == lore
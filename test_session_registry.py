@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+#
+# Test script for the voice/light session registry
+#
+from session_registry import SessionRegistry
+
+
+def test_token_pairs_light_socket_with_its_own_session():
+    registry = SessionRegistry()
+    first_token = registry.issue_token("Puck")
+    second_token = registry.issue_token("Puck")
+    first = registry.open_voice("Puck", first_token)
+    second = registry.open_voice("Puck", second_token)
+
+    # Two players on the same bot: each token finds its own session
+    assert registry.pair_light(first_token, "Puck") is first
+    assert registry.pair_light(second_token, "Puck") is second
+    # Without a token the newest session of the bot is used
+    assert registry.pair_light(None, "Puck") is second
+    assert registry.pair_light("bogus", "Puck") is None
+
+    registry.close_voice(second)
+    assert registry.pair_light(None, "Puck") is first
+    assert registry.pair_light(second_token, "Puck") is None
+    registry.close_voice(first)
+    assert registry.pair_light(None, "Puck") is None
+    assert registry.get_stats() == {
+        "sessions": 0,
+        "pending_tokens": 0,
+        "light_sockets": 0,
+    }
+
+
+def test_tokens_are_single_use_and_bound_to_their_bot():
+    registry = SessionRegistry(token_ttl=60)
+    token = registry.issue_token("Kore")
+    # A token for another bot is not claimed; the session gets a fresh one
+    other = registry.open_voice("Puck", token)
+    assert other.token != token
+    assert registry.get_stats()["pending_tokens"] == 0
+
+    expired = SessionRegistry(token_ttl=-1)
+    stale = expired.issue_token("Puck")
+    assert expired.open_voice("Puck", stale).token != stale
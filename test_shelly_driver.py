@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+#
+# Test script for the server-side Shelly driver, against a local stand-in
+#
+import asyncio
+
+from aiohttp import web
+
+from crystal_light_controller import Color
+from light_protocol import shelly_command
+from shelly_driver import ShellyDriver
+
+
+class StandInShelly:
+    """Local HTTP server that answers GET /light/0 like a Shelly RGBW2"""
+
+    def __init__(self, delay=0.01):
+        self.delay = delay
+        self.requests = []
+        self.peers = set()
+        self._runner = None
+        self.host = None
+
+    async def light(self, request):
+        await asyncio.sleep(self.delay)
+        self.requests.append(dict(request.query))
+        self.peers.add(request.transport.get_extra_info("peername"))
+        return web.json_response({"ison": request.query.get("turn") == "on"})
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/light/0", self.light)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.host = f"127.0.0.1:{port}"
+
+    async def stop(self):
+        await self._runner.cleanup()
+
+
+def test_device_gets_latest_color_at_capped_rate_over_one_connection():
+    async def scenario():
+        shelly = StandInShelly()
+        await shelly.start()
+        driver = ShellyDriver(max_rate=10.0)
+        device = driver.device(shelly.host)
+        try:
+            # 30 FPS animation for one second
+            colors = [Color(i / 30, 0.5, 0.2, 1.0) for i in range(30)]
+            for color in colors:
+                device.post_color(color)
+                await asyncio.sleep(1 / 30)
+            await asyncio.sleep(0.25)
+        finally:
+            await driver.close()
+            await shelly.stop()
+
+        expected = {k: str(v) for k, v in shelly_command(colors[-1]).items()}
+        assert shelly.requests[-1] == expected
+        assert 8 <= len(shelly.requests) <= 12
+        assert len(shelly.peers) == 1  # one keep-alive connection
+
+        status = driver.get_stats()[shelly.host]
+        assert status["requests"] == len(shelly.requests)
+        assert status["coalesced"] == 30 - len(shelly.requests)
+        assert status["errors"] == 0
+        assert status["avg_latency_ms"] >= shelly.delay * 1000
+
+    asyncio.run(scenario())
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+#
+# Test script for the unified bot speech activity observer
+#
+import asyncio
+
+from pipecat.frames.frames import TTSAudioRawFrame, TTSStoppedFrame
+from pipecat.observers.base_observer import FramePushed
+from pipecat.processors.frame_processor import FrameDirection
+
+from speech_activity import SpeechActivityObserver
+
+
+def _pushed(frame):
+    return FramePushed(None, None, frame, FrameDirection.DOWNSTREAM, 0)
+
+
+def _audio():
+    return TTSAudioRawFrame(audio=b"\x00\x00" * 480, sample_rate=24000, num_channels=1)
+
+
+def _observer(events):
+    observer = SpeechActivityObserver(stop_timeout=0.05)
+
+    async def on_started(_):
+        events.append("start")
+
+    async def on_stopped(_):
+        events.append("stop")
+
+    observer.add_event_handler("on_speaking_started", on_started)
+    observer.add_event_handler("on_speaking_stopped", on_stopped)
+    return observer
+
+
+def test_audio_burst_is_one_turn_ending_at_deadline():
+    events = []
+
+    async def scenario():
+        observer = _observer(events)
+        await observer.on_push_frame(_pushed(_audio()))
+        tasks_before = len(asyncio.all_tasks())
+        for _ in range(20):
+            await observer.on_push_frame(_pushed(_audio()))
+            await asyncio.sleep(0.005)
+        # No task per audio frame, only one bumped deadline on the wheel
+        assert len(asyncio.all_tasks()) == tasks_before
+        assert events == ["start"]
+        await asyncio.sleep(0.15)
+        assert events == ["start", "stop"]
+        assert not observer.is_speaking
+        await observer.cleanup()
+
+    asyncio.run(scenario())
+
+
+def test_tts_stopped_ends_turn_immediately():
+    events = []
+
+    async def scenario():
+        observer = _observer(events)
+        await observer.on_push_frame(_pushed(_audio()))
+        await observer.on_push_frame(_pushed(TTSStoppedFrame()))
+        assert events == ["start", "stop"]
+        # The cancelled deadline must not stop a new turn early
+        await observer.on_push_frame(_pushed(_audio()))
+        assert events == ["start", "stop", "start"]
+        await observer.cleanup()
+        assert events == ["start", "stop", "start", "stop"]
+
+    asyncio.run(scenario())
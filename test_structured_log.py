@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+#
+# Test script for the connection-tagged logging and the hot-path event sink
+#
+import asyncio
+
+from loguru import logger
+
+from structured_log import EventSink, _add_context, connection_context
+
+
+def _capture(records):
+    return logger.add(
+        lambda message: records.append(message.record),
+        level="DEBUG",
+        format="{message}",
+    )
+
+
+def test_concurrent_connections_keep_their_own_context():
+    records = []
+
+    async def child():
+        await asyncio.sleep(0)
+        logger.info("child")
+
+    async def connection(name):
+        with connection_context(name, "Puck"):
+            for _ in range(3):
+                logger.info("working")
+                await asyncio.sleep(0)
+            # Tasks created by the connection inherit its context
+            await asyncio.create_task(child())
+            # An explicitly bound connection wins over the context
+            logger.bind(connection="bound").info("explicit")
+
+    async def scenario():
+        await asyncio.gather(connection("a"), connection("b"))
+        logger.info("idle")
+
+    logger.configure(patcher=_add_context)
+    sink = _capture(records)
+    try:
+        asyncio.run(scenario())
+    finally:
+        logger.remove(sink)
+        logger.configure(patcher=None)
+
+    tagged = [(r["extra"]["connection"], r["message"]) for r in records]
+    assert tagged.count(("a", "working")) == 3
+    assert tagged.count(("b", "working")) == 3
+    assert ("a", "child") in tagged and ("b", "child") in tagged
+    assert tagged.count(("bound", "explicit")) == 2
+    assert tagged[-1] == ("-", "idle")
+    assert all(r["extra"]["bot"] == "Puck" for r in records[:-1])
+
+
+def test_event_sink_samples_rate_limits_and_bounds_events():
+    records = []
+
+    async def scenario():
+        sink = EventSink(
+            maxsize=4,
+            sampling={"frame": 3},
+            rates={"frame": 1000.0, "light": 2.0},
+            flush_interval=0.01,
+        )
+        with connection_context("conn-1"):
+            for index in range(9):
+                sink.emit("frame", "INFO", "frame {}", index)
+        # Every 3rd frame event is kept: 0, 3, 6
+        assert sink.get_stats()["queued"] == 3
+        for index in range(5):
+            sink.emit("light", "WARNING", "slow send {}", index)
+        stats = sink.get_stats()["categories"]
+        assert stats["frame"]["sampled_out"] == 6
+        # A burst of two, then rate limited
+        assert stats["light"]["rate_limited"] == 3
+        # Bounded: the oldest frame event made room for the light events
+        assert stats["frame"]["dropped"] == 1
+
+        assert records == []
+        await asyncio.sleep(0.05)
+        stats = sink.get_stats()
+        assert stats["queued"] == 0
+        assert stats["categories"]["light"]["logged"] == 2
+
+    sink = _capture(records)
+    try:
+        asyncio.run(scenario())
+    finally:
+        logger.remove(sink)
+
+    messages = [r["message"] for r in records]
+    assert messages == [
+        "[frame] frame 3",
+        "[frame] frame 6",
+        "[light] slow send 0",
+        "[light] slow send 1",
+    ]
+    assert records[0]["extra"]["connection"] == "conn-1"
+    assert records[2]["extra"]["connection"] == "-"
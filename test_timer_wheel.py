@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+#
+# Test script for the shared timer wheel
+#
+import asyncio
+
+from timer_wheel import TimerWheel, get_timer_wheel
+
+
+def test_bumped_timer_fires_once_after_last_bump():
+    fired = []
+
+    async def scenario():
+        wheel = TimerWheel(tick_seconds=0.01, slots=8)
+        timer = wheel.schedule(0.05, lambda: fired.append(wheel.now()))
+        start = wheel.now()
+        for _ in range(10):
+            await asyncio.sleep(0.02)
+            timer.bump(0.05)
+        last_bump = wheel.now()
+        assert fired == []
+        await asyncio.sleep(0.15)
+        assert len(fired) == 1
+        assert fired[0] - last_bump >= 0.05 - 0.011
+        assert fired[0] - start > 0.2
+        # A fired timer can be re-armed by bumping it
+        timer.bump(0.02)
+        await asyncio.sleep(0.08)
+        assert len(fired) == 2
+        await wheel.stop()
+
+    asyncio.run(scenario())
+
+
+def test_cancel_long_delays_and_coroutine_callbacks():
+    fired = []
+
+    async def on_expired(name):
+        fired.append(name)
+
+    async def scenario():
+        assert get_timer_wheel() is get_timer_wheel()
+        wheel = TimerWheel(tick_seconds=0.01, slots=4)
+        cancelled = wheel.schedule(0.03, lambda: on_expired("cancelled"))
+        # Longer than one rotation of the wheel (4 slots * 10ms)
+        wheel.schedule(0.1, lambda: on_expired("long"))
+        cancelled.cancel()
+        many = [wheel.schedule(0.02, lambda: None) for _ in range(1000)]
+        await asyncio.sleep(0.06)
+        assert fired == []
+        assert not any(timer.active for timer in many)
+        await asyncio.sleep(0.1)
+        assert fired == ["long"]
+        assert wheel.get_stats()["fired"] == 1001
+        await wheel.stop()
+
+    asyncio.run(scenario())
+
+
+def test_cancel_and_bump_cycles_keep_one_slot_entry():
+    async def scenario():
+        wheel = TimerWheel(tick_seconds=0.01, slots=8)
+        timer = wheel.schedule(1.0, lambda: None)
+        for _ in range(100):
+            timer.cancel()
+            timer.bump(1.0)
+        assert wheel.get_stats()["timers"] == 1
+        assert sum(len(slot) for slot in wheel._slots) == 1
+        await wheel.stop()
+
+    asyncio.run(scenario())
+
+
+def test_bump_to_an_earlier_deadline_fires_on_time():
+    fired = []
+
+    async def scenario():
+        wheel = TimerWheel(tick_seconds=0.01, slots=64)
+        timer = wheel.schedule(0.4, lambda: fired.append(wheel.now()))
+        start = wheel.now()
+        timer.bump(0.05)
+        await asyncio.sleep(0.1)
+        assert len(fired) == 1
+        assert fired[0] - start < 0.08
+        assert wheel.get_stats()["timers"] == 0
+        await wheel.stop()
+
+    asyncio.run(scenario())
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+#
+# Test script for the turn latency tracer
+#
+import asyncio
+
+from pipecat.frames.frames import (
+    TTSAudioRawFrame,
+    UserStoppedSpeakingFrame,
+    VADUserStartedSpeakingFrame,
+    VADUserStoppedSpeakingFrame,
+)
+from pipecat.observers.base_observer import FramePushed
+from pipecat.processors.aggregators.openai_llm_context import (
+    OpenAILLMContext,
+    OpenAILLMContextFrame,
+)
+from pipecat.processors.frame_processor import FrameDirection
+
+from turn_latency import RollingLatency, TurnLatencyRegistry
+
+AGGREGATOR, RTVI, LLM, OUTPUT = "aggregator", "rtvi", "llm", "output"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_turn_spans_are_timed_at_their_hops():
+    async def scenario():
+        registry = TurnLatencyRegistry(history=10)
+        clock = Clock()
+        tracer = registry.tracer("session-1", "Puck", llm=LLM, output=OUTPUT)
+        tracer.clock = clock
+
+        async def push(frame, source=None, destination=None):
+            await tracer.on_push_frame(
+                FramePushed(source, destination, frame, FrameDirection.DOWNSTREAM, 0)
+            )
+
+        await push(VADUserStartedSpeakingFrame())
+        stopped = VADUserStoppedSpeakingFrame()
+        await push(stopped)
+        await push(stopped)
+        clock.now += 0.1
+        # The turn analyzer's stop does not restart the turn
+        await push(UserStoppedSpeakingFrame())
+
+        clock.now += 0.02
+        context = OpenAILLMContextFrame(context=OpenAILLMContext())
+        await push(context, AGGREGATOR, RTVI)
+        clock.now += 0.01
+        await push(context, RTVI, LLM)
+
+        audio = TTSAudioRawFrame(b"\x00\x00" * 480, 24000, 1)
+        clock.now += 0.37
+        await push(audio, LLM, OUTPUT)
+        clock.now += 0.12
+        # Pushed on by the output transport once it was sent
+        await push(audio, OUTPUT, AGGREGATOR)
+        clock.now += 0.02
+        tracer.mark_light()
+
+        turns = registry.recent_turns()
+        assert len(turns) == 1 and tracer.turn is None
+        assert turns[0]["spans_ms"] == {
+            "context": 120.0,
+            "llm_request": 130.0,
+            "first_audio": 620.0,
+            "light": 640.0,
+        }
+        stats = registry.get_stats()
+        assert stats["bots"]["Puck"]["first_audio"]["p99_ms"] == 620.0
+        assert stats["sessions"]["session-1"]["llm_request"]["count"] == 1
+
+        # The user goes on speaking before the bot answers
+        await push(VADUserStartedSpeakingFrame())
+        await push(VADUserStoppedSpeakingFrame())
+        clock.now += 0.3
+        await push(VADUserStartedSpeakingFrame())
+        assert registry.get_stats()["abandoned"] == 1
+        assert registry.get_stats()["turns"] == 1
+
+        tracer.close()
+        stats = registry.get_stats()
+        assert stats["sessions"] == {}
+        assert "Puck" in stats["bots"]
+        assert registry.recent_turns(bot="Zephyr") == []
+
+    asyncio.run(scenario())
+
+
+def test_rolling_percentiles_cover_the_last_window():
+    latency = RollingLatency(window=100)
+    assert latency.summary() == {"count": 0}
+    for value in range(1, 201):
+        latency.add(float(value))
+    summary = latency.summary()
+    assert summary["count"] == 200
+    assert summary["p50_ms"] == 150.5
+    assert summary["p99_ms"] == 199.0
+    assert summary["max_ms"] == 200.0
@@ -0,0 +1,179 @@
+#
+# Copyright (c) 2025, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+import asyncio
+import inspect
+from typing import Callable, List, Optional
+
+from loguru import logger
+
+DEFAULT_TICK_SECONDS = 0.05
+DEFAULT_SLOTS = 512  # one rotation covers 25.6s at the default tick
+
+
+class Timer:
+    """A deadline registered with a TimerWheel"""
+
+    __slots__ = ("deadline", "callback", "cancelled", "_wheel", "_tick")
+
+    def __init__(self, wheel: "TimerWheel", deadline: float, callback: Callable):
+        self._wheel = wheel
+        self.deadline = deadline
+        self.callback = callback
+        self.cancelled = False
+        self._tick: Optional[int] = None  # tick of the slot holding the timer
+
+    def bump(self, delay: float):
+        """
+        Move the deadline to delay seconds from now.
+
+        O(1) and allocation free for a later deadline: the timer stays in its
+        slot and is moved lazily when the wheel reaches that slot. An earlier
+        deadline moves it to the earlier slot right away. A fired or
+        cancelled timer is scheduled again.
+        """
+        self.deadline = self._wheel.now() + delay
+        self.cancelled = False
+        self._wheel._reschedule(self)
+
+    def cancel(self):
+        """Stop the timer; it leaves its slot when the wheel reaches it"""
+        self.cancelled = True
+
+    @property
+    def active(self) -> bool:
+        return not self.cancelled
+
+
+class TimerWheel:
+    """
+    Hashed timer wheel shared by all sessions of the process.
+
+    Sessions register a deadline once and bump it on activity instead of
+    cancelling and recreating an asyncio task per event. One loop task
+    advances the wheel every tick and fires expired callbacks; it exits when
+    no timers are left and restarts on the next schedule(). Coroutine
+    callbacks run in their own task, plain callbacks inline.
+    """
+
+    def __init__(
+        self,
+        tick_seconds: float = DEFAULT_TICK_SECONDS,
+        slots: int = DEFAULT_SLOTS,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+    ):
+        self.tick_seconds = tick_seconds
+        self._slots: List[List[Timer]] = [[] for _ in range(slots)]
+        self._loop = loop or asyncio.get_running_loop()
+        self._tick = int(self.now() / tick_seconds)  # last processed tick
+        self._count = 0
+        self._task: Optional[asyncio.Task] = None
+
+        # Statistics
+        self.fired = 0
+        self.max_lag = 0.0  # worst delay of a tick behind schedule, seconds
+
+    def now(self) -> float:
+        return self._loop.time()
+
+    def schedule(self, delay: float, callback: Callable) -> Timer:
+        """Call callback() once, delay seconds from now, unless bumped or cancelled"""
+        timer = Timer(self, self.now() + delay, callback)
+        self._insert(timer)
+        return timer
+
+    def _deadline_tick(self, deadline: float) -> int:
+        # Never the slot currently being processed or an older one
+        return max(int(deadline / self.tick_seconds), self._tick + 1)
+
+    def _insert(self, timer: Timer):
+        tick = self._deadline_tick(timer.deadline)
+        self._slots[tick % len(self._slots)].append(timer)
+        timer._tick = tick
+        self._count += 1
+        if self._task is None or self._task.done():
+            self._task = self._loop.create_task(self._run())
+
+    def _reschedule(self, timer: Timer):
+        if timer._tick is None:
+            self._insert(timer)
+        elif self._deadline_tick(timer.deadline) < timer._tick:
+            self._slots[timer._tick % len(self._slots)].remove(timer)
+            self._count -= 1
+            self._insert(timer)
+
+    async def _run(self):
+        try:
+            while self._count:
+                next_time = (self._tick + 1) * self.tick_seconds
+                await asyncio.sleep(max(0.0, next_time - self.now()))
+                now = self.now()
+                self.max_lag = max(self.max_lag, now - next_time)
+                self._advance(now)
+        except asyncio.CancelledError:
+            pass
+
+    def _advance(self, now: float):
+        target = int(now / self.tick_seconds)
+        # Catch up on skipped ticks, but never sweep a slot twice per call
+        first = max(self._tick + 1, target - len(self._slots) + 1)
+        for tick in range(first, target + 1):
+            self._tick = tick
+            slot = self._slots[tick % len(self._slots)]
+            if not slot:
+                continue
+            self._slots[tick % len(self._slots)] = []
+            for timer in slot:
+                timer._tick = None
+            for timer in slot:
+                self._count -= 1
+                if timer.cancelled or timer._tick is not None:
+                    # Cancelled, or bumped by an earlier callback and slotted
+                    continue
+                if timer.deadline > now:
+                    # Bumped, or due in a later rotation
+                    self._insert(timer)
+                    continue
+                timer.cancelled = True
+                self._fire(timer)
+        self._tick = target
+
+    def _fire(self, timer: Timer):
+        self.fired += 1
+        try:
+            result = timer.callback()
+            if inspect.isawaitable(result):
+                self._loop.create_task(result)
+        except Exception as e:
+            logger.error(f"Error in timer callback: {e}")
+
+    async def stop(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    def get_stats(self) -> dict:
+        return {
+            "timers": self._count,
+            "fired": self.fired,
+            "tick_seconds": self.tick_seconds,
+            "max_lag_ms": round(self.max_lag * 1000, 2),
+        }
+
+
+_default_wheel: Optional[TimerWheel] = None
+
+
+def get_timer_wheel() -> TimerWheel:
+    """The process-wide wheel of the running event loop"""
+    global _default_wheel
+    loop = asyncio.get_running_loop()
+    if _default_wheel is None or _default_wheel._loop is not loop:
+        _default_wheel = TimerWheel(loop=loop)
+    return _default_wheel
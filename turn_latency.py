@@ -0,0 +1,255 @@
+#
+# Copyright (c) 2025, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+from pipecat.frames.frames import (
+    LLMContextFrame,
+    TTSAudioRawFrame,
+    UserStartedSpeakingFrame,
+    UserStoppedSpeakingFrame,
+    VADUserStartedSpeakingFrame,
+    VADUserStoppedSpeakingFrame,
+)
+from pipecat.observers.base_observer import FramePushed
+from pipecat.processors.aggregators.openai_llm_context import OpenAILLMContextFrame
+from pipecat.processors.frame_processor import FrameDirection
+
+from frame_observer import FrameTypeObserver, handles
+
+DEFAULT_WINDOW = 500  # latencies per bot/session and stage for the percentiles
+DEFAULT_HISTORY = 100  # turn timelines kept for debugging
+
+# Spans of a turn, in milliseconds after the user stopped speaking (VAD)
+STAGE_CONTEXT = "context"  # the user context aggregator pushed the context
+STAGE_LLM_REQUEST = "llm_request"  # the context reached the LLM service
+STAGE_FIRST_AUDIO = "first_audio"  # first bot audio left the output transport
+STAGE_LIGHT = "light"  # speaking_start was sent to the lights
+STAGES = (STAGE_CONTEXT, STAGE_LLM_REQUEST, STAGE_FIRST_AUDIO, STAGE_LIGHT)
+
+
+class RollingLatency:
+    """The last `window` latencies of one stage, in milliseconds"""
+
+    def __init__(self, window: int = DEFAULT_WINDOW):
+        self._values = deque(maxlen=window)
+        self.count = 0
+
+    def add(self, milliseconds: float):
+        self._values.append(milliseconds)
+        self.count += 1
+
+    def summary(self) -> dict:
+        values = np.fromiter(self._values, dtype=np.float64, count=len(self._values))
+        if not len(values):
+            return {"count": self.count}
+        p50, p95, p99 = np.percentile(values, (50, 95, 99))
+        return {
+            "count": self.count,
+            "p50_ms": round(float(p50), 1),
+            "p95_ms": round(float(p95), 1),
+            "p99_ms": round(float(p99), 1),
+            "max_ms": round(float(values.max()), 1),
+        }
+
+
+@dataclass
+class Turn:
+    """One user turn: from the end of the user's speech to the bot's answer"""
+
+    session_id: str
+    bot: str
+    started_at: float  # wall clock time the user stopped speaking
+    start: float  # tracer clock time the user stopped speaking
+    spans: Dict[str, float] = field(default_factory=dict)  # stage -> ms
+
+    def timeline(self) -> dict:
+        return {
+            "session_id": self.session_id,
+            "bot": self.bot,
+            "started_at": self.started_at,
+            "spans_ms": {
+                stage: round(self.spans[stage], 1)
+                for stage in STAGES
+                if stage in self.spans
+            },
+        }
+
+
+class TurnLatencyRegistry:
+    """
+    Process-wide turn latencies: rolling p50/p95/p99 per bot and per active
+    session for every stage, and the span timelines of the last `history`
+    turns in a ring buffer.
+    """
+
+    def __init__(self, window: int = DEFAULT_WINDOW, history: int = DEFAULT_HISTORY):
+        self.window = window
+        self._bots: Dict[str, Dict[str, RollingLatency]] = {}
+        self._sessions: Dict[str, Dict[str, RollingLatency]] = {}
+        self._turns = deque(maxlen=history)
+
+        # Statistics
+        self.turns = 0
+        self.abandoned = 0  # the user went on speaking before the answer
+
+    @classmethod
+    def from_env(cls) -> "TurnLatencyRegistry":
+        """TURN_LATENCY_WINDOW and TURN_LATENCY_HISTORY override the sizes"""
+        return cls(
+            window=int(os.getenv("TURN_LATENCY_WINDOW", DEFAULT_WINDOW)),
+            history=int(os.getenv("TURN_LATENCY_HISTORY", DEFAULT_HISTORY)),
+        )
+
+    def tracer(self, session_id: str, bot: str, llm=None, output=None):
+        """A TurnTracer observer for one session's pipeline"""
+        return TurnTracer(self, session_id, bot, llm=llm, output=output)
+
+    def record(self, turn: Turn, stage: str, milliseconds: float):
+        for table, key in ((self._bots, turn.bot), (self._sessions, turn.session_id)):
+            stages = table.setdefault(key, {})
+            latency = stages.get(stage)
+            if latency is None:
+                latency = stages[stage] = RollingLatency(self.window)
+            latency.add(milliseconds)
+
+    def finish(self, turn: Turn):
+        self._turns.append(turn.timeline())
+        self.turns += 1
+
+    def close_session(self, session_id: str):
+        self._sessions.pop(session_id, None)
+
+    def recent_turns(
+        self,
+        limit: Optional[int] = None,
+        bot: Optional[str] = None,
+        session_id: Optional[str] = None,
+    ) -> List[dict]:
+        """Timelines of the most recent turns, newest first"""
+        turns = [
+            turn
+            for turn in reversed(self._turns)
+            if (bot is None or turn["bot"] == bot)
+            and (session_id is None or turn["session_id"] == session_id)
+        ]
+        return turns[:limit] if limit is not None else turns
+
+    def get_stats(self) -> dict:
+        def summaries(table):
+            return {
+                key: {
+                    stage: stages[stage].summary()
+                    for stage in STAGES
+                    if stage in stages
+                }
+                for key, stages in table.items()
+            }
+
+        return {
+            "window": self.window,
+            "turns": self.turns,
+            "abandoned": self.abandoned,
+            "bots": summaries(self._bots),
+            "sessions": summaries(self._sessions),
+        }
+
+
+class TurnTracer(FrameTypeObserver):
+    """
+    Times the turns of one session, from the VAD detecting the end of the
+    user's speech to the bot's first audio leaving the output transport
+    (`output`) and the light receiving speaking_start (mark_light()).
+
+    A turn starts at the first user-stopped frame after the user started
+    speaking. Frames are matched at a specific hop where that matters: the
+    LLM request is the context frame pushed into `llm`, the first audio a
+    TTS frame pushed on by `output` (it does so once the audio was written).
+    Without those processors the first sighting counts. If the user starts
+    speaking again before any bot audio, the turn is abandoned.
+    """
+
+    def __init__(
+        self,
+        registry: TurnLatencyRegistry,
+        session_id: str,
+        bot: str,
+        llm=None,
+        output=None,
+        clock: Callable[[], float] = time.monotonic,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.registry = registry
+        self.session_id = session_id
+        self.bot = bot
+        self.llm = llm
+        self.output = output
+        self.clock = clock
+        self.turn: Optional[Turn] = None
+        self._awaiting_stop = True
+
+    @handles(VADUserStartedSpeakingFrame, UserStartedSpeakingFrame)
+    async def _on_user_started(self, frame):
+        self._awaiting_stop = True
+        if self.turn is not None:
+            if STAGE_FIRST_AUDIO not in self.turn.spans:
+                self.registry.abandoned += 1
+                self.turn = None
+            else:
+                self._finish()
+
+    @handles(VADUserStoppedSpeakingFrame, UserStoppedSpeakingFrame)
+    async def _on_user_stopped(self, frame):
+        if not self._awaiting_stop:
+            return
+        self._awaiting_stop = False
+        if self.turn is not None:
+            self._finish()
+        self.turn = Turn(self.session_id, self.bot, time.time(), self.clock())
+
+    @handles(OpenAILLMContextFrame, LLMContextFrame, pushed=True)
+    async def _on_context(self, data: FramePushed):
+        if data.direction != FrameDirection.DOWNSTREAM:
+            return
+        self.mark(STAGE_CONTEXT)
+        if self.llm is None or data.destination is self.llm:
+            self.mark(STAGE_LLM_REQUEST)
+
+    @handles(TTSAudioRawFrame, pushed=True)
+    async def _on_bot_audio(self, data: FramePushed):
+        if self.output is None or data.source is self.output:
+            self.mark(STAGE_FIRST_AUDIO)
+
+    def mark_light(self):
+        """The speaking_start light command was sent"""
+        self.mark(STAGE_LIGHT)
+
+    def mark(self, stage: str):
+        """Record the first occurrence of a stage in the current turn"""
+        turn = self.turn
+        if turn is None or stage in turn.spans:
+            return
+        milliseconds = (self.clock() - turn.start) * 1000.0
+        turn.spans[stage] = milliseconds
+        self.registry.record(turn, stage, milliseconds)
+        if STAGE_FIRST_AUDIO in turn.spans and STAGE_LIGHT in turn.spans:
+            self._finish()
+
+    def _finish(self):
+        self.registry.finish(self.turn)
+        self.turn = None
+
+    def close(self):
+        """End of the session: keep an answered open turn, drop the session stats"""
+        if self.turn is not None and STAGE_FIRST_AUDIO in self.turn.spans:
+            self._finish()
+        self.turn = None
+        self.registry.close_session(self.session_id)